@@ -28,6 +28,11 @@ menuItems = [
         preferredName="Install External Fonts",
         shortKey=""
     ),
+    dict(
+        path="menu_addFontFolder.py",
+        preferredName="Install Font Folder",
+        shortKey=""
+    ),
     dict(
         path="menu_addCurrentDesignspace.py",
         preferredName="Install Current Designspace",
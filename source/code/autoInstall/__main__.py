@@ -0,0 +1,130 @@
+import sys
+import argparse
+from autoInstall.compilers import (
+    getCompileBackendNames,
+    getCompileProfileNames
+)
+from autoInstall.watcher import (
+    Watcher,
+    loadInstaller
+)
+
+# ---
+# CLI
+# ---
+
+# python -m autoInstall watch [options] <ufo|designspace>...
+# python -m autoInstall serve [options]
+# python -m autoInstall replay [options] <recording>
+
+def log(message):
+    print(message, flush=True)
+
+def makeParser():
+    parser = argparse.ArgumentParser(prog="autoInstall")
+    commands = parser.add_subparsers(dest="command", required=True)
+    watch = commands.add_parser(
+        "watch",
+        help="Rebuild UFOs and designspaces when they change."
+    )
+    watch.add_argument("paths", nargs="+", help="UFO and designspace paths.")
+    watch.add_argument("-o", "--output", default="autoInstall-output", help="Directory for the compiled fonts.")
+    backendNames = [name for name in getCompileBackendNames() if name != "robofont"]
+    watch.add_argument("--backend", default="ufo2ft", choices=backendNames)
+    watch.add_argument("--profile", default=None, choices=getCompileProfileNames())
+    watch.add_argument("--delay", type=float, default=1.0, help="Seconds without changes before a build.")
+    watch.add_argument("--interval", type=float, default=0.5, help="Seconds between checks for changes.")
+    watch.add_argument("--installer", default=None, help="A font directory or module:factory for a custom installer.")
+    watch.add_argument("--once", action="store_true", help="Build everything once and exit.")
+    watch.add_argument("--instances", action="store_true", help="Build the static instances of designspaces.")
+    serve = commands.add_parser(
+        "serve",
+        help="Run a build server shared by RoboFont sessions and watchers."
+    )
+    serve.add_argument("--socket", default=None, help="The Unix socket path.")
+    serve.add_argument("--max-builds", type=int, default=25, help="Builds per worker before it is replaced.")
+    serve.add_argument("--memory-limit", type=int, default=2048, help="Worker memory limit in MB.")
+    replay = commands.add_parser(
+        "replay",
+        help="Replay a recorded editing session with stub installs."
+    )
+    replay.add_argument("recording", help="A session recording file.")
+    replay.add_argument("--delay", type=float, default=5, help="Seconds after a change before installing. 0 turns this off.")
+    replay.add_argument("--precompile-delay", type=float, default=1, help="Seconds of idle time before precompiling.")
+    replay.add_argument("--no-precompile", action="store_true", help="Don't compile while idle.")
+    replay.add_argument("--install-after-save", action="store_true")
+    replay.add_argument("--no-install-after-app-exit", action="store_true")
+    replay.add_argument("--compile-time", type=float, default=1.0, help="Seconds each compile takes.")
+    replay.add_argument("--install-time", type=float, default=0.05, help="Seconds each install takes.")
+    return parser
+
+def runReplay(arguments):
+    from autoInstall.scheduler import InstallDebouncer
+    from autoInstall.replay import (
+        SessionReplayer,
+        StubInstaller,
+        loadSession,
+        formatReport
+    )
+    debouncer = InstallDebouncer(
+        installDelay=arguments.delay,
+        precompileDelay=arguments.precompile_delay,
+        installAfterSave=arguments.install_after_save,
+        installAfterAppExit=not arguments.no_install_after_app_exit,
+        precompile=not arguments.no_precompile
+    )
+    installer = StubInstaller(
+        compileTime=arguments.compile_time,
+        installTime=arguments.install_time
+    )
+    replayer = SessionReplayer(loadSession(arguments.recording), debouncer=debouncer, installer=installer)
+    log(formatReport(replayer.run()))
+    return 0
+
+def runServer(arguments):
+    from autoInstall.workers import configureWorkerPool
+    from autoInstall.buildServer import serve
+    configureWorkerPool(
+        maxBuildsPerWorker=arguments.max_builds,
+        memoryLimit=arguments.memory_limit * 1024 * 1024
+    )
+    try:
+        serve(arguments.socket, log=log)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def main(args=None):
+    arguments = makeParser().parse_args(args)
+    if arguments.command == "serve":
+        return runServer(arguments)
+    if arguments.command == "replay":
+        return runReplay(arguments)
+    installer = None
+    if arguments.installer:
+        installer = loadInstaller(arguments.installer, log)
+    watcher = Watcher(
+        arguments.paths,
+        arguments.output,
+        backend=arguments.backend,
+        profile=arguments.profile,
+        installer=installer,
+        delay=arguments.delay,
+        interval=arguments.interval,
+        staticInstances=arguments.instances,
+        log=log
+    )
+    try:
+        watcher.run(once=arguments.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        from autoInstall.workers import shutdownWorkerPool
+        shutdownWorkerPool()
+    log(f"{watcher.buildCount} built, {watcher.failureCount} failed")
+    if arguments.once and watcher.failureCount:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import os
+import time
+import asyncio
+import tempfile
+import traceback
+import weakref
+from autoInstall.core import (
+    extensionIdentifier,
+    getFontCompileProfile
+)
+from autoInstall.failures import getFileTreeDigest
+
+try:
+    import mojo
+except ModuleNotFoundError:
+    mojo = None
+
+# ---
+# API
+# ---
+
+# Installs for scripts and other extensions:
+#
+#     from autoInstall.api import install, installMany
+#     result = await install(CurrentFont(), profile="instant")
+#     results = await installMany(AllFonts(), concurrency=2)
+#
+# Sources are font objects or UFO paths. In RoboFont the
+# fonts are installed like test installs and this must
+# be awaited on the main thread. Elsewhere only paths
+# are accepted and the binaries are passed to an
+# installer object, as with the watch command. Compiles
+# run in a thread unless the backend is "robofont".
+#
+# Requests for a font that is already being built with
+# the same data are joined to that build, and a font
+# that hasn't changed since its last install is not
+# built again.
+
+class InstallResult:
+
+    def __init__(self, source, fontPath=None, error=None, compileTime=0, installTime=0, cacheHit=False, coalesced=False):
+        self.source = source
+        self.fontPath = fontPath
+        self.error = error
+        self.compileTime = compileTime
+        self.installTime = installTime
+        self.cacheHit = cacheHit
+        self.coalesced = coalesced
+
+    def __repr__(self):
+        status = "error" if self.error else "ok"
+        return f"<InstallResult {status} {self.fontPath} compile={self.compileTime:.3f}s install={self.installTime:.3f}s cacheHit={self.cacheHit} coalesced={self.coalesced}>"
+
+    @property
+    def totalTime(self):
+        return self.compileTime + self.installTime
+
+    def copy(self, **changes):
+        result = InstallResult(**self.__dict__)
+        result.__dict__.update(changes)
+        return result
+
+# ------
+# Public
+# ------
+
+async def install(source, profile=None, backend=None, installer=None, outputDirectory=None):
+    # Returns an InstallResult. Errors are
+    # reported in the result, not raised.
+    request = _Request(source, profile, backend, installer, outputDirectory)
+    state = _getLoopState()
+    running = state.running.get(request.key)
+    if running is not None and running[0] == request.token:
+        result = await asyncio.shield(running[1])
+        return result.copy(coalesced=True)
+    previous = state.results.get(request.key)
+    if previous is not None and previous[0] == request.token and os.path.exists(previous[1].fontPath):
+        return previous[1].copy(compileTime=0, installTime=0, cacheHit=True, coalesced=False)
+    future = asyncio.get_running_loop().create_future()
+    entry = (request.token, future)
+    state.running[request.key] = entry
+    lock = state.locks.setdefault(request.key, asyncio.Lock())
+    try:
+        # Builds of the same font don't overlap.
+        async with lock:
+            result = await request.run()
+        if result.error is None:
+            state.results[request.key] = (request.token, result)
+        future.set_result(result)
+    except BaseException as e:
+        future.set_exception(e)
+        # Nobody else may be waiting for it.
+        future.exception()
+        raise
+    finally:
+        if state.running.get(request.key) is entry:
+            del state.running[request.key]
+    return result
+
+async def installMany(sources, profile=None, backend=None, installer=None, outputDirectory=None, concurrency=2):
+    # Returns the results in the order of the sources.
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    async def limited(source):
+        async with semaphore:
+            return await install(
+                source,
+                profile=profile,
+                backend=backend,
+                installer=installer,
+                outputDirectory=outputDirectory
+            )
+    return await asyncio.gather(*[limited(source) for source in sources])
+
+# --------
+# Requests
+# --------
+
+class _LoopState:
+
+    def __init__(self):
+        self.running = {}
+        self.locks = {}
+        self.results = {}
+
+loopStates = weakref.WeakKeyDictionary()
+openedFonts = {}
+
+def _getLoopState():
+    loop = asyncio.get_running_loop()
+    state = loopStates.get(loop)
+    if state is None:
+        state = loopStates[loop] = _LoopState()
+    return state
+
+class _Request:
+
+    def __init__(self, source, profile, backend, installer, outputDirectory):
+        from autoInstall.compilers import defaultCompileBackendName
+        self.path = None
+        self.font = None
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.path.abspath(os.fspath(source))
+            if mojo is not None:
+                self.font = _openFont(self.path)
+        elif mojo is None:
+            raise TypeError("Outside of RoboFont only UFO paths can be installed.")
+        else:
+            self.font = source
+        if backend is None:
+            backend = defaultCompileBackendName
+            if mojo is not None:
+                from mojo.extensions import getExtensionDefault
+                backend = getExtensionDefault(extensionIdentifier + ".compileBackend")
+        if profile is None and self.font is not None:
+            profile = getFontCompileProfile(self.font)
+        if profile is None and mojo is not None:
+            from mojo.extensions import getExtensionDefault
+            profile = getExtensionDefault(extensionIdentifier + ".compileProfile")
+        self.profile = profile
+        self.backend = backend
+        self.installer = installer
+        self.outputDirectory = outputDirectory
+        # Font objects aren't safe to read from another
+        # thread, so they are compiled from a snapshot.
+        if self.font is not None:
+            from autoInstall.snapshot import takeSnapshot
+            self.key = self.font.asDefcon()
+            self.snapshot = takeSnapshot(self.font)
+            self.token = (self.snapshot.digest(), backend, profile)
+        else:
+            self.key = self.path
+            self.snapshot = None
+            self.token = (getFileTreeDigest([self.path]), backend, profile)
+
+    async def run(self):
+        if self.font is not None:
+            return await self.runInRoboFont()
+        return await self.runHeadless()
+
+    async def compile(self, outputPath, source, glyphOrder):
+        # Returns an error message.
+        from autoInstall.compilers import getCompileBackend
+        backend = getCompileBackend(self.backend)
+        def compile():
+            try:
+                backend.compile(source, outputPath, glyphOrder=glyphOrder, profile=self.profile)
+            except Exception as e:
+                return traceback.format_exception_only(type(e), e)[-1].strip()
+        if self.backend == "robofont":
+            return compile()
+        return await asyncio.get_running_loop().run_in_executor(None, compile)
+
+    async def runInRoboFont(self):
+        from autoInstall.installer import (
+            makeFontInstallPath,
+            installPrecompiledFont,
+            getInstallSlot,
+            activateFont
+        )
+        font = self.font
+        source = self.snapshot
+        if self.backend == "robofont":
+            source = font
+        fontPath = makeFontInstallPath(font)
+        start = time.perf_counter()
+        error = await self.compile(fontPath, source, list(self.snapshot.glyphOrder))
+        compileTime = time.perf_counter() - start
+        start = time.perf_counter()
+        if error is None:
+            error = installPrecompiledFont(font, fontPath)
+        else:
+            activateFont(font, fontPath, False)
+        installTime = time.perf_counter() - start
+        return InstallResult(
+            self.path or font,
+            fontPath=getInstallSlot(font).path if error is None else None,
+            error=error,
+            compileTime=compileTime,
+            installTime=installTime
+        )
+
+    async def runHeadless(self):
+        from autoInstall.installSlots import InstallSlot, makeSourceSlotName
+        from autoInstall.watcher import ReportingInstaller
+        outputDirectory = self.outputDirectory
+        if outputDirectory is None:
+            outputDirectory = os.path.join(tempfile.gettempdir(), "autoInstall")
+        os.makedirs(outputDirectory, exist_ok=True)
+        slot = headlessSlots.get(self.path)
+        if slot is None:
+            slot = headlessSlots[self.path] = InstallSlot(outputDirectory, makeSourceSlotName(self.path), keepRetired=0)
+        generationPath = slot.newGenerationPath()
+        start = time.perf_counter()
+        error = await self.compile(generationPath, self.path, None)
+        compileTime = time.perf_counter() - start
+        if error is not None:
+            slot.discard(generationPath)
+            return InstallResult(self.path, error=error, compileTime=compileTime)
+        start = time.perf_counter()
+        fontPath = slot.swap(generationPath)
+        installer = self.installer or ReportingInstaller()
+        try:
+            installer.install(self.path, [fontPath])
+        except Exception as e:
+            error = traceback.format_exception_only(type(e), e)[-1].strip()
+        installTime = time.perf_counter() - start
+        return InstallResult(
+            self.path,
+            fontPath=fontPath,
+            error=error,
+            compileTime=compileTime,
+            installTime=installTime
+        )
+
+headlessSlots = {}
+
+def _openFont(path):
+    # UFOs given by path are opened without an
+    # interface and kept open for later installs.
+    from mojo.roboFont import AllFonts, OpenFont
+    for font in AllFonts():
+        if font.path and os.path.abspath(font.path) == path:
+            return font
+    font = openedFonts.get(path)
+    if font is None:
+        font = openedFonts[path] = OpenFont(path, showInterface=False)
+    return font
@@ -0,0 +1,127 @@
+import os
+import sys
+import ast
+import subprocess
+
+# ---------
+# Benchmark
+# ---------
+
+# Measures how long modules take to import in a fresh
+# interpreter. The startup modules are the subscriber
+# and the light modules it imports at the top level.
+# They are listed individually so that they are timed
+# even where mojo isn't available. The deferred modules
+# are timed after the startup modules have been
+# imported, so their times are what RoboFont no longer
+# spends at launch.
+#
+#     python -m autoInstall.benchmark
+
+startupModules = [
+    "autoInstall",
+    "autoInstall.core",
+    "autoInstall.scheduler",
+    "autoInstall.snapshot",
+    "autoInstall.changes",
+    "autoInstall.compilers",
+    "autoInstall.precompile",
+    "autoInstall.workers",
+    "autoInstall.failures",
+    "autoInstall.subscriber"
+]
+
+deferredModules = [
+    "autoInstall.windows",
+    "autoInstall.installer",
+    "autoInstall.designspaceCache",
+    "autoInstall.kerning",
+    "autoInstall.proofSubset",
+    "autoInstall.featureCache",
+    "autoInstall.glyphCache",
+    "autoInstall.buildServer",
+    "autoInstall.instances",
+    "autoInstall.profiling",
+    "numpy",
+    "ezui",
+    "vanilla",
+    "prepolator",
+    "fontTools.ttLib",
+    "fontTools.designspaceLib",
+    "ufo2ft"
+]
+
+timingScript = """
+import sys
+import time
+import importlib
+
+def load(names):
+    loaded = []
+    start = time.perf_counter()
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            continue
+        loaded.append(name)
+    return time.perf_counter() - start, loaded
+
+preloaded = [name for name in sys.argv[1].split(",") if name]
+load(preloaded)
+print(repr(load([name for name in sys.argv[2].split(",") if name])))
+"""
+
+def timeImport(names, preloaded=(), repeat=5, executable=None):
+    # Returns the best time in seconds and
+    # the names that could be imported.
+    if executable is None:
+        executable = sys.executable
+    env = dict(os.environ)
+    codeDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (codeDirectory, env.get("PYTHONPATH")) if path
+    )
+    best = None
+    loaded = []
+    for i in range(repeat):
+        output = subprocess.run(
+            [executable, "-c", timingScript, ",".join(preloaded), ",".join(names)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        duration, loaded = ast.literal_eval(output.strip().splitlines()[-1])
+        if best is None or duration < best:
+            best = duration
+    return best, loaded
+
+def formatTime(duration):
+    return f"{duration * 1000:8.1f} ms"
+
+def runImportBenchmark(repeat=5, executable=None):
+    lines = [f"Import times (best of {repeat}):", ""]
+    startupTime, startupLoaded = timeImport(startupModules, repeat=repeat, executable=executable)
+    for name in startupModules:
+        if name in startupLoaded:
+            duration = timeImport([name], repeat=repeat, executable=executable)[0]
+            lines.append(f"  startup   {formatTime(duration)}  {name}")
+        else:
+            lines.append(f"  startup   {'unavailable':>11}  {name}")
+    available = []
+    for name in deferredModules:
+        duration, loaded = timeImport([name], preloaded=startupLoaded, repeat=repeat, executable=executable)
+        if loaded:
+            available.append(name)
+            lines.append(f"  deferred  {formatTime(duration)}  {name}")
+        else:
+            lines.append(f"  deferred  {'unavailable':>11}  {name}")
+    deferredTime = timeImport(available, preloaded=startupLoaded, repeat=repeat, executable=executable)[0]
+    lines.append("")
+    lines.append(f"Startup:                  {formatTime(startupTime)}")
+    lines.append(f"Deferred until first use: {formatTime(deferredTime)}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    print(runImportBenchmark())
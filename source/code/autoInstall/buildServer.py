@@ -0,0 +1,329 @@
+import os
+import time
+import struct
+import pickle
+import socket
+import tempfile
+import threading
+import traceback
+import subprocess
+import socketserver
+from autoInstall.caches import LRUCache
+from autoInstall.snapshot import FontSnapshot
+from autoInstall.failures import getFileTreeDigest
+from autoInstall.workers import (
+    WorkerPool,
+    WorkerError,
+    workerPoolSettings,
+    getPythonCommand
+)
+
+# ------------
+# Build Server
+# ------------
+
+# A local build service shared by several RoboFont
+# sessions and command line watchers. Jobs arrive over
+# a Unix domain socket. Identical jobs that are already
+# running are joined instead of being built again. The
+# results are kept in a content addressed cache, and
+# the builds run in warm worker processes. Messages
+# are pickled, so the socket is only accessible to
+# the user that started the server.
+
+def getDefaultSocketPath():
+    return os.path.join(tempfile.gettempdir(), f"autoInstall-{os.getuid()}.sock")
+
+class BuildServerError(Exception): pass
+
+def _sendMessage(connection, message):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    connection.sendall(struct.pack(">Q", len(data)) + data)
+
+def _receiveMessage(connection):
+    header = _receiveBytes(connection, 8)
+    if header is None:
+        return None
+    length = struct.unpack(">Q", header)[0]
+    data = _receiveBytes(connection, length)
+    if data is None:
+        raise BuildServerError("The connection closed in the middle of a message.")
+    return pickle.loads(data)
+
+def _receiveBytes(connection, count):
+    chunks = []
+    while count:
+        chunk = connection.recv(min(count, 1024 * 1024))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        count -= len(chunk)
+    return b"".join(chunks)
+
+# ------
+# Server
+# ------
+
+class _Job:
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise BuildServerError(self.error)
+        return self.data
+
+class BuildService:
+
+    def __init__(self, pool=None, cacheSize=512 * 1024 * 1024):
+        if pool is None:
+            pool = WorkerPool(**workerPoolSettings)
+        self.pool = pool
+        self.cache = LRUCache(maxSize=cacheSize, sizeFunction=len)
+        self.builtCount = 0
+        self.joinedCount = 0
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def getJobKey(self, source, glyphOrder, profile):
+        if isinstance(source, FontSnapshot):
+            sourceKey = ("snapshot", source.digest(), source.path)
+        else:
+            source = os.path.abspath(source)
+            sourceKey = ("path", source, getFileTreeDigest([source]))
+        return repr((sourceKey, glyphOrder, profile))
+
+    def compileFont(self, source, glyphOrder=None, profile=None):
+        key = self.getJobKey(source, glyphOrder, profile)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            job = self._jobs.get(key)
+            isOwner = job is None
+            if isOwner:
+                job = self._jobs[key] = _Job()
+            else:
+                self.joinedCount += 1
+        if not isOwner:
+            return job.wait()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "font.otf")
+                self.pool.run("compileFont", source, path, glyphOrder, profile)
+                with open(path, "rb") as f:
+                    job.data = f.read()
+            self.cache.set(key, job.data)
+            self.builtCount += 1
+        except Exception as e:
+            job.error = traceback.format_exception_only(type(e), e)[-1].strip()
+        finally:
+            with self._lock:
+                del self._jobs[key]
+            job.event.set()
+        return job.wait()
+
+    def getStatus(self):
+        return dict(
+            built=self.builtCount,
+            joined=self.joinedCount,
+            cacheHits=self.cache.hits,
+            cacheMisses=self.cache.misses,
+            cacheSize=self.cache.size,
+            running=len(self._jobs),
+            workersStarted=self.pool.startedCount,
+            workersRecycled=self.pool.recycledCount
+        )
+
+    def handle(self, request):
+        kind = request.get("kind")
+        if kind == "compileFont":
+            return self.compileFont(
+                request["source"],
+                glyphOrder=request.get("glyphOrder"),
+                profile=request.get("profile")
+            )
+        if kind == "status":
+            return self.getStatus()
+        if kind == "ping":
+            return "pong"
+        raise BuildServerError(f"Unknown job: {kind}")
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                request = _receiveMessage(self.request)
+            except (BuildServerError, OSError, pickle.UnpicklingError):
+                return
+            if request is None:
+                return
+            try:
+                response = ("ok", service.handle(request))
+            except (BuildServerError, WorkerError) as e:
+                response = ("error", str(e))
+            except Exception as e:
+                response = ("error", traceback.format_exception_only(type(e), e)[-1].strip())
+            try:
+                _sendMessage(self.request, response)
+            except OSError:
+                return
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+def serve(socketPath=None, service=None, log=None):
+    if socketPath is None:
+        socketPath = getDefaultSocketPath()
+    if service is None:
+        service = BuildService()
+    if os.path.exists(socketPath):
+        if isBuildServerRunning(socketPath):
+            raise BuildServerError(f"A build server is already running at {socketPath}.")
+        os.remove(socketPath)
+    previousUmask = os.umask(0o077)
+    try:
+        server = _UnixServer(socketPath, _RequestHandler)
+    finally:
+        os.umask(previousUmask)
+    server.service = service
+    if log is not None:
+        log(f"serving at {socketPath}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.pool.shutdown()
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+
+# ------
+# Client
+# ------
+
+class BuildServerClient:
+
+    def __init__(self, socketPath=None, timeout=None):
+        if socketPath is None:
+            socketPath = getDefaultSocketPath()
+        self.socketPath = socketPath
+        self.timeout = timeout
+
+    def request(self, **request):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        try:
+            connection.connect(self.socketPath)
+            _sendMessage(connection, request)
+            response = _receiveMessage(connection)
+        finally:
+            connection.close()
+        if response is None:
+            raise BuildServerError("The build server closed the connection.")
+        status, result = response
+        if status == "error":
+            raise BuildServerError(result)
+        return result
+
+    def compileFont(self, source, outputPath, glyphOrder=None, profile=None):
+        data = self.request(
+            kind="compileFont",
+            source=source,
+            glyphOrder=glyphOrder,
+            profile=profile
+        )
+        with open(outputPath, "wb") as f:
+            f.write(data)
+
+    def getStatus(self):
+        return self.request(kind="status")
+
+def isBuildServerRunning(socketPath=None):
+    try:
+        return BuildServerClient(socketPath, timeout=2).request(kind="ping") == "pong"
+    except (OSError, BuildServerError):
+        return False
+
+def startBuildServer(socketPath=None, executable=None, timeout=10):
+    # Start a server in the background if there
+    # isn't one already and wait until it answers.
+    # It uses this process's worker settings.
+    if socketPath is None:
+        socketPath = getDefaultSocketPath()
+    if isBuildServerRunning(socketPath):
+        return False
+    executable, environment = getPythonCommand(executable)
+    # The server outlives the caller, so it must not
+    # hold on to the caller's output. Its errors go
+    # to a log file next to the socket.
+    logPath = socketPath + ".log"
+    with open(logPath, "ab") as logFile:
+        subprocess.Popen(
+            [
+                executable,
+                "-c",
+                buildServerBootstrap,
+                os.path.dirname(__file__),
+                socketPath,
+                str(workerPoolSettings["maxBuildsPerWorker"]),
+                str(workerPoolSettings["memoryLimit"] or 0)
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=logFile,
+            env=environment,
+            start_new_session=True
+        )
+    end = time.time() + timeout
+    while time.time() < end:
+        if isBuildServerRunning(socketPath):
+            return True
+        time.sleep(0.1)
+    raise BuildServerError(f"The build server did not start. See {logPath}.")
+
+buildServerBootstrap = """
+import sys
+import types
+package = types.ModuleType("autoInstall")
+package.__path__ = [sys.argv[1]]
+sys.modules["autoInstall"] = package
+from autoInstall.workers import workerPoolSettings
+from autoInstall.buildServer import serve
+workerPoolSettings.update(
+    maxBuildsPerWorker=int(sys.argv[3]),
+    memoryLimit=int(sys.argv[4]) or None
+)
+serve(sys.argv[2])
+"""
+
+# ---------------
+# Shared Settings
+# ---------------
+
+buildServerSettings = dict(
+    socketPath=None,
+    executable=None,
+    autoStart=True
+)
+
+def configureBuildServer(**settings):
+    buildServerSettings.update(settings)
+
+def compileWithBuildServer(source, outputPath, glyphOrder=None, profile=None):
+    # Start the server on first use if it isn't running.
+    client = BuildServerClient(buildServerSettings["socketPath"])
+    try:
+        client.compileFont(source, outputPath, glyphOrder=glyphOrder, profile=profile)
+        return
+    except (FileNotFoundError, ConnectionRefusedError):
+        if not buildServerSettings["autoStart"]:
+            raise BuildServerError(f"No build server is running at {client.socketPath}.")
+    startBuildServer(client.socketPath, executable=buildServerSettings["executable"])
+    client.compileFont(source, outputPath, glyphOrder=glyphOrder, profile=profile)
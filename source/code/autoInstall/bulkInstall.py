@@ -0,0 +1,213 @@
+import os
+import glob
+import json
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from autoInstall.installSlots import InstallSlot, makeSourceSlotName
+from autoInstall.failures import getFileTreeDigest
+
+# ------------
+# Bulk Install
+# ------------
+
+# A folder, or a glob pattern, of UFOs is installed
+# without opening the fonts in RoboFont. The sources
+# are compiled from disk a few at a time in build
+# threads and the finished binaries are collected on
+# the main thread, which activates them in batches.
+#
+# Binaries are written to an _AutoInstall folder next
+# to the sources, along with a manifest of the fonts
+# that were built. When the same folder is installed
+# again, fonts that haven't changed since they were
+# built are activated without being compiled again,
+# so an interrupted install picks up where it stopped.
+
+bulkInstallDirectoryName = "_AutoInstall"
+bulkInstallManifestName = "bulkInstall.json"
+bulkInstallFileTypes = (".ufo", ".ufoz")
+
+def findBulkFontPaths(pattern):
+    pattern = os.path.abspath(os.path.expanduser(pattern))
+    if pattern.endswith(bulkInstallFileTypes) and os.path.exists(pattern):
+        return [pattern]
+    paths = []
+    if os.path.isdir(pattern):
+        for directory, directoryNames, fileNames in os.walk(pattern):
+            for name in list(directoryNames):
+                if name.endswith(".ufo"):
+                    paths.append(os.path.join(directory, name))
+                if name.endswith(".ufo") or name == bulkInstallDirectoryName:
+                    # Don't look inside UFOs or the output.
+                    directoryNames.remove(name)
+            for name in fileNames:
+                if name.endswith(".ufoz"):
+                    paths.append(os.path.join(directory, name))
+    else:
+        paths = [
+            path for path in glob.glob(pattern, recursive=True)
+            if path.endswith(bulkInstallFileTypes)
+        ]
+    return sorted(paths)
+
+def getBulkInstallDirectory(pattern):
+    # The deepest directory without glob characters.
+    pattern = os.path.abspath(os.path.expanduser(pattern))
+    if os.path.isdir(pattern) and not pattern.endswith(".ufo"):
+        directory = pattern
+    else:
+        directory = os.path.dirname(pattern)
+        while glob.has_magic(directory):
+            directory = os.path.dirname(directory)
+    return os.path.join(directory, bulkInstallDirectoryName)
+
+# --------
+# Manifest
+# --------
+
+class BulkInstallManifest:
+
+    def __init__(self, path):
+        self.path = path
+        self.fonts = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.fonts = json.load(f)["fonts"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def isFinished(self, sourcePath, digest):
+        entry = self.fonts.get(sourcePath)
+        if entry is None or entry["digest"] != digest:
+            return False
+        return os.path.exists(entry["fontPath"])
+
+    def getFontPath(self, sourcePath):
+        return self.fonts[sourcePath]["fontPath"]
+
+    def record(self, sourcePath, digest, fontPath):
+        self.fonts[sourcePath] = dict(digest=digest, fontPath=fontPath)
+
+    def save(self):
+        # Written next to the manifest and renamed, so an
+        # interruption can't leave a truncated file.
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(dict(fonts=self.fonts), f, indent=1, sort_keys=True)
+        os.replace(temp, self.path)
+
+# ---------
+# Bulk Jobs
+# ---------
+
+class BulkInstallResult:
+
+    def __init__(self, sourcePath, digest=None, fontPath=None, error=None, resumed=False):
+        self.sourcePath = sourcePath
+        self.digest = digest
+        self.fontPath = fontPath
+        self.error = error
+        self.resumed = resumed
+
+class BulkInstall:
+
+    # Results are collected with takeResults, which
+    # is safe to call while the builds are running.
+
+    def __init__(self, pattern, backend="ufo2ft", profile=None, concurrency=2):
+        if backend == "robofont":
+            # Sources aren't opened in RoboFont.
+            backend = "ufo2ft"
+        self.pattern = pattern
+        self.backend = backend
+        self.profile = profile
+        self.concurrency = max(1, concurrency)
+        self.outputDirectory = getBulkInstallDirectory(pattern)
+        self.manifest = BulkInstallManifest(os.path.join(self.outputDirectory, bulkInstallManifestName))
+        self.paths = []
+        self.finishedCount = 0
+        self.resumedCount = 0
+        self.failedCount = 0
+        self._results = queue.Queue()
+        self._cancelled = threading.Event()
+        self._executor = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def isDone(self):
+        return self.finishedCount == len(self.paths)
+
+    def start(self):
+        self.paths = findBulkFontPaths(self.pattern)
+        os.makedirs(self.outputDirectory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix="autoInstallBulk"
+        )
+        for path in self.paths:
+            self._executor.submit(self._build, path)
+        self._executor.shutdown(wait=False)
+        return len(self.paths)
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def getSlot(self, sourcePath):
+        return InstallSlot(self.outputDirectory, makeSourceSlotName(sourcePath), keepRetired=0)
+
+    def _build(self, sourcePath):
+        if self._cancelled.is_set():
+            return
+        try:
+            digest = getFileTreeDigest([sourcePath])
+            if self.manifest.isFinished(sourcePath, digest):
+                result = BulkInstallResult(sourcePath, digest, self.manifest.getFontPath(sourcePath), resumed=True)
+            else:
+                result = BulkInstallResult(sourcePath, digest, self._compile(sourcePath))
+        except Exception as e:
+            error = traceback.format_exception_only(type(e), e)[-1].strip()
+            result = BulkInstallResult(sourcePath, error=error)
+        self._results.put(result)
+
+    def _compile(self, sourcePath):
+        from autoInstall.compilers import getCompileBackend
+        slot = self.getSlot(sourcePath)
+        generationPath = slot.newGenerationPath()
+        try:
+            getCompileBackend(self.backend).compile(
+                sourcePath,
+                generationPath,
+                profile=self.profile
+            )
+        except Exception:
+            slot.discard(generationPath)
+            raise
+        return slot.swap(generationPath)
+
+    def takeResults(self, maxCount=None):
+        # Finished fonts are recorded in the manifest
+        # as they are taken.
+        results = []
+        while maxCount is None or len(results) < maxCount:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.finishedCount += 1
+            if result.error is not None:
+                self.failedCount += 1
+            else:
+                if result.resumed:
+                    self.resumedCount += 1
+                self.manifest.record(result.sourcePath, result.digest, result.fontPath)
+            results.append(result)
+        if results:
+            self.manifest.save()
+        return results
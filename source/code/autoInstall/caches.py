@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+# ---------
+# LRU Cache
+# ---------
+
+class LRUCache:
+
+    # Entries are evicted least recently used first
+    # when there are more than maxCount entries or,
+    # if a size function is given, when the total
+    # size is more than maxSize.
+
+    def __init__(self, maxCount=None, maxSize=None, sizeFunction=None):
+        self.maxCount = maxCount
+        self.maxSize = maxSize
+        self.sizeFunction = sizeFunction
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def set(self, key, value):
+        size = 0
+        if self.sizeFunction is not None:
+            size = self.sizeFunction(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            # The keys of evicted entries are returned.
+            return self._evict()
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _evict(self):
+        evicted = []
+        while self._entries:
+            if self.maxCount is not None and len(self._entries) > self.maxCount:
+                pass
+            elif self.maxSize is not None and self.size > self.maxSize:
+                pass
+            else:
+                break
+            key, (value, size) = self._entries.popitem(last=False)
+            self.size -= size
+            evicted.append(key)
+        return evicted
@@ -0,0 +1,190 @@
+from autoInstall.snapshot import compileGlyphLibKeys
+from autoInstall.components import ComponentIndex, getBaseGlyphs
+
+# ----------------
+# Change Relevance
+# ----------------
+
+glyphNotifications = {
+    # relevant
+    "Glyph.ContoursChanged" : True,
+    "Glyph.ComponentsChanged" : True,
+    "Glyph.AnchorsChanged" : True,
+    "Glyph.WidthChanged" : True,
+    "Glyph.HeightChanged" : True,
+    "Glyph.UnicodesChanged" : True,
+    "Glyph.NameChanged" : True,
+    "Glyph.LibChanged" : None,
+    # irrelevant
+    "Glyph.MarkColorChanged" : False,
+    "Glyph.GuidelinesChanged" : False,
+    "Glyph.NoteChanged" : False,
+    "Glyph.ImageChanged" : False,
+}
+
+layerNotifications = (
+    "Layer.GlyphAdded",
+    "Layer.GlyphDeleted",
+    "Layer.GlyphNameChanged"
+)
+
+infoNotifications = (
+    "Info.ValueChanged",
+)
+
+irrelevantInfoAttributes = {
+    "guidelines",
+    "note",
+    "macintoshFONDFamilyID",
+    "macintoshFONDName",
+    "woffMajorVersion",
+    "woffMinorVersion",
+    "woffMetadataUniqueID",
+    "woffMetadataVendor",
+    "woffMetadataCredits",
+    "woffMetadataDescription",
+    "woffMetadataLicense",
+    "woffMetadataCopyright",
+    "woffMetadataTrademark",
+    "woffMetadataLicensee",
+    "woffMetadataExtensions"
+}
+
+skipExportGlyphsLibKey = "public.skipExportGlyphs"
+
+# Classifies the low level notifications posted by a
+# defcon font so that edits that can't change the
+# compiled font (other layers, mark colors, guidelines,
+# notes, glyphs that are not exported and not used as
+# components, etc.) can be ignored. Notifications are
+# counted per change kind and consumed by the adjunct
+# callbacks in the subscriber. If nothing was seen for
+# a kind, the change is treated as relevant so that
+# unknown change sources are never dropped.
+
+class FontChangeMonitor:
+
+    def __init__(self, font):
+        self.font = font
+        self.changeCount = 0
+        self.ignoredCount = 0
+        self._relevant = {}
+        self._irrelevant = {}
+        self._changedGlyphNames = set()
+        self._glyphLibs = {}
+        layer = font.layers.defaultLayer
+        for glyphName in layer.keys():
+            self._glyphLibs[glyphName] = self._getGlyphLib(layer[glyphName])
+        self.componentIndex = ComponentIndex.fromFont(layer)
+        dispatcher = font.dispatcher
+        for notification in glyphNotifications:
+            dispatcher.addObserver(self, "glyphNotificationCallback", notification=notification)
+        for notification in layerNotifications:
+            dispatcher.addObserver(self, "layerNotificationCallback", notification=notification)
+        for notification in infoNotifications:
+            dispatcher.addObserver(self, "infoNotificationCallback", notification=notification)
+
+    def stop(self):
+        dispatcher = self.font.dispatcher
+        for notification in glyphNotifications:
+            dispatcher.removeObserver(self, notification=notification)
+        for notification in layerNotifications:
+            dispatcher.removeObserver(self, notification=notification)
+        for notification in infoNotifications:
+            dispatcher.removeObserver(self, notification=notification)
+        self.font = None
+
+    # Consumption
+
+    def consume(self, kind):
+        relevant = self._relevant.pop(kind, 0)
+        irrelevant = self._irrelevant.pop(kind, 0)
+        if relevant or not irrelevant:
+            self.changeCount += 1
+            return True
+        self.ignoredCount += 1
+        return False
+
+    def getChangedGlyphNames(self):
+        # Composites are included since
+        # their compiled outlines change too.
+        glyphNames = set(self._changedGlyphNames)
+        glyphNames |= self.componentIndex.getDependents(glyphNames)
+        return glyphNames
+
+    def takeChangedGlyphNames(self):
+        glyphNames = self.getChangedGlyphNames()
+        self._changedGlyphNames = set()
+        return glyphNames
+
+    def _record(self, kind, relevant):
+        if relevant:
+            self._relevant[kind] = self._relevant.get(kind, 0) + 1
+        else:
+            self._irrelevant[kind] = self._irrelevant.get(kind, 0) + 1
+
+    # Glyphs
+
+    def glyphNotificationCallback(self, notification):
+        glyph = notification.object
+        if glyph.layer is not self.font.layers.defaultLayer:
+            self._record("glyphs", False)
+            return
+        if notification.name == "Glyph.ComponentsChanged":
+            self.componentIndex.setGlyph(glyph.name, getBaseGlyphs(glyph))
+        relevant = glyphNotifications[notification.name]
+        if relevant is None:
+            glyphLib = self._getGlyphLib(glyph)
+            relevant = glyphLib != self._glyphLibs.get(glyph.name)
+            self._glyphLibs[glyph.name] = glyphLib
+        if relevant:
+            relevant = self.glyphIsCompiled(glyph.name)
+        if relevant:
+            self._changedGlyphNames.add(glyph.name)
+        self._record("glyphs", relevant)
+
+    def layerNotificationCallback(self, notification):
+        layer = notification.object
+        if layer is not self.font.layers.defaultLayer:
+            self._record("glyphs", False)
+            return
+        data = notification.data or {}
+        if notification.name == "Layer.GlyphAdded":
+            glyphName = data["name"]
+            self.componentIndex.setGlyph(glyphName, getBaseGlyphs(layer[glyphName]))
+        elif notification.name == "Layer.GlyphDeleted":
+            glyphName = data["name"]
+            if glyphName in self.componentIndex:
+                self.componentIndex.removeGlyph(glyphName)
+            self._glyphLibs.pop(glyphName, None)
+        elif notification.name == "Layer.GlyphNameChanged":
+            self.componentIndex.renameGlyph(data["oldValue"], data["newValue"])
+            self._glyphLibs[data["newValue"]] = self._glyphLibs.pop(data["oldValue"], ())
+        for key in ("name", "oldValue", "newValue"):
+            glyphName = data.get(key)
+            if glyphName is not None:
+                self._changedGlyphNames.add(glyphName)
+        self._record("glyphs", True)
+
+    def glyphIsCompiled(self, glyphName):
+        skipped = self.font.lib.get(skipExportGlyphsLibKey)
+        if not skipped or glyphName not in skipped:
+            return True
+        # A glyph that is not exported still matters if
+        # an exported glyph uses it as a component.
+        dependents = self.componentIndex.getDependents(glyphName)
+        return bool(dependents - set(skipped))
+
+    def _getGlyphLib(self, glyph):
+        return tuple(
+            (key, glyph.lib[key])
+            for key in compileGlyphLibKeys
+            if key in glyph.lib
+        )
+
+    # Info
+
+    def infoNotificationCallback(self, notification):
+        data = notification.data or {}
+        attribute = data.get("attribute")
+        self._record("info", attribute not in irrelevantInfoAttributes)
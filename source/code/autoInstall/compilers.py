@@ -0,0 +1,267 @@
+import os
+import copy
+from autoInstall.snapshot import FontSnapshot, takeSnapshot
+
+# --------
+# Registry
+# --------
+
+# Backends compile a font source to a binary at a
+# path. A source may be a font object (fontParts or
+# defcon), a FontSnapshot or the path to a UFO. Only
+# the "robofont" backend needs to run inside RoboFont.
+
+compileBackends = {}
+defaultCompileBackendName = "ufo2ft"
+glyphCacheSize = 128 * 1024 * 1024
+
+def setGlyphCacheSize(size):
+    global glyphCacheSize
+    glyphCacheSize = size
+
+# --------
+# Profiles
+# --------
+
+# Profiles trade fidelity for speed. "proof" matches
+# the settings that test installs have always used,
+# except for decomposition. Older versions passed
+# decompose="False" to generate(), which is true, so
+# the RoboFont backend always decomposed. It now only
+# decomposes with "release-like".
+
+compileProfiles = {
+    "instant" : dict(
+        removeOverlaps=False,
+        decompose=False,
+        compileFeatures=False,
+        productionNames=False,
+        optimizeCFF=0
+    ),
+    "proof" : dict(
+        removeOverlaps=True,
+        decompose=False,
+        compileFeatures=True,
+        productionNames=False,
+        optimizeCFF=1
+    ),
+    "release-like" : dict(
+        removeOverlaps=True,
+        decompose=True,
+        compileFeatures=True,
+        productionNames=True,
+        optimizeCFF=2
+    )
+}
+defaultCompileProfileName = "proof"
+
+def getCompileProfileNames():
+    return list(compileProfiles.keys())
+
+def getCompileProfile(name=None):
+    if not name:
+        name = defaultCompileProfileName
+    if name not in compileProfiles:
+        raise KeyError(f"Unknown compile profile: {name}")
+    return compileProfiles[name]
+
+def registerCompileBackend(backendClass):
+    compileBackends[backendClass.name] = backendClass
+    return backendClass
+
+def getCompileBackendNames():
+    return list(compileBackends.keys())
+
+def getCompileBackend(name=None):
+    if not name:
+        name = defaultCompileBackendName
+    if name not in compileBackends:
+        raise KeyError(f"Unknown compile backend: {name}")
+    return compileBackends[name]()
+
+class CompileBackend:
+
+    name = None
+
+    def compile(self, source, outputPath, glyphOrder=None, profile=None):
+        raise NotImplementedError
+
+# --------
+# RoboFont
+# --------
+
+@registerCompileBackend
+class RoboFontCompileBackend(CompileBackend):
+
+    # generate() has no switch for the features,
+    # so they are always compiled by this backend.
+
+    name = "robofont"
+
+    def compile(self, source, outputPath, glyphOrder=None, profile=None):
+        profile = getCompileProfile(profile)
+        if isinstance(source, (str, FontSnapshot)):
+            source = loadDefconFont(source)
+        if hasattr(source, "asDefcon"):
+            source = source.asDefcon()
+        if glyphOrder is None:
+            glyphOrder = source.glyphOrder
+        source.generate(
+            outputPath,
+            progressBar=None,
+            testInstall=True,
+            decompose=profile["decompose"],
+            checkOutlines=profile["removeOverlaps"],
+            autohint=False,
+            releaseMode=profile["productionNames"],
+            glyphOrder=glyphOrder
+        )
+
+# ------
+# ufo2ft
+# ------
+
+@registerCompileBackend
+class UFO2FTCompileBackend(CompileBackend):
+
+    # With the "proof" profile this reproduces the
+    # test install settings of the RoboFont backend:
+    # overlaps are removed, nothing is autohinted and
+    # the glyph names are not converted to production
+    # names. CFF outlines are always decomposed.
+
+    name = "ufo2ft"
+
+    def compile(self, source, outputPath, glyphOrder=None, profile=None):
+        import ufo2ft
+        from ufo2ft.filters import loadFilters
+        from autoInstall.glyphCache import (
+            glyphCache,
+            CachingOutlineOTFCompiler,
+            CachingRemoveOverlapsFilter
+        )
+        profile = getCompileProfile(profile)
+        # The glyph order and the filters change the
+        # font that is compiled, so open fonts are
+        # compiled from a snapshot.
+        if not isinstance(source, (str, FontSnapshot)):
+            source = takeSnapshot(source)
+        path = source
+        if not isinstance(source, str):
+            path = source.path
+        font = loadDefconFont(source)
+        if glyphOrder is not None and list(font.glyphOrder) != list(glyphOrder):
+            font.glyphOrder = list(glyphOrder)
+        feaIncludeDir = None
+        if path is not None:
+            feaIncludeDir = os.path.dirname(path)
+        options = dict(
+            useProductionNames=profile["productionNames"],
+            optimizeCFF=profile["optimizeCFF"],
+            feaIncludeDir=feaIncludeDir,
+            outlineCompilerClass=CachingOutlineOTFCompiler
+        )
+        # Overlaps are removed by a caching filter that
+        # runs after the components have been decomposed
+        # and before the font's own post filters.
+        glyphCache.maxSize = glyphCacheSize
+        if profile["removeOverlaps"]:
+            preFilters, postFilters = loadFilters(font)
+            options["filters"] = preFilters + [CachingRemoveOverlapsFilter()] + postFilters
+        if not profile["compileFeatures"]:
+            options["featureCompilerClass"] = _SkipFeatureCompiler
+        else:
+            from autoInstall.featureCache import CachingFeatureCompiler
+            options["featureCompilerClass"] = CachingFeatureCompiler
+        otf = ufo2ft.compileOTF(font, **options)
+        otf.save(outputPath)
+
+# -------------
+# ufo2ft Worker
+# -------------
+
+@registerCompileBackend
+class WorkerCompileBackend(CompileBackend):
+
+    # Compiles with the ufo2ft backend in a worker
+    # process. Font objects are sent as snapshots.
+
+    name = "ufo2ft-worker"
+
+    def compile(self, source, outputPath, glyphOrder=None, profile=None):
+        from autoInstall.workers import getWorkerPool
+        if not isinstance(source, (str, FontSnapshot)):
+            source = takeSnapshot(source)
+        if glyphOrder is not None:
+            glyphOrder = list(glyphOrder)
+        getWorkerPool().run("compileFont", source, outputPath, glyphOrder, profile)
+
+# ------------
+# Build Server
+# ------------
+
+@registerCompileBackend
+class BuildServerCompileBackend(CompileBackend):
+
+    # Sends the build to the shared local build
+    # server. Font objects are sent as snapshots.
+
+    name = "build-server"
+
+    def compile(self, source, outputPath, glyphOrder=None, profile=None):
+        from autoInstall.buildServer import compileWithBuildServer
+        if not isinstance(source, (str, FontSnapshot)):
+            source = takeSnapshot(source)
+        elif isinstance(source, str):
+            source = os.path.abspath(source)
+        if glyphOrder is not None:
+            glyphOrder = list(glyphOrder)
+        compileWithBuildServer(source, outputPath, glyphOrder=glyphOrder, profile=profile)
+
+class _SkipFeatureCompiler:
+
+    def __init__(self, ufo, ttFont=None, glyphSet=None, **kwargs):
+        self.ttFont = ttFont
+
+    def compile(self):
+        return self.ttFont
+
+# -------
+# Sources
+# -------
+
+def loadDefconFont(source):
+    import defcon
+    if isinstance(source, str):
+        return defcon.Font(source)
+    if isinstance(source, FontSnapshot):
+        return snapshotToDefcon(source)
+    if hasattr(source, "asDefcon"):
+        return source.asDefcon()
+    return source
+
+def snapshotToDefcon(snapshot):
+    import defcon
+    font = defcon.Font()
+    font.holdNotifications()
+    for attr, value in snapshot.info.items():
+        setattr(font.info, attr, copy.deepcopy(value))
+    font.kerning.update(snapshot.kerning)
+    for groupName, members in snapshot.groups.items():
+        font.groups[groupName] = list(members)
+    font.features.text = snapshot.features
+    font.lib.update(copy.deepcopy(snapshot.lib))
+    layer = font.layers.defaultLayer
+    for glyphName, glyphSnapshot in snapshot.glyphs.items():
+        glyph = layer.newGlyph(glyphName)
+        glyph.width = glyphSnapshot.width
+        glyph.height = glyphSnapshot.height
+        glyph.unicodes = list(glyphSnapshot.unicodes)
+        glyphSnapshot.drawPoints(glyph.getPointPen())
+        for anchorName, x, y in glyphSnapshot.anchors:
+            glyph.appendAnchor(dict(name=anchorName, x=x, y=y))
+        for key, value in glyphSnapshot.lib:
+            glyph.lib[key] = copy.deepcopy(value)
+    font.glyphOrder = list(snapshot.glyphOrder)
+    font.releaseHeldNotifications()
+    return font
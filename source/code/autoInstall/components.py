@@ -0,0 +1,80 @@
+# ---------------
+# Component Index
+# ---------------
+
+# A two way index of component references. It is
+# updated one glyph at a time so that it doesn't need
+# to be rebuilt after edits and the glyphs depending
+# on a glyph are found by only visiting those glyphs.
+
+class ComponentIndex:
+
+    def __init__(self, glyphs=()):
+        self._baseGlyphs = {}
+        self._composites = {}
+        for glyphName, baseGlyphs in glyphs:
+            self.setGlyph(glyphName, baseGlyphs)
+
+    @classmethod
+    def fromFont(cls, font):
+        # Works with fontParts and defcon fonts,
+        # defcon layers and FontSnapshot objects.
+        if hasattr(font, "asDefcon"):
+            font = font.asDefcon()
+        if hasattr(font, "layers"):
+            font = font.layers.defaultLayer
+        return cls(
+            (glyphName, getBaseGlyphs(font[glyphName]))
+            for glyphName in font.keys()
+        )
+
+    def __contains__(self, glyphName):
+        return glyphName in self._baseGlyphs
+
+    def setGlyph(self, glyphName, baseGlyphs):
+        baseGlyphs = set(baseGlyphs)
+        old = self._baseGlyphs.get(glyphName, set())
+        for baseGlyph in old - baseGlyphs:
+            composites = self._composites[baseGlyph]
+            composites.discard(glyphName)
+            if not composites:
+                del self._composites[baseGlyph]
+        for baseGlyph in baseGlyphs - old:
+            self._composites.setdefault(baseGlyph, set()).add(glyphName)
+        self._baseGlyphs[glyphName] = baseGlyphs
+
+    def removeGlyph(self, glyphName):
+        self.setGlyph(glyphName, ())
+        del self._baseGlyphs[glyphName]
+
+    def renameGlyph(self, oldName, newName):
+        baseGlyphs = self._baseGlyphs.get(oldName, set())
+        self.removeGlyph(oldName)
+        self.setGlyph(newName, baseGlyphs)
+
+    def getBaseGlyphs(self, glyphName):
+        return set(self._baseGlyphs.get(glyphName, ()))
+
+    def getComposites(self, glyphName):
+        return set(self._composites.get(glyphName, ()))
+
+    def getDependents(self, glyphNames):
+        if isinstance(glyphNames, str):
+            glyphNames = [glyphNames]
+        dependents = set()
+        stack = list(glyphNames)
+        while stack:
+            for composite in self._composites.get(stack.pop(), ()):
+                if composite not in dependents:
+                    dependents.add(composite)
+                    stack.append(composite)
+        return dependents
+
+def getBaseGlyphs(glyph):
+    baseGlyphs = []
+    for component in glyph.components:
+        if isinstance(component, tuple):
+            baseGlyphs.append(component[0])
+        else:
+            baseGlyphs.append(component.baseGlyph)
+    return baseGlyphs
@@ -0,0 +1,107 @@
+extensionIdentifier = "com.typesupply.AutoInstall"
+
+# ---------
+# Debugging
+# ---------
+
+DEBUG = ".robofontext" not in __file__.lower()
+DEBUG = False
+
+indent = ""
+
+def log(*args):
+    if not DEBUG:
+        return
+    global indent
+    if args:
+        a = args[0]
+        if isinstance(a, str):
+            if a.startswith(">"):
+                indent += " "
+    print(indent, *args)
+    if args:
+        a = args[0]
+        if isinstance(a, str):
+            if a.startswith("<"):
+                indent = indent[:-1]
+
+# --------------
+# Temp Lib Flags
+# --------------
+
+keyStub = extensionIdentifier + "."
+autoInstallKey = keyStub + "autoInstall"
+needsUpdateKey = keyStub + "needsUpdate"
+compileProfileKey = keyStub + "compileProfile"
+pendingChangesKey = keyStub + "pendingChanges"
+
+def getTempLib(font):
+    if font is None:
+        return {}
+    tempLib = font.asDefcon().tempLib
+    return tempLib
+
+def fontIsAutoInstalled(font):
+    tempLib = getTempLib(font)
+    return tempLib.get(autoInstallKey, False)
+
+def setFontIsAutoInstalled(font, state):
+    tempLib = getTempLib(font)
+    tempLib[autoInstallKey] = state
+    if not state:
+        tempLib[needsUpdateKey] = False
+
+def fontNeedsUpdate(font):
+    tempLib = getTempLib(font)
+    return tempLib.get(needsUpdateKey, False)
+
+def setFontNeedsUpdate(font, state, change=None):
+    tempLib = getTempLib(font)
+    tempLib[needsUpdateKey] = state
+    if not state:
+        tempLib[pendingChangesKey] = set()
+    elif change is not None:
+        tempLib.setdefault(pendingChangesKey, set()).add(change)
+
+def getFontPendingChanges(font):
+    tempLib = getTempLib(font)
+    return tempLib.get(pendingChangesKey, set())
+
+def getFontCompileProfile(font):
+    tempLib = getTempLib(font)
+    return tempLib.get(compileProfileKey)
+
+def setFontCompileProfile(font, profile):
+    tempLib = getTempLib(font)
+    tempLib[compileProfileKey] = profile
+
+
+# --------
+# Defaults
+# --------
+
+defaults = dict(
+    installAfterChangeDelay=5,
+    installAfterSave=False,
+    installAfterAppExit=True,
+    proofBuild=False,
+    proofText="",
+    proofCharacterSetPath="",
+    proofGSUBClosure=True,
+    compileBackend="robofont",
+    compileProfile="proof",
+    glyphCacheSize=128,
+    precompileWhileIdle=True,
+    designspaceStaticInstances=False,
+    bulkInstallConcurrency=2,
+    workerMaxBuilds=25,
+    workerMemoryLimit=2048,
+    workerPythonPath="",
+    buildServerSocketPath="",
+    recordSessionPath=""
+)
+
+defaults = {
+    extensionIdentifier + "." + key : value
+    for key, value in defaults.items()
+}
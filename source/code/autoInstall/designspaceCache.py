@@ -0,0 +1,103 @@
+import os
+import copy
+import threading
+from autoInstall.caches import LRUCache
+
+# -----------------
+# Designspace Cache
+# -----------------
+
+# Parsed designspace documents are kept until the file's
+# modification time or size changes. The resolved source
+# and instance paths are kept with them, along with an
+# index from each source path to the designspaces that
+# use it, so that a changed UFO leads straight to the
+# designspaces that need to be built again.
+
+class DesignspaceCache:
+
+    def __init__(self, maxCount=32):
+        self._entries = LRUCache(maxCount=maxCount)
+        self._sourceIndex = {}
+        self._lock = threading.Lock()
+
+    def _load(self, path):
+        from fontTools.designspaceLib import DesignSpaceDocument
+        path = os.path.abspath(path)
+        state = getFileState(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry["state"] == state:
+            return entry
+        document = DesignSpaceDocument.fromfile(path)
+        entry = dict(
+            state=state,
+            document=document,
+            sourcePaths=_resolvePaths(document.sources),
+            instancePaths=_resolvePaths(document.instances)
+        )
+        with self._lock:
+            for evictedPath in self._entries.set(path, entry):
+                self._unindex(evictedPath)
+            self._unindex(path)
+            for sourcePath in entry["sourcePaths"]:
+                self._sourceIndex.setdefault(sourcePath, set()).add(path)
+        return entry
+
+    def _unindex(self, path):
+        for sourcePath, designspacePaths in list(self._sourceIndex.items()):
+            designspacePaths.discard(path)
+            if not designspacePaths:
+                del self._sourceIndex[sourcePath]
+
+    def getDocument(self, path, copyDocument=False):
+        # Documents that will be changed must be copied.
+        document = self._load(path)["document"]
+        if copyDocument:
+            document = copy.deepcopy(document)
+        return document
+
+    def getSourcePaths(self, path):
+        return list(self._load(path)["sourcePaths"])
+
+    def getInstancePaths(self, path):
+        return list(self._load(path)["instancePaths"])
+
+    def getDesignspacesForSource(self, sourcePath, designspacePaths=None):
+        # Designspaces that haven't been loaded are
+        # only found if they are given. Stale entries
+        # are reloaded first.
+        if designspacePaths is not None:
+            for path in designspacePaths:
+                try:
+                    self._load(path)
+                except Exception:
+                    continue
+        with self._lock:
+            return sorted(self._sourceIndex.get(os.path.abspath(sourcePath), ()))
+
+    def discard(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._unindex(path)
+            self._entries.discard(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sourceIndex.clear()
+
+def getFileState(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _resolvePaths(descriptors):
+    return tuple(
+        os.path.abspath(descriptor.path)
+        for descriptor in descriptors
+        if descriptor.path
+    )
+
+designspaceCache = DesignspaceCache()
@@ -0,0 +1,153 @@
+import os
+import re
+
+# ------------------
+# Designspace Subset
+# ------------------
+
+# A subset limits a designspace build to part of the
+# family. Discrete axes are pinned at one value and
+# continuous axes are limited to a range, in user
+# coordinates:
+#
+#     ital=0 wght=300:700
+#
+# The subset is written as a new designspace document
+# that only contains the sources and instances needed
+# for it. A range is widened to the nearest sources on
+# either side, and to the default, so that everything
+# inside it interpolates exactly as it does in the full
+# designspace.
+
+def parseDesignspaceSubset(text):
+    subset = {}
+    for item in re.split(r"[,\s]+", text.strip()):
+        if not item:
+            continue
+        name, separator, value = item.partition("=")
+        if not separator or not name or not value:
+            raise ValueError(f"Invalid designspace subset: {item}")
+        minimum, separator, maximum = value.partition(":")
+        if separator:
+            subset[name] = (float(minimum), float(maximum))
+        else:
+            subset[name] = float(value)
+    return subset
+
+def makeSubsetDesignspace(designspacePath, subset, directory):
+    # Write the subset designspace into the directory
+    # with the same file name and return its path.
+    from autoInstall.designspaceCache import designspaceCache
+    document = designspaceCache.getDocument(designspacePath, copyDocument=True)
+    subsetDocument(document, subset)
+    for descriptor in document.sources + document.instances:
+        if descriptor.path is not None:
+            descriptor.path = os.path.abspath(descriptor.path)
+            descriptor.filename = None
+    path = os.path.join(directory, os.path.basename(designspacePath))
+    document.write(path)
+    return path
+
+def subsetDocument(document, subset):
+    axes = {}
+    for axis in document.axes:
+        axes[axis.name] = axis
+        axes[axis.tag] = axis
+    for name in subset:
+        if name not in axes:
+            raise ValueError(f"Unknown axis in designspace subset: {name}")
+    for name, value in subset.items():
+        axis = axes[name]
+        if isinstance(value, tuple):
+            _limitAxis(document, axis, *value)
+        else:
+            _pinAxis(document, axis, value)
+
+def _getDesignValue(descriptor, document, axis):
+    return descriptor.getFullDesignLocation(document)[axis.name]
+
+def _keep(document, axis, test):
+    document.sources = [
+        source for source in document.sources
+        if test(_getDesignValue(source, document, axis))
+    ]
+    document.instances = [
+        instance for instance in document.instances
+        if test(_getDesignValue(instance, document, axis))
+    ]
+    if not document.sources:
+        raise ValueError(f"The designspace subset leaves no sources on the {axis.name} axis.")
+
+def _pinAxis(document, axis, userValue):
+    if hasattr(axis, "values"):
+        if userValue not in axis.values:
+            raise ValueError(f"{userValue:g} is not a value of the {axis.name} axis.")
+        axis.values = [userValue]
+    else:
+        # A pinned continuous axis is an empty range.
+        _limitAxis(document, axis, userValue, userValue)
+        return
+    designValue = axis.map_forward(userValue)
+    _keep(document, axis, lambda value: value == designValue)
+    axis.default = userValue
+    axis.axisLabels = [label for label in axis.axisLabels if label.userValue == userValue]
+    _filterVariableFonts(document, axis, userValue, userValue)
+
+def _limitAxis(document, axis, userMinimum, userMaximum):
+    if hasattr(axis, "values"):
+        values = [value for value in axis.values if userMinimum <= value <= userMaximum]
+        if not values:
+            raise ValueError(f"No values of the {axis.name} axis are in the subset.")
+        if axis.default not in values:
+            axis.default = values[0]
+        axis.values = values
+        _keep(document, axis, lambda value: axis.map_backward(value) in values)
+        _filterVariableFonts(document, axis, min(values), max(values))
+        return
+    userMinimum = max(axis.minimum, min(userMinimum, axis.default))
+    userMaximum = min(axis.maximum, max(userMaximum, axis.default))
+    positions = sorted(set(
+        _getDesignValue(source, document, axis)
+        for source in document.sources
+    ))
+    designMinimum = axis.map_forward(userMinimum)
+    designMaximum = axis.map_forward(userMaximum)
+    below = [position for position in positions if position <= designMinimum]
+    above = [position for position in positions if position >= designMaximum]
+    lower = below[-1] if below else positions[0]
+    upper = above[0] if above else positions[-1]
+    _keep(document, axis, lambda value: lower <= value <= upper)
+    axis.minimum = axis.map_backward(lower)
+    axis.maximum = axis.map_backward(upper)
+    if axis.map:
+        axis.map = sorted(set(
+            [(axis.minimum, lower), (axis.maximum, upper)]
+            + [(user, design) for user, design in axis.map if lower <= design <= upper]
+        ))
+    axis.axisLabels = [
+        label for label in axis.axisLabels
+        if axis.minimum <= label.userValue <= axis.maximum
+    ]
+    _filterVariableFonts(document, axis, axis.minimum, axis.maximum)
+
+def _filterVariableFonts(document, axis, userMinimum, userMaximum):
+    # Variable fonts that were explicitly defined are
+    # dropped if they are outside the subset, and their
+    # ranges are clipped to it.
+    variableFonts = []
+    for variableFont in document.variableFonts:
+        keep = True
+        for axisSubset in variableFont.axisSubsets:
+            if axisSubset.name != axis.name:
+                continue
+            if hasattr(axisSubset, "userValue"):
+                keep = userMinimum <= axisSubset.userValue <= userMaximum
+            else:
+                axisSubset.userMinimum = max(axisSubset.userMinimum, userMinimum)
+                axisSubset.userMaximum = min(axisSubset.userMaximum, userMaximum)
+                if axisSubset.userDefault is not None:
+                    axisSubset.userDefault = min(max(axisSubset.userDefault, userMinimum), userMaximum)
+                keep = axisSubset.userMinimum <= axisSubset.userMaximum
+        if keep:
+            variableFonts.append(variableFont)
+    document.variableFonts = variableFonts
@@ -0,0 +1,120 @@
+import os
+import time
+import hashlib
+
+# -------------
+# Failure Cache
+# -------------
+
+# Failed builds are recorded with a digest of the
+# inputs that caused them. An item that failed is not
+# built again until its inputs change, and items that
+# keep failing wait an exponentially growing amount of
+# time before the next attempt.
+
+class FailureCache:
+
+    def __init__(self, baseDelay=2, maxDelay=300):
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self._failures = {}
+
+    def __contains__(self, key):
+        return key in self._failures
+
+    def __len__(self):
+        return len(self._failures)
+
+    def record(self, key, digest, error, now=None):
+        if now is None:
+            now = time.time()
+        count = 1
+        previous = self._failures.get(key)
+        if previous is not None:
+            count = previous["count"] + 1
+        delay = min(self.maxDelay, self.baseDelay * 2 ** (count - 1))
+        self._failures[key] = dict(
+            digest=digest,
+            error=error,
+            count=count,
+            time=now,
+            retryTime=now + delay
+        )
+        return delay
+
+    def clear(self, key):
+        self._failures.pop(key, None)
+
+    def clearAll(self):
+        self._failures.clear()
+
+    def getError(self, key):
+        failure = self._failures.get(key)
+        if failure is None:
+            return None
+        return failure["error"]
+
+    def getLatestError(self):
+        failures = sorted(self._failures.items(), key=lambda i: i[1]["time"])
+        if not failures:
+            return None
+        key, failure = failures[-1]
+        return key, failure["error"]
+
+    def getRetryDelay(self, key, now=None):
+        # The time until an item with changed
+        # inputs may be built again.
+        failure = self._failures.get(key)
+        if failure is None:
+            return 0
+        if now is None:
+            now = time.time()
+        return max(0, failure["retryTime"] - now)
+
+    def isKnownFailure(self, key, digest):
+        failure = self._failures.get(key)
+        return failure is not None and failure["digest"] == digest
+
+    def shouldSkip(self, key, digest, now=None):
+        if key not in self._failures:
+            return False
+        if self.isKnownFailure(key, digest):
+            return True
+        return self.getRetryDelay(key, now) > 0
+
+# -------------
+# Input Digests
+# -------------
+
+def getFileTreeDigest(paths):
+    # A digest of the modification times and sizes of
+    # the files at the paths. Directories, such as UFOs,
+    # are walked.
+    h = hashlib.sha1()
+    for path in sorted(paths):
+        h.update(path.encode("utf-8"))
+        if os.path.isdir(path):
+            for directory, directoryNames, fileNames in os.walk(path):
+                directoryNames.sort()
+                for fileName in sorted(fileNames):
+                    _updateFileDigest(h, os.path.join(directory, fileName))
+        else:
+            _updateFileDigest(h, path)
+    return h.hexdigest()
+
+def _updateFileDigest(h, path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        h.update(f"missing:{path}".encode("utf-8"))
+        return
+    h.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+
+def getDesignspaceInputDigest(designspacePath):
+    from autoInstall.designspaceCache import designspaceCache
+    paths = [designspacePath]
+    try:
+        paths += designspaceCache.getSourcePaths(designspacePath)
+    except Exception:
+        pass
+    return getFileTreeDigest(paths)
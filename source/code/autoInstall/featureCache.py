@@ -0,0 +1,188 @@
+import io
+import os
+import re
+import hashlib
+from fontTools.ttLib import TTFont, newTable
+from fontTools.feaLib import ast
+from fontTools.feaLib.parser import Parser
+from fontTools.otlLib.maxContextCalc import maxCtxFont
+from ufo2ft.featureCompiler import FeatureCompiler
+from ufo2ft.featureWriters import KernFeatureWriter
+from autoInstall.caches import LRUCache
+from autoInstall.kerning import appendGPOSFeatures
+
+# -------------
+# Feature Cache
+# -------------
+
+# Compiled layout tables are stored as binary data
+# so that every build gets its own objects. The key
+# covers everything the compiled tables depend on
+# except the kerning, which is compiled separately
+# and merged into the GPOS table after the cached
+# tables are restored. This lets glyph only edits
+# and masters with identical features skip feaLib.
+#
+# Features that write to other tables, with table
+# blocks or with names for stylistic sets and such,
+# are always compiled, because those tables are made
+# from the font info on every build. Kerning is only
+# compiled separately when the font has no anchors.
+# Otherwise its lookups would end up after the mark
+# lookups instead of before them.
+
+featureTableTags = ("GDEF", "GSUB", "GPOS")
+
+featureTableCache = LRUCache(
+    maxSize=64 * 1024 * 1024,
+    sizeFunction=lambda tables: sum(len(data) for data in tables.values())
+)
+
+featureWritersLibKey = "com.github.googlei18n.ufo2ft.featureWriters"
+kernFeaturePattern = re.compile(r"\bfeature\s+kern\b")
+includePattern = re.compile(r"\binclude\s*\(\s*([^)]+?)\s*\)")
+languageSystemPattern = re.compile(r"\blanguagesystem\s+[^;]+;")
+commentPattern = re.compile(r"#[^\n]*")
+uncachedFeaturePattern = re.compile(r"\b(table\s+(?!GDEF\b)\S+|featureNames|cvParameters|sizemenuname)\b")
+
+class CachingFeatureCompiler(FeatureCompiler):
+
+    def compile(self):
+        includeTexts = resolveIncludes(self.ufo.features.text or "", self.getIncludeDirectory())
+        if not self.canCache(includeTexts):
+            return super().compile()
+        separateKerning = self.canSeparateKerning()
+        if separateKerning:
+            self.featureWriters = [
+                writer for writer in self.featureWriters
+                if not isinstance(writer, KernFeatureWriter)
+            ]
+        key = self.getCacheKey(includeTexts, includeKerning=not separateKerning)
+        tables = featureTableCache.get(key)
+        if tables is None:
+            super().compile()
+            tables = {
+                tag: self.ttFont[tag].compile(self.ttFont)
+                for tag in featureTableTags
+                if tag in self.ttFont
+            }
+            featureTableCache.set(key, tables)
+        else:
+            for tag, data in tables.items():
+                table = newTable(tag)
+                table.decompile(data, self.ttFont)
+                self.ttFont[tag] = table
+        if separateKerning:
+            self.compileKerning(includeTexts)
+        if "OS/2" in self.ttFont:
+            self.ttFont["OS/2"].usMaxContext = maxCtxFont(self.ttFont)
+        return self.ttFont
+
+    def canCache(self, includeTexts):
+        for text in [self.ufo.features.text or ""] + includeTexts:
+            if uncachedFeaturePattern.search(text):
+                return False
+        return True
+
+    def canSeparateKerning(self):
+        if featureWritersLibKey in self.ufo.lib:
+            return False
+        if not any(isinstance(writer, KernFeatureWriter) for writer in self.featureWriters):
+            return False
+        text = self.ufo.features.text or ""
+        if kernFeaturePattern.search(text):
+            return False
+        for glyphName in self.glyphSet.keys():
+            if self.glyphSet[glyphName].anchors:
+                return False
+        return True
+
+    def getIncludeDirectory(self):
+        includeDirectory = getattr(self, "feaIncludeDir", None)
+        if includeDirectory is None and self.ufo.path is not None:
+            includeDirectory = os.path.dirname(self.ufo.path)
+        return includeDirectory
+
+    def getCacheKey(self, includeTexts, includeKerning):
+        h = hashlib.sha1()
+        text = self.ufo.features.text or ""
+        h.update(text.encode("utf-8"))
+        for includeText in includeTexts:
+            h.update(includeText.encode("utf-8"))
+        h.update(repr(self.ttFont.getGlyphOrder()).encode("utf-8"))
+        h.update(repr(sorted(
+            (groupName, list(members))
+            for groupName, members in self.ufo.groups.items()
+        )).encode("utf-8"))
+        h.update(repr(sorted(self.ufo.lib.get("public.openTypeCategories", {}).items())).encode("utf-8"))
+        h.update(repr([writer.__class__.__name__ for writer in self.featureWriters]).encode("utf-8"))
+        # The generated mark, cursive and GDEF features
+        # depend on the anchors and the code points.
+        for glyphName in sorted(self.glyphSet.keys()):
+            glyph = self.glyphSet[glyphName]
+            h.update(repr((
+                glyphName,
+                tuple(glyph.unicodes),
+                tuple((anchor.name, anchor.x, anchor.y) for anchor in glyph.anchors)
+            )).encode("utf-8"))
+        if includeKerning:
+            h.update(repr(sorted(self.ufo.kerning.items())).encode("utf-8"))
+        return h.hexdigest()
+
+    def compileKerning(self, includeTexts):
+        kernFont = TTFont()
+        kernFont.setGlyphOrder(self.ttFont.getGlyphOrder())
+        # The kern writer uses the character mapping and
+        # the substitutions to split the kerning by script.
+        for tag in ("cmap", "GSUB", "GDEF"):
+            if tag in self.ttFont:
+                kernFont[tag] = self.ttFont[tag]
+        compiler = _KerningFeatureCompiler(
+            self.ufo,
+            ttFont=kernFont,
+            glyphSet=self.glyphSet,
+            featureWriters=[KernFeatureWriter]
+        )
+        # The kern writer registers the feature for
+        # the font's language systems.
+        compiler.languageSystems = [
+            statement
+            for text in [self.ufo.features.text or ""] + includeTexts
+            for statement in languageSystemPattern.findall(commentPattern.sub("", text))
+        ]
+        compiler.compile()
+        if "GPOS" in kernFont:
+            appendGPOSFeatures(self.ttFont, kernFont["GPOS"].table)
+
+class _KerningFeatureCompiler(FeatureCompiler):
+
+    languageSystems = ()
+
+    def setupFeatures(self):
+        featureFile = ast.FeatureFile()
+        if self.languageSystems:
+            featureFile = Parser(io.StringIO("\n".join(self.languageSystems))).parse()
+        for writer in self.featureWriters:
+            writer.write(self.ufo, featureFile, compiler=self)
+        self.features = featureFile.asFea()
+
+def resolveIncludes(text, directory, seen=None):
+    if seen is None:
+        seen = set()
+    contents = []
+    for match in includePattern.finditer(text):
+        path = match.group(1)
+        if directory is not None:
+            path = os.path.join(directory, path)
+        if path in seen:
+            continue
+        seen.add(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                includeText = f.read()
+        except OSError:
+            contents.append(f"missing:{path}")
+            continue
+        contents.append(includeText)
+        contents.extend(resolveIncludes(includeText, directory, seen))
+    return contents
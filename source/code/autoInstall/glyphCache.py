@@ -0,0 +1,105 @@
+import hashlib
+from fontTools.misc.psCharStrings import T2CharString
+from fontTools.misc.roundTools import otRound
+from fontTools.pens.recordingPen import RecordingPointPen
+from ufo2ft.constants import EXPLICIT_CLOSING_LINE_KEY
+from ufo2ft.outlineCompiler import OutlineOTFCompiler
+from ufo2ft.filters.removeOverlaps import RemoveOverlapsFilter
+from autoInstall.caches import LRUCache
+
+# -----------
+# Glyph Cache
+# -----------
+
+# A content addressed cache of per glyph build
+# results. Entries are keyed by a digest of the glyph
+# outline and the options that affect the result, so
+# identical glyphs are shared between rebuilds and
+# between fonts. The cache is capped by an estimate
+# of its memory use.
+
+def _estimateSize(value):
+    size = 64
+    for item in value:
+        if isinstance(item, (list, tuple)):
+            size += 32 * len(item)
+        else:
+            size += 16
+    return size
+
+glyphCache = LRUCache(
+    maxSize=128 * 1024 * 1024,
+    sizeFunction=_estimateSize
+)
+
+def getOutlineDigest(glyph):
+    # Point identifiers are left out so that identical
+    # outlines from different fonts get the same digest.
+    pen = RecordingPointPen()
+    glyph.drawPoints(pen)
+    value = [
+        (method, args, {k: v for k, v in kwargs.items() if k != "identifier"})
+        for method, args, kwargs in pen.value
+    ]
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+# ---------------
+# Overlap Removal
+# ---------------
+
+class CachingRemoveOverlapsFilter(RemoveOverlapsFilter):
+
+    def filter(self, glyph):
+        if not len(glyph):
+            return False
+        key = ("removeOverlaps", repr(self.options), getOutlineDigest(glyph))
+        cached = glyphCache.get(key)
+        if cached is not None:
+            modified, points = cached
+            if modified:
+                glyph.clearContours()
+                _replayPoints(points, glyph.getPointPen())
+            return modified
+        modified = super().filter(glyph)
+        pen = RecordingPointPen()
+        if modified:
+            glyph.drawPoints(pen)
+        glyphCache.set(key, (modified, pen.value))
+        return modified
+
+def _replayPoints(points, pointPen):
+    for method, args, kwargs in points:
+        getattr(pointPen, method)(*args, **kwargs)
+
+# -----------
+# Charstrings
+# -----------
+
+class CachingOutlineOTFCompiler(OutlineOTFCompiler):
+
+    def getCharStringForGlyph(self, glyph, private, globalSubrs=None):
+        if glyph.components:
+            return super().getCharStringForGlyph(glyph, private, globalSubrs)
+        width = glyph.width
+        if width == private.defaultWidthX:
+            width = None
+        else:
+            width = otRound(width - private.nominalWidthX)
+        key = (
+            "charString",
+            width,
+            getattr(self, "roundTolerance", None),
+            getattr(self, "optimizeCFF", None),
+            bool(glyph.lib.get(EXPLICIT_CLOSING_LINE_KEY)),
+            getOutlineDigest(glyph)
+        )
+        program = glyphCache.get(key)
+        if program is None:
+            charString = super().getCharStringForGlyph(glyph, private, globalSubrs)
+            glyphCache.set(key, list(charString.program))
+            return charString
+        return T2CharString(
+            program=list(program),
+            private=private,
+            globalSubrs=globalSubrs
+        )
@@ -0,0 +1,90 @@
+import os
+import glob
+import hashlib
+import itertools
+import threading
+
+# -------------
+# Install Slots
+# -------------
+
+# Each font is installed at a stable path so that the
+# system registers the same file name on every install.
+# Builds are written to hidden generation files next to
+# the stable path. A finished generation is moved onto
+# the stable path with an atomic rename. The previous
+# generation is kept as a hidden retired file, because
+# other apps may still be reading it. It is deleted when
+# a later generation replaces it.
+
+class InstallSlot:
+
+    def __init__(self, directory, name, keepRetired=1, extension=".otf"):
+        self.directory = directory
+        self.name = name
+        self.keepRetired = keepRetired
+        self.extension = extension
+        self.path = os.path.join(directory, name + extension)
+        self._generations = itertools.count(1)
+        self._lock = threading.Lock()
+        self._retired = []
+
+    def newGenerationPath(self):
+        # Safe to call from build threads.
+        with self._lock:
+            generation = next(self._generations)
+        return os.path.join(self.directory, f".{self.name}.{generation}{self.extension}")
+
+    def isGenerationPath(self, path):
+        fileName = os.path.basename(path)
+        return fileName.startswith(f".{self.name}.") and os.path.dirname(path) == self.directory
+
+    def swap(self, generationPath):
+        # Move a finished generation onto the stable
+        # path and return the stable path.
+        if os.path.exists(self.path):
+            retiredPath = generationPath + ".retired"
+            try:
+                os.link(self.path, retiredPath)
+                self._retired.append(retiredPath)
+            except OSError:
+                pass
+        os.replace(generationPath, self.path)
+        while len(self._retired) > self.keepRetired:
+            _removeFile(self._retired.pop(0))
+        return self.path
+
+    def discard(self, generationPath):
+        _removeFile(generationPath)
+
+    def remove(self):
+        _removeFile(self.path)
+        for path in self._retired:
+            _removeFile(path)
+        self._retired = []
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f".{glob.escape(self.name)}.*")):
+            _removeFile(path)
+
+def _removeFile(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def makeSourceSlotName(sourcePath):
+    # Sources with the same name in different
+    # folders get different slots.
+    sourcePath = os.path.abspath(sourcePath)
+    name = os.path.splitext(os.path.basename(sourcePath))[0]
+    identifier = hashlib.sha1(sourcePath.encode("utf-8")).hexdigest()[:10]
+    return f"{name}_{identifier}"
+
+def makeInstallSlotName(familyName, styleName, sourcePath=None):
+    # Fonts with a path get the same slot in every
+    # session. Unsaved fonts get a unique slot.
+    if sourcePath:
+        identifier = hashlib.sha1(os.path.abspath(sourcePath).encode("utf-8")).hexdigest()[:10]
+    else:
+        import uuid
+        identifier = uuid.uuid1().hex[:10]
+    return f"{familyName}-{styleName}_{identifier}"
@@ -0,0 +1,547 @@
+import os
+import shutil
+import weakref
+import pathlib
+import tempfile
+import traceback
+import AppKit
+from lib.tools import fontInstaller
+from lib.settings import applicationTestInstallRootPath
+from mojo.UI import getDefault, setDefault
+from mojo.events import publishEvent
+from autoInstall.installSlots import (
+    InstallSlot,
+    makeInstallSlotName
+)
+
+# The compile backends, the proof subsetter, the
+# kerning compiler, Prepolator and the designspace
+# builder are imported when they are first needed.
+
+# ---------
+# Installer
+# ---------
+
+installProgressIncrements = 3
+
+def installFont(font, progressBar=None, glyphNames=None, backend=None, profile=None, snapshot=None):
+    # A snapshot of the font that was already taken
+    # is compiled instead of taking another one, except
+    # by RoboFont's generator, which needs the font.
+    from autoInstall.compilers import getCompileBackend
+    if progressBar is not None:
+        progressBar.increment()
+    source = font
+    if snapshot is not None and backend != "robofont":
+        source = snapshot
+    if glyphNames is not None:
+        from autoInstall.proofSubset import makeProofFont
+        source = makeProofFont(font, glyphNames)
+    # compile
+    fontPath = makeFontInstallPath(font)
+    publishEvent(
+        "fontWillTestInstall",
+        font=font.asDefcon(),
+        format="otf"
+    )
+    error = None
+    try:
+        getCompileBackend(backend).compile(
+            source,
+            fontPath,
+            glyphOrder=font.glyphOrder,
+            profile=profile
+        )
+    except Exception as e:
+        error = traceback.format_exception_only(type(e), e)[-1].strip()
+        print(f"Error generating {font.path}.")
+        print(error)
+    if progressBar is not None:
+        progressBar.increment()
+    installError = activateFont(font, fontPath, error is None, progressBar)
+    return error or installError
+
+def installFontKerning(font, builder, progressBar=None):
+    # Update only the kerning of the previously
+    # installed binary. Returns False if that isn't
+    # possible and the font needs a full install.
+    app = AppKit.NSApp()
+    oldFontIdentifier = app._installedFonts.get(font.asDefcon())
+    if oldFontIdentifier is None:
+        return False
+    oldFontPath = oldFontIdentifier.get("fontPath")
+    if oldFontPath is None or not os.path.exists(oldFontPath):
+        return False
+    from fontTools.ttLib import TTLibError
+    from autoInstall.featureCache import featureWritersLibKey, resolveIncludes
+    from autoInstall.kerning import rebuildKerning, featuresDefineKerning
+    # Kerning from the features or from configured
+    # feature writers needs a full build.
+    if featureWritersLibKey in font.lib:
+        return False
+    featureText = font.features.text or ""
+    includeDirectory = None
+    if font.path is not None:
+        includeDirectory = os.path.dirname(font.path)
+    if featuresDefineKerning([featureText] + resolveIncludes(featureText, includeDirectory)):
+        return False
+    if progressBar is not None:
+        progressBar.increment()
+    fontPath = makeFontInstallPath(font)
+    skippedGlyphNames = set(font.lib.get("public.skipExportGlyphs", []))
+    try:
+        didGenerate = rebuildKerning(
+            oldFontPath,
+            fontPath,
+            dict(font.kerning.items()),
+            dict(font.groups.items()),
+            builder,
+            glyphNames=[glyphName for glyphName in font.keys() if glyphName not in skippedGlyphNames]
+        )
+    except (OSError, TTLibError) as e:
+        # The old binary couldn't be read or the
+        # new one couldn't be written.
+        didGenerate = False
+        print(f"Error updating the kerning in {font.path}.")
+        print(traceback.format_exception_only(type(e), e)[-1].strip())
+    if not didGenerate:
+        if os.path.exists(fontPath):
+            os.remove(fontPath)
+        return False
+    publishEvent(
+        "fontWillTestInstall",
+        font=font.asDefcon(),
+        format="otf"
+    )
+    if progressBar is not None:
+        progressBar.increment()
+    activateFont(font, fontPath, didGenerate, progressBar)
+    return True
+
+def installPrecompiledFont(font, fontPath, progressBar=None):
+    publishEvent(
+        "fontWillTestInstall",
+        font=font.asDefcon(),
+        format="otf"
+    )
+    if progressBar is not None:
+        progressBar.increment()
+        progressBar.increment()
+    return activateFont(font, fontPath, True, progressBar)
+
+installSlots = weakref.WeakKeyDictionary()
+
+def getInstallSlot(font):
+    key = font.asDefcon()
+    slot = installSlots.get(key)
+    if slot is None:
+        name = makeInstallSlotName(font.info.familyName, font.info.styleName, font.path)
+        slot = installSlots[key] = InstallSlot(applicationTestInstallRootPath, name)
+    return slot
+
+def makeFontInstallPath(font):
+    # Builds are written to a new generation of the
+    # font's install slot and swapped in when activated.
+    return getInstallSlot(font).newGenerationPath()
+
+def activateFont(font, fontPath, didGenerate, progressBar=None):
+    # Returns an error message if the font
+    # was generated but couldn't be installed.
+    error = None
+    app = AppKit.NSApp()
+    slot = getInstallSlot(font)
+    # remove old
+    if didGenerate:
+        uninstallFont(font, keepPaths=[slot.path])
+    else:
+        uninstallFont(font)
+        slot.discard(fontPath)
+    if progressBar is not None:
+        progressBar.increment()
+    # install new
+    if didGenerate:
+        if slot.isGenerationPath(fontPath):
+            fontPath = slot.swap(fontPath)
+        didInstall, report = fontInstaller.installFont(fontPath, False)
+        if didInstall:
+            fontIdentifier = dict(
+                fontPath=fontPath,
+                name=f"{font.info.familyName} {font.info.styleName}"
+            )
+            app._installedFonts[font.asDefcon()] = fontIdentifier
+            doodleTestInstalledFonts = dict(getDefault("DoodleTestInstalledFonts", {}))
+            doodleTestInstalledFonts[fontPath] = fontIdentifier
+            setDefault("DoodleTestInstalledFonts", doodleTestInstalledFonts)
+        else:
+            error = f"Error installing: {report}"
+            print(f"Error installing {font.path}.")
+            print(report)
+        publishEvent(
+            "fontDidTestInstall",
+            font=font.asDefcon(),
+            format="otf",
+            succes=didInstall,
+            success=didInstall,
+            report=report
+        )
+    if progressBar is not None:
+        progressBar.increment()
+    return error
+
+def uninstallFont(font, keepPaths=()):
+    # Files in keepPaths are unregistered but not
+    # deleted, so that a new generation can replace them.
+    app = AppKit.NSApp()
+    slot = installSlots.get(font.asDefcon())
+    oldFontIdentifier = app._installedFonts.get(font.asDefcon())
+    if oldFontIdentifier is None:
+        oldFontIdentifier = {}
+        name = f"{font.info.familyName} {font.info.styleName}"
+        for font, info in app._installedFonts.items():
+            if info.get("name", "") == name:
+                oldFontIdentifier = info
+                break
+    oldFontPath = oldFontIdentifier.get("fontPath")
+    if oldFontPath is not None:
+        publishEvent(
+            "fontWillTestDeinstall",
+            font=font.asDefcon()
+        )
+        fontInstaller.uninstallFont(oldFontPath)
+        if oldFontPath not in keepPaths:
+            if os.path.exists(oldFontPath):
+                os.remove(oldFontPath)
+            if slot is not None and oldFontPath == slot.path:
+                slot.remove()
+        del app._installedFonts[font.asDefcon()]
+        doodleTestInstalledFonts = dict(getDefault("DoodleTestInstalledFonts", {}))
+        del doodleTestInstalledFonts[oldFontPath]
+        setDefault("DoodleTestInstalledFonts", doodleTestInstalledFonts)
+        publishEvent(
+            "fontDidTestDeinstall",
+            font=font.asDefcon()
+        )
+
+def getPrepolator():
+    try:
+        from prepolator import OpenPrepolator
+    except ModuleNotFoundError:
+        return None
+    return OpenPrepolator
+
+def installDesignspace(designspacePath, previousFontPaths=[], progressBar=None, useWorkers=False, staticInstances=False, profile=None, subset=None):
+    if progressBar is not None:
+        progressBar.increment()
+    # compile
+    publishEvent(
+        "designspaceWillTestInstall",
+        path=designspacePath
+    )
+    compile = True
+    unresolvable = []
+    OpenPrepolator = getPrepolator()
+    if OpenPrepolator is not None:
+        prepDoc = OpenPrepolator(
+            designspacePath=designspacePath,
+            showInterface=False
+        )
+        prepDoc.strictOffCurves = True
+        prepDoc.strictComponents = True
+        prepDoc.strictAnchors = False
+        prepDoc.strictGuidelines = False
+        for discreteLocation in prepDoc.getCompatibilitySpaceIdentifiers():
+            for glyphName in prepDoc.getCompatibilitySpaceGlyphNames(discreteLocation):
+                group = prepDoc.getCompatibilityGroupForGlyphName(glyphName, discreteLocation)
+                if group.unresolvableCompatibility:
+                    compile = False
+                    unresolvable.append(glyphName)
+                    print(f"Unresolvable Compatibility: {glyphName}")
+                else:
+                    for glyph in group.glyphs:
+                        if group.getGlyphIsIncompatible(glyph):
+                            group.matchModel(glyphs=[glyph])
+                        elif group.getGlyphConfidence(glyph) <= 0.9:
+                            group.matchModel(glyphs=[glyph])
+        prepDoc.saveFonts()
+    error = None
+    if not compile:
+        fontPaths = []
+        error = "Unresolvable compatibility: " + " ".join(sorted(set(unresolvable)))
+    else:
+        with tempfile.TemporaryDirectory() as subsetRoot:
+            try:
+                buildPath = designspacePath
+                if subset:
+                    from autoInstall.designspaceSubset import makeSubsetDesignspace
+                    buildPath = makeSubsetDesignspace(designspacePath, subset, subsetRoot)
+                if staticInstances:
+                    fontPaths = _buildDesignspaceInstances(designspacePath, profile, buildPath=buildPath)
+                elif useWorkers:
+                    fontPaths = _buildDesignspaceInWorker(designspacePath, buildPath=buildPath)
+                else:
+                    fontPaths = _buildDesignspace(designspacePath, progressBar=None, buildPath=buildPath)
+            except Exception as e:
+                fontPaths = []
+                error = traceback.format_exception_only(type(e), e)[-1].strip()
+                print(f"Error generating {designspacePath}.")
+                print(error)
+    if error is None and not fontPaths:
+        error = "No fonts were generated."
+    if progressBar is not None:
+        progressBar.increment()
+    # remove old
+    uninstallDesignspace(
+        designspacePath,
+        list(set(fontPaths + previousFontPaths)),
+        doNotRemove=fontPaths
+    )
+    if progressBar is not None:
+        progressBar.increment()
+    # install new
+    installedFontPaths = []
+    for fontPath in fontPaths:
+        didInstall, report = fontInstaller.installFont(fontPath, False)
+        if didInstall:
+            installedFontPaths.append(fontPath)
+        else:
+            print(f"Error installing {fontPath}.")
+            print(report)
+    if installedFontPaths:
+        doodleTestInstalledFonts = dict(getDefault("DoodleTestInstalledFonts", {}))
+        for fontPath in installedFontPaths:
+            fontIdentifier = dict(
+                fontPath=fontPath,
+                name=os.path.basename(fontPath)
+            )
+            # XXX
+            # don't store a reference to the font object
+            # because there is no font to reference:
+            # app._installedFonts[font.asDefcon()] = fontIdentifier
+            doodleTestInstalledFonts[fontPath] = fontIdentifier
+        setDefault("DoodleTestInstalledFonts", doodleTestInstalledFonts)
+    if installedFontPaths:
+        publishEvent(
+            "designspaceDidTestInstall",
+            path=designspacePath,
+            fontPaths=installedFontPaths
+        )
+    if progressBar is not None:
+        progressBar.increment()
+    return fontPaths, error
+
+pinSlots = {}
+
+def _popPinSlot(fontPath):
+    for variableFontPath, slot in pinSlots.items():
+        if slot.path == fontPath:
+            return pinSlots.pop(variableFontPath)
+    return None
+
+def installDesignspaceLocation(designspacePath, variableFontPaths, location, previousFontPaths=[]):
+    # Installs a static font pinned at the location for
+    # each of the designspace's built variable fonts.
+    # Returns the paths of the installed fonts and an
+    # error message.
+    from autoInstall.instances import pinVariableFont
+    fontPaths = []
+    error = None
+    for variableFontPath in variableFontPaths:
+        if not os.path.exists(variableFontPath):
+            continue
+        slot = pinSlots.get(variableFontPath)
+        if slot is None:
+            name = os.path.splitext(os.path.basename(variableFontPath))[0] + "-pinned"
+            directory = os.path.dirname(variableFontPath)
+            slot = pinSlots[variableFontPath] = InstallSlot(directory, name, extension=".ttf")
+        generationPath = slot.newGenerationPath()
+        try:
+            didPin = pinVariableFont(variableFontPath, location, generationPath)
+        except Exception as e:
+            slot.discard(generationPath)
+            error = traceback.format_exception_only(type(e), e)[-1].strip()
+            break
+        if not didPin:
+            slot.discard(generationPath)
+            continue
+        if os.path.exists(slot.path):
+            fontInstaller.uninstallFont(slot.path)
+        fontPath = slot.swap(generationPath)
+        didInstall, report = fontInstaller.installFont(fontPath, False)
+        if didInstall:
+            fontPaths.append(fontPath)
+        else:
+            error = report
+    if error is None and not fontPaths:
+        error = "No built variable font contains the location."
+    stalePaths = [fontPath for fontPath in previousFontPaths if fontPath not in fontPaths]
+    if stalePaths:
+        uninstallDesignspace(designspacePath, stalePaths)
+    if fontPaths:
+        doodleTestInstalledFonts = dict(getDefault("DoodleTestInstalledFonts", {}))
+        for fontPath in fontPaths:
+            doodleTestInstalledFonts[fontPath] = dict(
+                fontPath=fontPath,
+                name=os.path.basename(fontPath)
+            )
+        setDefault("DoodleTestInstalledFonts", doodleTestInstalledFonts)
+        publishEvent(
+            "designspaceDidTestInstall",
+            path=designspacePath,
+            fontPaths=fontPaths
+        )
+    return fontPaths, error
+
+def uninstallDesignspace(designspacePath, fontPaths, doNotRemove=[]):
+    # XXX
+    # no need to get the font object from the
+    # app because there is no reference there.
+    publishEvent(
+        "designspaceWillTestDeinstall",
+        path=designspacePath,
+        fontPaths=fontPaths
+    )
+    doodleTestInstalledFonts = dict(getDefault("DoodleTestInstalledFonts", {}))
+    for fontPath in fontPaths:
+        fontInstaller.uninstallFont(fontPath)
+        if fontPath not in doNotRemove:
+            slot = _popPinSlot(fontPath)
+            if slot is not None:
+                # The retired generations of a pinned
+                # font are removed with it.
+                slot.remove()
+            elif os.path.exists(fontPath):
+                os.remove(fontPath)
+        if fontPath in doodleTestInstalledFonts:
+            del doodleTestInstalledFonts[fontPath]
+    setDefault("DoodleTestInstalledFonts", doodleTestInstalledFonts)
+    publishEvent(
+        "designspaceDidTestDeinstall",
+        path=designspacePath,
+        fontPaths=fontPaths
+    )
+    designspacePath = pathlib.Path(designspacePath)
+    directory = designspacePath.parent.joinpath("_AutoInstall")
+    if directory.exists():
+        contents = list(directory.iterdir())
+        if not contents:
+            shutil.rmtree(directory)
+
+def installFontFiles(fontPaths):
+    # Activates binaries that have no font object,
+    # such as bulk installs. The installed fonts are
+    # registered together. Returns the installed
+    # paths and the error messages.
+    installedFontPaths = []
+    errors = []
+    for fontPath in fontPaths:
+        didInstall, report = fontInstaller.installFont(fontPath, False)
+        if didInstall:
+            installedFontPaths.append(fontPath)
+        else:
+            errors.append(f"Error installing {os.path.basename(fontPath)}: {report}")
+    if installedFontPaths:
+        doodleTestInstalledFonts = dict(getDefault("DoodleTestInstalledFonts", {}))
+        for fontPath in installedFontPaths:
+            doodleTestInstalledFonts[fontPath] = dict(
+                fontPath=fontPath,
+                name=os.path.basename(fontPath)
+            )
+        setDefault("DoodleTestInstalledFonts", doodleTestInstalledFonts)
+    return installedFontPaths, errors
+
+def uninstallFontFiles(fontPaths):
+    # The files are kept so that they can be
+    # activated again without being rebuilt.
+    doodleTestInstalledFonts = dict(getDefault("DoodleTestInstalledFonts", {}))
+    for fontPath in fontPaths:
+        fontInstaller.uninstallFont(fontPath)
+        doodleTestInstalledFonts.pop(fontPath, None)
+    setDefault("DoodleTestInstalledFonts", doodleTestInstalledFonts)
+
+# XXX
+# This designspace compiler is temporary until the Batch API is ready.
+
+def _buildDesignspace(designspacePath, progressBar=None, buildPath=None):
+    from batch import (
+        variableFontsGenerator,
+        Report
+    )
+    directory = pathlib.Path(designspacePath).parent
+    root = directory.joinpath("_AutoInstall")
+    built = []
+    with tempfile.TemporaryDirectory() as tempRoot:
+        report = Report()
+        variableFontsGenerator.build(
+            root=tempRoot,
+            generateOptions=dict(
+                variableFontGenerate_OTF=False,
+                variableFontGenerate_OTFWOFF2=False,
+                variableFontGenerate_TTF=True,
+                variableFontGenerate_TTFWOFF2=False,
+                sourceDesignspacePaths=[
+                    str(buildPath or designspacePath)
+                ]
+            ),
+            settings=dict(
+                variableFontsAutohint=False,
+                variableFontsInterpolateToFitAxesExtremes=False,
+                batchSettingExportDebug=False,
+                batchSettingExportInSubFolders=False
+            ),
+            progress=progressBar,
+            report=report
+        )
+        report = report.get()
+        if "Generate failed" in report:
+            print(report)
+        if not root.exists():
+            root.mkdir()
+        for tempPath in pathlib.Path(tempRoot).joinpath("Variable").glob("*.ttf"):
+            path = root.joinpath(tempPath.name)
+            if path.exists():
+                os.remove(path)
+            os.rename(
+                tempPath,
+                path
+            )
+            built.append(str(path))
+    return built
+
+def _buildDesignspaceInWorker(designspacePath, buildPath=None):
+    from autoInstall.workers import getWorkerPool
+    # Batch needs RoboFont, so variable fonts built
+    # in a worker are compiled with ufo2ft instead.
+    directory = pathlib.Path(designspacePath).parent
+    root = directory.joinpath("_AutoInstall")
+    built = []
+    with tempfile.TemporaryDirectory() as tempRoot:
+        tempPaths = getWorkerPool().run("compileDesignspace", str(buildPath or designspacePath), tempRoot)
+        if not root.exists():
+            root.mkdir()
+        for tempPath in tempPaths:
+            path = root.joinpath(os.path.basename(tempPath))
+            if path.exists():
+                os.remove(path)
+            os.rename(
+                tempPath,
+                path
+            )
+            built.append(str(path))
+    return built
+
+def _buildDesignspaceInstances(designspacePath, profile=None, buildPath=None):
+    from autoInstall.instances import compileInstances
+    # The named instances are interpolated here and
+    # compiled as static fonts in the worker pool.
+    directory = pathlib.Path(designspacePath).parent
+    root = directory.joinpath("_AutoInstall")
+    built = []
+    with tempfile.TemporaryDirectory() as tempRoot:
+        tempPaths = compileInstances(str(buildPath or designspacePath), tempRoot, profile=profile)
+        if not root.exists():
+            root.mkdir()
+        for tempPath in tempPaths:
+            path = root.joinpath(os.path.basename(tempPath))
+            os.replace(tempPath, path)
+            built.append(str(path))
+    return built
@@ -0,0 +1,336 @@
+import os
+import re
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from autoInstall.components import ComponentIndex
+from autoInstall.snapshot import (
+    GlyphSnapshot,
+    FontSnapshot,
+    takeSnapshot
+)
+
+try:
+    import numpy
+except ModuleNotFoundError:
+    numpy = None
+
+# ----------------
+# Static Instances
+# ----------------
+
+# The named instances of a designspace are interpolated
+# all at once. Every value that varies (glyph widths,
+# coordinates, component transformations, anchors,
+# kerning and numeric font info) is laid out in one row
+# per master. The rows are multiplied by a matrix that
+# holds the master scalars of every instance, which
+# gives one row of values per instance. Without NumPy
+# the same sums are done in Python.
+
+instanceNameInfoAttributes = (
+    "styleMapFamilyName",
+    "styleMapStyleName",
+    "postscriptFontName",
+    "postscriptFullName",
+    "openTypeNamePreferredFamilyName",
+    "openTypeNamePreferredSubfamilyName",
+    "openTypeNameCompatibleFullName",
+    "openTypeNameWWSFamilyName",
+    "openTypeNameWWSSubfamilyName",
+    "openTypeNameUniqueID"
+)
+
+staticInfoAttributes = (
+    "unitsPerEm",
+    "versionMajor",
+    "versionMinor",
+    "openTypeHeadCreated",
+    "openTypeOS2Type",
+    "postscriptIsFixedPitch"
+)
+
+def interpolateInstances(designspacePath):
+    # Returns (instance name, FontSnapshot) pairs
+    # for every instance in every discrete subspace.
+    from fontTools.designspaceLib.split import splitInterpolable
+    from autoInstall.designspaceCache import designspaceCache
+    document = designspaceCache.getDocument(designspacePath)
+    results = []
+    for discreteLocation, subDocument in splitInterpolable(document):
+        if subDocument.instances:
+            results.extend(_interpolateDocument(subDocument))
+    return results
+
+def _interpolateDocument(document):
+    import defcon
+    from fontTools.varLib.models import VariationModel
+    # Sparse layer sources are not supported here.
+    sources = [source for source in document.sources if not source.layerName]
+    default = document.findDefault()
+    if default is None or default.layerName:
+        raise ValueError("The designspace has no default source.")
+    masters = [takeSnapshot(defcon.Font(source.path)) for source in sources]
+    defaultMaster = masters[sources.index(default)]
+    axisOrder = [axis.name for axis in document.axes]
+    model = VariationModel(
+        [document.normalizeLocation(source.getFullDesignLocation(document)) for source in sources],
+        axisOrder=axisOrder
+    )
+    instances = list(document.instances)
+    scalars = [
+        model.getMasterScalars(document.normalizeLocation(instance.getFullDesignLocation(document)))
+        for instance in instances
+    ]
+    layout = InterpolationLayout(masters, defaultMaster)
+    rows = _multiply(scalars, layout.masterRows)
+    return [
+        (
+            getInstanceName(instance),
+            layout.makeSnapshot(row, instance, default.path)
+        )
+        for instance, row in zip(instances, rows)
+    ]
+
+def _multiply(scalars, masterRows):
+    if numpy is not None:
+        return (numpy.asarray(scalars, dtype="d") @ numpy.asarray(masterRows, dtype="d")).tolist()
+    rows = []
+    for instanceScalars in scalars:
+        row = [0] * len(masterRows[0])
+        for scalar, masterRow in zip(instanceScalars, masterRows):
+            if scalar:
+                row = [value + scalar * masterValue for value, masterValue in zip(row, masterRow)]
+        rows.append(row)
+    return rows
+
+def getInstanceName(instance):
+    if instance.postScriptFontName:
+        return instance.postScriptFontName
+    name = f"{instance.familyName or ''}-{instance.styleName or ''}"
+    return re.sub(r"[^A-Za-z0-9._-]", "", name)
+
+class InterpolationLayout:
+
+    # Decides where each value of each glyph goes in
+    # the master rows. Glyphs that aren't compatible in
+    # all masters are left out, together with the
+    # composites that use them.
+
+    def __init__(self, masters, defaultMaster):
+        self.defaultMaster = defaultMaster
+        self.glyphSlices = {}
+        self.kerningPairs = []
+        self.infoAttributes = []
+        self.skippedGlyphs = set()
+        self.masterRows = [[] for master in masters]
+        defaultGlyphs = defaultMaster.glyphs
+        components = ComponentIndex(
+            (glyphName, [baseGlyph for baseGlyph, transformation in glyph.components])
+            for glyphName, glyph in defaultGlyphs.items()
+        )
+        for glyphName, glyph in defaultGlyphs.items():
+            if not all(_glyphsAreCompatible(glyph, master.glyphs.get(glyphName)) for master in masters):
+                self.skippedGlyphs.add(glyphName)
+        self.skippedGlyphs |= components.getDependents(self.skippedGlyphs)
+        for glyphName in defaultGlyphs:
+            if glyphName in self.skippedGlyphs:
+                continue
+            start = len(self.masterRows[0])
+            for master, row in zip(masters, self.masterRows):
+                row.extend(_getGlyphValues(master.glyphs[glyphName]))
+            self.glyphSlices[glyphName] = (start, len(self.masterRows[0]))
+        pairs = set()
+        for master in masters:
+            pairs.update(master.kerning.keys())
+        self.kerningPairs = sorted(pairs)
+        self.kerningStart = len(self.masterRows[0])
+        for master, row in zip(masters, self.masterRows):
+            row.extend(master.kerning.get(pair, 0) for pair in self.kerningPairs)
+        self.infoStart = len(self.masterRows[0])
+        for attr, value in sorted(defaultMaster.info.items()):
+            if attr in staticInfoAttributes or not _isNumber(value):
+                continue
+            if all(_isNumber(master.info.get(attr)) for master in masters):
+                self.infoAttributes.append(attr)
+        for master, row in zip(masters, self.masterRows):
+            row.extend(master.info[attr] for attr in self.infoAttributes)
+
+    def makeSnapshot(self, row, instance, path):
+        default = self.defaultMaster
+        glyphs = {}
+        for glyphName, (start, end) in self.glyphSlices.items():
+            glyphs[glyphName] = _makeGlyphSnapshot(default.glyphs[glyphName], row[start:end])
+        start = self.kerningStart
+        kerning = {
+            pair: round(value)
+            for pair, value in zip(self.kerningPairs, row[start:start + len(self.kerningPairs)])
+            if round(value)
+        }
+        info = dict(default.info)
+        for attr, value in zip(self.infoAttributes, row[self.infoStart:]):
+            if isinstance(default.info[attr], int):
+                value = round(value)
+            info[attr] = value
+        for attr in instanceNameInfoAttributes:
+            info.pop(attr, None)
+        if instance.familyName:
+            info["familyName"] = instance.familyName
+        if instance.styleName:
+            info["styleName"] = instance.styleName
+        if instance.styleMapFamilyName:
+            info["styleMapFamilyName"] = instance.styleMapFamilyName
+        if instance.styleMapStyleName:
+            info["styleMapStyleName"] = instance.styleMapStyleName
+        if instance.postScriptFontName:
+            info["postscriptFontName"] = instance.postScriptFontName
+        glyphOrder = tuple(glyphName for glyphName in default.glyphOrder if glyphName in glyphs)
+        return FontSnapshot(
+            glyphs=glyphs,
+            glyphOrder=glyphOrder,
+            info=info,
+            kerning=kerning,
+            groups=default.groups,
+            features=default.features,
+            lib=default.lib,
+            path=path
+        )
+
+def _isNumber(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _glyphsAreCompatible(glyph, other):
+    if other is None:
+        return False
+    return (
+        glyph.segmentTypes == other.segmentTypes
+        and glyph.contourEnds == other.contourEnds
+        and [baseGlyph for baseGlyph, transformation in glyph.components]
+            == [baseGlyph for baseGlyph, transformation in other.components]
+        and [anchor[0] for anchor in glyph.anchors] == [anchor[0] for anchor in other.anchors]
+    )
+
+def _getGlyphValues(glyph):
+    values = [glyph.width, glyph.height]
+    values.extend(glyph.coordinates)
+    for baseGlyph, transformation in glyph.components:
+        values.extend(transformation)
+    for name, x, y in glyph.anchors:
+        values.append(x)
+        values.append(y)
+    return values
+
+def _makeGlyphSnapshot(template, values):
+    glyph = GlyphSnapshot.__new__(GlyphSnapshot)
+    glyph.name = template.name
+    glyph.width = values[0]
+    glyph.height = values[1]
+    glyph.unicodes = template.unicodes
+    glyph.segmentTypes = template.segmentTypes
+    glyph.smoothFlags = template.smoothFlags
+    glyph.contourEnds = template.contourEnds
+    glyph.lib = template.lib
+    i = 2 + len(template.coordinates)
+    glyph.coordinates = array("d", values[2:i])
+    components = []
+    for baseGlyph, transformation in template.components:
+        components.append((baseGlyph, tuple(values[i:i + 6])))
+        i += 6
+    glyph.components = tuple(components)
+    anchors = []
+    for name, x, y in template.anchors:
+        anchors.append((name, values[i], values[i + 1]))
+        i += 2
+    glyph.anchors = tuple(anchors)
+    glyph._digest = None
+    return glyph
+
+# ---------
+# Compiling
+# ---------
+
+def compileInstances(designspacePath, outputDirectory, profile=None):
+    # The instances are compiled in parallel in the
+    # worker pool. Returns the paths of the binaries.
+    from autoInstall.workers import getWorkerPool
+    pool = getWorkerPool()
+    fileName = os.path.splitext(os.path.basename(designspacePath))[0]
+    jobs = []
+    for name, snapshot in interpolateInstances(designspacePath):
+        path = os.path.join(outputDirectory, f"{fileName}-{name}.otf")
+        jobs.append((snapshot, path))
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = [
+            executor.submit(pool.run, "compileFont", snapshot, path, list(snapshot.glyphOrder), profile)
+            for snapshot, path in jobs
+        ]
+        return [future.result() for future in futures]
+
+# ------------
+# Pinned Fonts
+# ------------
+
+# A location in a variable font that has already been
+# built is turned into a static font with the instancer.
+# This skips the sources entirely. Pinned fonts get
+# their own family name so that they don't collide
+# with the variable font.
+
+def parseLocation(text):
+    # "wght=400 wdth=75" or "Weight=400, Width=75"
+    location = {}
+    for item in re.split(r"[,\s]+", text.strip()):
+        if not item:
+            continue
+        name, separator, value = item.partition("=")
+        if not separator or not name:
+            raise ValueError(f"Invalid axis location: {item}")
+        location[name] = float(value)
+    return location
+
+def pinVariableFont(fontPath, location, outputPath):
+    # Returns False if the font isn't variable or
+    # the location is outside of its axes. Axes that
+    # aren't in the location are pinned at their
+    # default value.
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+    font = TTFont(fontPath)
+    if "fvar" not in font:
+        return False
+    limits = {}
+    for axis in font["fvar"].axes:
+        axisName = font["name"].getDebugName(axis.axisNameID)
+        value = location.get(axis.axisTag, location.get(axisName, axis.defaultValue))
+        if not axis.minValue <= value <= axis.maxValue:
+            return False
+        limits[axis.axisTag] = value
+    instancer.instantiateVariableFont(
+        font,
+        limits,
+        inplace=True,
+        overlap=instancer.OverlapMode.KEEP_AND_SET_FLAGS
+    )
+    _renamePinnedFont(font, limits)
+    font.save(outputPath)
+    return True
+
+def _renamePinnedFont(font, limits):
+    table = font["name"]
+    locationName = " ".join(f"{tag.strip()}{value:g}" for tag, value in limits.items())
+    familyName = f"{table.getBestFamilyName()} Pinned {locationName}"
+    postscriptName = re.sub(r"[^A-Za-z0-9-]", "", f"{familyName}-Regular")[:63]
+    names = {
+        1: familyName,
+        2: "Regular",
+        3: postscriptName,
+        4: f"{familyName} Regular",
+        6: postscriptName
+    }
+    for nameID in (16, 17, 21, 22, 25):
+        table.removeNames(nameID=nameID)
+    for nameID, value in names.items():
+        table.removeNames(nameID=nameID)
+        table.setName(value, nameID, 3, 1, 0x409)
+        table.setName(value, nameID, 1, 0, 0)
@@ -0,0 +1,455 @@
+import re
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables import otTables
+from fontTools.otlLib import builder as otlBuilder
+from fontTools.misc.roundTools import otRound
+
+kern1Prefix = "public.kern1."
+kern2Prefix = "public.kern2."
+
+# --------------
+# Lookup Builder
+# --------------
+
+# Group to group pairs are written as class pairs and
+# are never flattened. Pairs that mix a glyph and a
+# group are flattened to glyph pairs, which are tried
+# before the class pairs, so that they keep their
+# precedence. The flattened pairs are cached and are
+# only recalculated when the pair value or the group
+# members change.
+
+class KerningLookupBuilder:
+
+    def __init__(self):
+        self._flattened = {}
+        self._valueRecords = {}
+
+    def build(self, kerning, groups, glyphOrder, ignoreMarks=False):
+        glyphs = set(glyphOrder)
+        glyphMap = {glyphName: index for index, glyphName in enumerate(glyphOrder)}
+        kern1 = {}
+        kern2 = {}
+        for groupName, members in groups.items():
+            if groupName.startswith(kern1Prefix):
+                kern1[groupName] = tuple(sorted(m for m in members if m in glyphs))
+            elif groupName.startswith(kern2Prefix):
+                kern2[groupName] = tuple(sorted(m for m in members if m in glyphs))
+        glyphPairs = {}
+        glyphGroupPairs = {}
+        groupGlyphPairs = {}
+        classPairs = {}
+        flattened = {}
+        for (side1, side2), value in kerning.items():
+            side1IsGroup = side1 in kern1
+            side2IsGroup = side2 in kern2
+            if not side1IsGroup and side1 not in glyphs:
+                continue
+            if not side2IsGroup and side2 not in glyphs:
+                continue
+            if side1IsGroup and side2IsGroup:
+                if kern1[side1] and kern2[side2]:
+                    classPairs[(kern1[side1], kern2[side2])] = self._getValueRecords(value)
+                continue
+            if not side1IsGroup and not side2IsGroup:
+                glyphPairs[(side1, side2)] = value
+                continue
+            cacheKey = (
+                side1,
+                side2,
+                value,
+                kern1.get(side1, (side1,)),
+                kern2.get(side2, (side2,))
+            )
+            pairs = self._flattened.get(cacheKey)
+            if pairs is None:
+                pairs = [
+                    (glyph1, glyph2)
+                    for glyph1 in kern1.get(side1, (side1,))
+                    for glyph2 in kern2.get(side2, (side2,))
+                ]
+            flattened[cacheKey] = pairs
+            if side1IsGroup:
+                target = groupGlyphPairs
+            else:
+                target = glyphGroupPairs
+            for pair in pairs:
+                target[pair] = value
+        self._flattened = flattened
+        # glyph, glyph > glyph, group > group, glyph
+        pairs = dict(groupGlyphPairs)
+        pairs.update(glyphGroupPairs)
+        pairs.update(glyphPairs)
+        pairs = {
+            pair: self._getValueRecords(value)
+            for pair, value in pairs.items()
+        }
+        subtables = []
+        if pairs:
+            subtables.extend(otlBuilder.buildPairPosGlyphs(pairs, glyphMap))
+        if classPairs:
+            subtables.append(otlBuilder.buildPairPosClassesSubtable(classPairs, glyphMap))
+        if not subtables:
+            return None
+        flags = 0
+        if ignoreMarks:
+            flags = otlBuilder.LOOKUP_FLAG_IGNORE_MARKS
+        return otlBuilder.buildLookup(subtables, flags=flags)
+
+    def _getValueRecords(self, value):
+        records = self._valueRecords.get(value)
+        if records is None:
+            records = (otlBuilder.buildValue(dict(XAdvance=otRound(value))), None)
+            self._valueRecords[value] = records
+        return records
+
+# -----------------
+# Kerning Fast Path
+# -----------------
+
+kerningFeatureTags = ("kern", "dist")
+kerningFeaturePattern = re.compile(r"\bfeature\s+(kern|dist)\b")
+featureCommentPattern = re.compile(r"#[^\n]*")
+
+def featuresDefineKerning(featureTexts):
+    # Kerning written in the features replaces or adds
+    # to the kerning that ufo2ft makes from the font's
+    # kerning, so it can't be rebuilt from that alone.
+    return any(
+        kerningFeaturePattern.search(featureCommentPattern.sub("", text))
+        for text in featureTexts
+    )
+
+def rebuildKerning(inputPath, outputPath, kerning, groups, builder, glyphNames=None):
+    # Replace the kern and dist features in a compiled
+    # font. The new lookup takes the place of the old
+    # ones, so it stays before the mark lookups. Returns
+    # False if the font can't be updated this way and
+    # needs a full build.
+    ttFont = TTFont(inputPath)
+    if glyphNames is not None and not set(glyphNames).issubset(ttFont.getGlyphOrder()):
+        # The binary has production glyph names that
+        # the kerning can't be matched to.
+        return False
+    distScripts = set()
+    if "GPOS" in ttFont:
+        distScripts = getFeatureScriptTags(ttFont["GPOS"].table, "dist")
+    lookupIndex = removeGPOSFeatureLookups(ttFont, kerningFeatureTags)
+    if lookupIndex is None:
+        return False
+    ignoreMarks = False
+    if "GDEF" in ttFont:
+        glyphClassDef = ttFont["GDEF"].table.GlyphClassDef
+        if glyphClassDef is not None:
+            ignoreMarks = 3 in glyphClassDef.classDefs.values()
+    lookup = builder.build(
+        kerning,
+        groups,
+        ttFont.getGlyphOrder(),
+        ignoreMarks=ignoreMarks
+    )
+    if lookup is not None:
+        appendGPOSFeatures(ttFont, makeKerningGPOS(ttFont, lookup, distScripts), lookupIndex)
+    ttFont.save(outputPath)
+    return True
+
+def makeKerningGPOS(ttFont, lookup, distScripts=()):
+    # Make a GPOS table that registers a single
+    # lookup with the scripts and languages that
+    # the font already has, as dist for the scripts
+    # in distScripts and as kern for the others.
+    languages = {}
+    for tag in ("GSUB", "GPOS"):
+        if tag not in ttFont:
+            continue
+        scriptList = ttFont[tag].table.ScriptList
+        if scriptList is None:
+            continue
+        for scriptRecord in scriptList.ScriptRecord:
+            languages.setdefault(scriptRecord.ScriptTag, set()).update(
+                langSysRecord.LangSysTag
+                for langSysRecord in scriptRecord.Script.LangSysRecord
+            )
+    if not languages:
+        languages["DFLT"] = set()
+    scriptFeatureTags = {
+        scriptTag: "dist" if scriptTag in distScripts else "kern"
+        for scriptTag in languages
+    }
+    featureTags = [
+        featureTag for featureTag in kerningFeatureTags
+        if featureTag in scriptFeatureTags.values()
+    ]
+    table = newEmptyGPOS().table
+    table.LookupList.Lookup = [lookup]
+    table.LookupList.LookupCount = 1
+    for featureTag in featureTags:
+        featureRecord = otTables.FeatureRecord()
+        featureRecord.FeatureTag = featureTag
+        featureRecord.Feature = otTables.Feature()
+        featureRecord.Feature.FeatureParams = None
+        featureRecord.Feature.LookupListIndex = [0]
+        featureRecord.Feature.LookupCount = 1
+        table.FeatureList.FeatureRecord.append(featureRecord)
+    table.FeatureList.FeatureCount = len(featureTags)
+    for scriptTag, langSysTags in sorted(languages.items()):
+        featureIndex = featureTags.index(scriptFeatureTags[scriptTag])
+        script = _getScript(table, scriptTag)
+        script.DefaultLangSys = _newLangSys()
+        script.DefaultLangSys.FeatureIndex = [featureIndex]
+        script.DefaultLangSys.FeatureCount = 1
+        for langSysTag in sorted(langSysTags):
+            langSys = _getLangSys(script, langSysTag)
+            langSys.FeatureIndex = [featureIndex]
+            langSys.FeatureCount = 1
+    return table
+
+def getFeatureScriptTags(table, featureTag):
+    scriptTags = set()
+    if getattr(table, "ScriptList", None) is None or getattr(table, "FeatureList", None) is None:
+        return scriptTags
+    featureIndexes = {
+        index for index, featureRecord in enumerate(table.FeatureList.FeatureRecord)
+        if featureRecord.FeatureTag == featureTag
+    }
+    for scriptRecord in table.ScriptList.ScriptRecord:
+        script = scriptRecord.Script
+        langSyses = [langSysRecord.LangSys for langSysRecord in script.LangSysRecord]
+        if script.DefaultLangSys is not None:
+            langSyses.append(script.DefaultLangSys)
+        for langSys in langSyses:
+            if featureIndexes.intersection(langSys.FeatureIndex):
+                scriptTags.add(scriptRecord.ScriptTag)
+    return scriptTags
+
+# -----------
+# GPOS Merger
+# -----------
+
+# Kerning is compiled apart from the rest of the
+# features so that changing it does not invalidate
+# the compiled features. These functions add the
+# lookups of a kerning only GPOS table to another.
+
+def appendGPOSFeatures(ttFont, sourceGPOS, lookupIndex=None):
+    # The lookups are inserted at lookupIndex,
+    # or after the existing lookups if it's None.
+    if "GPOS" not in ttFont:
+        ttFont["GPOS"] = newEmptyGPOS()
+    target = ttFont["GPOS"].table
+    _ensureLists(target)
+    _ensureLists(sourceGPOS)
+    lookups = target.LookupList.Lookup
+    if lookupIndex is None:
+        lookupIndex = len(lookups)
+    lookupCount = len(sourceGPOS.LookupList.Lookup)
+    _remapLookupIndexes(
+        target,
+        {
+            index: index + lookupCount if index >= lookupIndex else index
+            for index in range(len(lookups))
+        }
+    )
+    lookups[lookupIndex:lookupIndex] = sourceGPOS.LookupList.Lookup
+    target.LookupList.LookupCount = len(lookups)
+    lookupOffset = lookupIndex
+    featureIndexes = {}
+    for index, featureRecord in enumerate(sourceGPOS.FeatureList.FeatureRecord):
+        feature = featureRecord.Feature
+        feature.LookupListIndex = [i + lookupOffset for i in feature.LookupListIndex]
+        feature.LookupCount = len(feature.LookupListIndex)
+        featureIndexes[index] = len(target.FeatureList.FeatureRecord)
+        target.FeatureList.FeatureRecord.append(featureRecord)
+    for sourceScriptRecord in sourceGPOS.ScriptList.ScriptRecord:
+        targetScript = _getScript(target, sourceScriptRecord.ScriptTag)
+        sourceScript = sourceScriptRecord.Script
+        if sourceScript.DefaultLangSys is not None:
+            if targetScript.DefaultLangSys is None:
+                targetScript.DefaultLangSys = _newLangSys()
+            _appendFeatureIndexes(targetScript.DefaultLangSys, sourceScript.DefaultLangSys, featureIndexes)
+        for sourceLangSysRecord in sourceScript.LangSysRecord:
+            targetLangSys = _getLangSys(targetScript, sourceLangSysRecord.LangSysTag)
+            _appendFeatureIndexes(targetLangSys, sourceLangSysRecord.LangSys, featureIndexes)
+    sortFeatureList(target)
+
+def removeGPOSFeatureLookups(ttFont, featureTags):
+    # Remove the features and the lookups that only
+    # they use. Returns the index the first removed
+    # lookup had, where new lookups for the features
+    # can be inserted, or None if anything else
+    # references the lookups.
+    if "GPOS" not in ttFont:
+        return 0
+    table = ttFont["GPOS"].table
+    _ensureLists(table)
+    lookupIndexes = set()
+    otherLookupIndexes = set()
+    for featureRecord in table.FeatureList.FeatureRecord:
+        if featureRecord.FeatureTag in featureTags:
+            lookupIndexes.update(featureRecord.Feature.LookupListIndex)
+        else:
+            otherLookupIndexes.update(featureRecord.Feature.LookupListIndex)
+    nestedLookupIndexes = _getNestedLookupIndexes(table)
+    if lookupIndexes & (otherLookupIndexes | nestedLookupIndexes):
+        return None
+    _removeFeatureRecords(
+        table,
+        [
+            index for index, featureRecord in enumerate(table.FeatureList.FeatureRecord)
+            if featureRecord.FeatureTag in featureTags
+        ]
+    )
+    lookups = table.LookupList.Lookup
+    if not lookupIndexes:
+        return len(lookups)
+    indexMap = {}
+    kept = []
+    for index, lookup in enumerate(lookups):
+        if index in lookupIndexes:
+            continue
+        indexMap[index] = len(kept)
+        kept.append(lookup)
+    table.LookupList.Lookup = kept
+    table.LookupList.LookupCount = len(kept)
+    _remapLookupIndexes(table, indexMap)
+    return min(lookupIndexes)
+
+def newEmptyGPOS():
+    table = newTable("GPOS")
+    table.table = otTables.GPOS()
+    table.table.Version = 0x00010000
+    _ensureLists(table.table)
+    return table
+
+# Structure
+
+def _ensureLists(table):
+    # The lists of a new table don't exist
+    # until they are set.
+    if getattr(table, "ScriptList", None) is None:
+        table.ScriptList = otTables.ScriptList()
+        table.ScriptList.ScriptRecord = []
+        table.ScriptList.ScriptCount = 0
+    if getattr(table, "FeatureList", None) is None:
+        table.FeatureList = otTables.FeatureList()
+        table.FeatureList.FeatureRecord = []
+        table.FeatureList.FeatureCount = 0
+    if getattr(table, "LookupList", None) is None:
+        table.LookupList = otTables.LookupList()
+        table.LookupList.Lookup = []
+        table.LookupList.LookupCount = 0
+
+def _getNestedLookupIndexes(table):
+    return {record.LookupListIndex for record in _iterateLookupRecords(table)}
+
+def _iterateLookupRecords(table):
+    for lookup in table.LookupList.Lookup:
+        for subtable in lookup.SubTable:
+            if lookup.LookupType == 9:
+                subtable = subtable.ExtSubTable
+            yield from _iterateSubtableLookupRecords(subtable)
+
+def _iterateSubtableLookupRecords(obj):
+    yield from getattr(obj, "PosLookupRecord", None) or []
+    for attr in ("PosRuleSet", "PosClassSet", "ChainPosRuleSet", "ChainPosClassSet"):
+        for ruleSet in getattr(obj, attr, None) or []:
+            if ruleSet is None:
+                continue
+            for ruleAttr in ("PosRule", "PosClassRule", "ChainPosRule", "ChainPosClassRule"):
+                for rule in getattr(ruleSet, ruleAttr, None) or []:
+                    yield from _iterateSubtableLookupRecords(rule)
+
+def _remapLookupIndexes(table, indexMap):
+    # Every index in use must be in indexMap.
+    for featureRecord in table.FeatureList.FeatureRecord:
+        feature = featureRecord.Feature
+        feature.LookupListIndex = [indexMap[index] for index in feature.LookupListIndex]
+    for record in list(_iterateLookupRecords(table)):
+        record.LookupListIndex = indexMap[record.LookupListIndex]
+
+def _newLangSys():
+    langSys = otTables.LangSys()
+    langSys.LookupOrder = None
+    langSys.ReqFeatureIndex = 0xFFFF
+    langSys.FeatureIndex = []
+    langSys.FeatureCount = 0
+    return langSys
+
+def _getScript(table, scriptTag):
+    for scriptRecord in table.ScriptList.ScriptRecord:
+        if scriptRecord.ScriptTag == scriptTag:
+            return scriptRecord.Script
+    scriptRecord = otTables.ScriptRecord()
+    scriptRecord.ScriptTag = scriptTag
+    scriptRecord.Script = otTables.Script()
+    scriptRecord.Script.DefaultLangSys = None
+    scriptRecord.Script.LangSysRecord = []
+    scriptRecord.Script.LangSysCount = 0
+    table.ScriptList.ScriptRecord.append(scriptRecord)
+    table.ScriptList.ScriptRecord.sort(key=lambda r: r.ScriptTag)
+    table.ScriptList.ScriptCount = len(table.ScriptList.ScriptRecord)
+    return scriptRecord.Script
+
+def _getLangSys(script, langSysTag):
+    for langSysRecord in script.LangSysRecord:
+        if langSysRecord.LangSysTag == langSysTag:
+            return langSysRecord.LangSys
+    langSysRecord = otTables.LangSysRecord()
+    langSysRecord.LangSysTag = langSysTag
+    langSysRecord.LangSys = _newLangSys()
+    # A new language system inherits the
+    # features of the script's default.
+    if script.DefaultLangSys is not None:
+        langSysRecord.LangSys.FeatureIndex = list(script.DefaultLangSys.FeatureIndex)
+        langSysRecord.LangSys.FeatureCount = len(langSysRecord.LangSys.FeatureIndex)
+    script.LangSysRecord.append(langSysRecord)
+    script.LangSysRecord.sort(key=lambda r: r.LangSysTag)
+    script.LangSysCount = len(script.LangSysRecord)
+    return langSysRecord.LangSys
+
+def _appendFeatureIndexes(targetLangSys, sourceLangSys, featureIndexes):
+    for index in sourceLangSys.FeatureIndex:
+        index = featureIndexes[index]
+        if index not in targetLangSys.FeatureIndex:
+            targetLangSys.FeatureIndex.append(index)
+    targetLangSys.FeatureCount = len(targetLangSys.FeatureIndex)
+
+def _iterateLangSys(table):
+    for scriptRecord in table.ScriptList.ScriptRecord:
+        script = scriptRecord.Script
+        if script.DefaultLangSys is not None:
+            yield script.DefaultLangSys
+        for langSysRecord in script.LangSysRecord:
+            yield langSysRecord.LangSys
+
+def _remapFeatureIndexes(table, indexMap):
+    for langSys in _iterateLangSys(table):
+        langSys.FeatureIndex = sorted(
+            indexMap[index] for index in langSys.FeatureIndex
+            if index in indexMap
+        )
+        langSys.FeatureCount = len(langSys.FeatureIndex)
+        if langSys.ReqFeatureIndex != 0xFFFF:
+            langSys.ReqFeatureIndex = indexMap.get(langSys.ReqFeatureIndex, 0xFFFF)
+
+def _removeFeatureRecords(table, featureIndexes):
+    featureIndexes = set(featureIndexes)
+    records = table.FeatureList.FeatureRecord
+    indexMap = {}
+    kept = []
+    for index, record in enumerate(records):
+        if index in featureIndexes:
+            continue
+        indexMap[index] = len(kept)
+        kept.append(record)
+    table.FeatureList.FeatureRecord = kept
+    table.FeatureList.FeatureCount = len(kept)
+    _remapFeatureIndexes(table, indexMap)
+
+def sortFeatureList(table):
+    records = table.FeatureList.FeatureRecord
+    order = sorted(range(len(records)), key=lambda i: records[i].FeatureTag)
+    indexMap = {old: new for new, old in enumerate(order)}
+    table.FeatureList.FeatureRecord = [records[i] for i in order]
+    table.FeatureList.FeatureCount = len(records)
+    _remapFeatureIndexes(table, indexMap)
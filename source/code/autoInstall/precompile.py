@@ -0,0 +1,105 @@
+import os
+import threading
+from autoInstall.compilers import getCompileBackend
+
+# -----------
+# Precompiler
+# -----------
+
+# Fonts are compiled in a background thread while the
+# user isn't editing. Each build is tagged with a token
+# describing its inputs. When the font is installed, a
+# build with a matching token is used and only the
+# activation is left to do. Builds that no longer match
+# are thrown away when they finish.
+
+class Precompiler:
+
+    def __init__(self):
+        self._builds = {}
+
+    def __contains__(self, key):
+        return key in self._builds
+
+    def isRunning(self, key):
+        build = self._builds.get(key)
+        return build is not None and build.thread.is_alive()
+
+    def hasBuild(self, key, token):
+        build = self._builds.get(key)
+        return build is not None and build.token == token
+
+    def start(self, key, token, source, outputPath, backend=None, profile=None, glyphOrder=None):
+        if self.isRunning(key):
+            return False
+        self.discard(key)
+        build = _Build(token, outputPath)
+        build.thread = threading.Thread(
+            target=build.run,
+            args=(source, backend, profile, glyphOrder),
+            daemon=True
+        )
+        self._builds[key] = build
+        build.thread.start()
+        return True
+
+    def take(self, key, token):
+        # Returns the path of the compiled font if the
+        # build matches the token and succeeded. A build
+        # that is still running is waited for.
+        build = self._builds.pop(key, None)
+        if build is None:
+            return None
+        if build.token != token:
+            build.discard()
+            return None
+        build.thread.join()
+        if not build.succeeded:
+            build.discard()
+            return None
+        return build.outputPath
+
+    def discard(self, key):
+        build = self._builds.pop(key, None)
+        if build is not None:
+            build.discard()
+
+    def clear(self):
+        for key in list(self._builds.keys()):
+            self.discard(key)
+
+class _Build:
+
+    def __init__(self, token, outputPath):
+        self.token = token
+        self.outputPath = outputPath
+        self.thread = None
+        self.succeeded = False
+        self.discarded = False
+        self._lock = threading.Lock()
+
+    def run(self, source, backend, profile, glyphOrder):
+        try:
+            getCompileBackend(backend).compile(
+                source,
+                self.outputPath,
+                glyphOrder=glyphOrder,
+                profile=profile
+            )
+            succeeded = True
+        except Exception:
+            succeeded = False
+        with self._lock:
+            self.succeeded = succeeded
+            if self.discarded:
+                self._removeOutput()
+
+    def discard(self):
+        with self._lock:
+            self.discarded = True
+            if not self.thread.is_alive():
+                self._removeOutput()
+
+    def _removeOutput(self):
+        if os.path.exists(self.outputPath):
+            os.remove(self.outputPath)
@@ -0,0 +1,142 @@
+import os
+import re
+import time
+import pstats
+import cProfile
+import tempfile
+
+# ---------
+# Profiling
+# ---------
+
+# The next install of chosen fonts or designspaces can
+# be run under cProfile. The statistics are saved as a
+# .pstats file and as collapsed stacks, one stack per
+# line with its time in microseconds, which can be
+# turned into a flame graph with flamegraph.pl,
+# speedscope and similar tools.
+#
+# cProfile only sees the thread it runs in, so work
+# done in worker processes or the build server shows
+# up as time spent waiting for them. Fonts that were
+# precompiled while RoboFont was idle were built in
+# the precompile thread before the install started,
+# so only their installation is in the profile.
+
+profileDirectory = os.path.join(tempfile.gettempdir(), "autoInstallProfiles")
+
+class InstallProfiler:
+
+    # keys are the install queue keys to profile. If
+    # it is None, the next install of anything is.
+    # Proof builds are skipped: they are followed by
+    # a full build of the same key, which is the one
+    # that is profiled.
+
+    skippedKinds = {"proofFont"}
+
+    def __init__(self, keys=None, directory=None):
+        if keys is not None:
+            keys = set(keys)
+        if directory is None:
+            directory = profileDirectory
+        self.keys = keys
+        self.directory = directory
+        self.stats = None
+        self.statsPath = None
+        self.collapsedPath = None
+
+    def matches(self, key, kind):
+        if kind in self.skippedKinds:
+            return False
+        return self.keys is None or key in self.keys
+
+    def run(self, function, *args):
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args)
+        finally:
+            self.stats = pstats.Stats(profile)
+
+    def save(self, name):
+        os.makedirs(self.directory, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", name)
+        stem = os.path.join(self.directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        self.statsPath = stem + ".pstats"
+        self.collapsedPath = stem + ".collapsed"
+        self.stats.dump_stats(self.statsPath)
+        with open(self.collapsedPath, "w", encoding="utf-8") as f:
+            for stack, value in sorted(getCollapsedStacks(self.stats).items()):
+                f.write(f"{stack} {value}\n")
+        return self.statsPath, self.collapsedPath
+
+    def getHotFunctions(self, count=15):
+        # (label, calls, own seconds, cumulative seconds)
+        # sorted by own time.
+        functions = [
+            (getFunctionLabel(function), callCount, ownTime, cumulativeTime)
+            for function, (primitiveCallCount, callCount, ownTime, cumulativeTime, callers) in self.stats.stats.items()
+        ]
+        functions.sort(key=lambda function: function[2], reverse=True)
+        return functions[:count]
+
+    def getReport(self, count=15):
+        lines = [f"Total: {self.stats.total_tt:.3f} s"]
+        lines.append(f"{'own':>8} {'cumul.':>8} {'calls':>8}  function")
+        for label, callCount, ownTime, cumulativeTime in self.getHotFunctions(count):
+            lines.append(f"{ownTime:8.3f} {cumulativeTime:8.3f} {callCount:8d}  {label}")
+        if self.statsPath is not None:
+            lines.append("")
+            lines.append(self.statsPath)
+            lines.append(self.collapsedPath)
+        return "\n".join(lines)
+
+def getFunctionLabel(function):
+    fileName, lineNumber, functionName = function
+    if fileName == "~":
+        # Built-in functions.
+        label = functionName
+    else:
+        label = f"{functionName} ({os.path.basename(fileName)}:{lineNumber})"
+    # Semicolons separate the frames of a stack.
+    return label.replace(";", ",")
+
+def getCollapsedStacks(stats, minimumValue=1):
+    # cProfile only records callers and callees, not
+    # complete stacks. Stacks are rebuilt by walking
+    # down from the functions nobody called, sharing
+    # each function's time between its callers by how
+    # much of its cumulative time each caller accounts
+    # for. Recursion is cut at the first repeat.
+    children = {}
+    for function, (primitiveCallCount, callCount, ownTime, cumulativeTime, callers) in stats.stats.items():
+        for caller, callerStats in callers.items():
+            children.setdefault(caller, []).append((function, callerStats[3]))
+    roots = [
+        function for function, functionStats in stats.stats.items()
+        if not functionStats[4]
+    ]
+    stacks = {}
+
+    def walk(function, share, stack):
+        ownTime, cumulativeTime = stats.stats[function][2:4]
+        stack = stack + [getFunctionLabel(function)]
+        path = ";".join(stack)
+        value = int(ownTime * share * 1000000)
+        if value >= minimumValue:
+            stacks[path] = stacks.get(path, 0) + value
+        seen = set(stack)
+        for child, edgeTime in children.get(function, []):
+            if getFunctionLabel(child) in seen:
+                continue
+            childCumulativeTime = stats.stats[child][3]
+            if not childCumulativeTime:
+                continue
+            childShare = share * min(1, edgeTime / childCumulativeTime)
+            if childShare * childCumulativeTime * 1000000 < minimumValue:
+                continue
+            walk(child, childShare, stack)
+
+    for root in roots:
+        walk(root, 1, [])
+    return stacks
@@ -0,0 +1,157 @@
+import os
+from fontTools.feaLib.parser import Parser
+from fontTools.feaLib import ast
+
+# -----------------
+# Proof Glyph Names
+# -----------------
+
+alwaysIncludedGlyphNames = {".notdef", "space"}
+
+def getProofGlyphNames(font, text=None, characterSetPath=None, gsubClosure=True):
+    cmap = font.getCharacterMapping()
+    glyphNames = set(alwaysIncludedGlyphNames)
+    unicodes = set()
+    if text:
+        unicodes.update(ord(c) for c in text)
+    if characterSetPath:
+        setUnicodes, setGlyphNames = readCharacterSet(characterSetPath, font)
+        unicodes.update(setUnicodes)
+        glyphNames.update(setGlyphNames)
+    for value in unicodes:
+        glyphNames.update(cmap.get(value, []))
+    if gsubClosure:
+        glyphNames = closeGlyphNamesOverGSUB(font, glyphNames)
+    glyphNames = closeGlyphNamesOverComponents(font, glyphNames)
+    return {glyphName for glyphName in glyphNames if glyphName in font}
+
+def readCharacterSet(path, font):
+    unicodes = set()
+    glyphNames = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            for token in line.split():
+                if token in font:
+                    glyphNames.add(token)
+                elif token.upper().startswith("U+"):
+                    unicodes.add(int(token[2:], 16))
+                else:
+                    unicodes.update(ord(c) for c in token)
+    return unicodes, glyphNames
+
+# -------
+# Closure
+# -------
+
+def closeGlyphNamesOverComponents(font, glyphNames):
+    glyphNames = set(glyphNames)
+    stack = list(glyphNames)
+    while stack:
+        glyphName = stack.pop()
+        if glyphName not in font:
+            continue
+        for component in font[glyphName].components:
+            baseGlyph = component.baseGlyph
+            if baseGlyph not in glyphNames:
+                glyphNames.add(baseGlyph)
+                stack.append(baseGlyph)
+    return glyphNames
+
+def closeGlyphNamesOverGSUB(font, glyphNames):
+    rules = getSubstitutionRules(font)
+    glyphNames = set(glyphNames)
+    changed = True
+    while changed:
+        changed = False
+        for inputs, outputs in rules:
+            if outputs <= glyphNames:
+                continue
+            if all(glyphNames & names for names in inputs):
+                glyphNames.update(outputs)
+                changed = True
+    return glyphNames
+
+def getSubstitutionRules(font):
+    # Rules are (inputs, outputs) where inputs is a
+    # list of glyph name sets that must each have at
+    # least one member in the glyph set for the
+    # outputs to be reachable.
+    text = font.features.text
+    if not text:
+        return []
+    includeDirectory = None
+    if font.path is not None:
+        includeDirectory = os.path.dirname(font.path)
+    parser = Parser(
+        _FeatureFile(text, font.path),
+        glyphNames=font.keys(),
+        includeDir=includeDirectory
+    )
+    try:
+        document = parser.parse()
+    except Exception:
+        print(f"Unable to parse the features in {font.path}. The proof subset will not include substitutions.")
+        return []
+    rules = []
+    _gatherSubstitutionRules(document.statements, rules)
+    return rules
+
+def _gatherSubstitutionRules(statements, rules):
+    for statement in statements:
+        if isinstance(statement, ast.Block):
+            _gatherSubstitutionRules(statement.statements, rules)
+        elif isinstance(statement, (ast.SingleSubstStatement, ast.ReverseChainSingleSubstStatement)):
+            for inputNames, outputNames in zip(statement.glyphs, statement.replacements):
+                inputNames = _glyphSet(inputNames)
+                outputNames = _glyphSet(outputNames)
+                if len(outputNames) == 1:
+                    rules.append(([set(inputNames)], set(outputNames)))
+                else:
+                    for inputName, outputName in zip(inputNames, outputNames):
+                        rules.append(([{inputName}], {outputName}))
+        elif isinstance(statement, (ast.MultipleSubstStatement, ast.AlternateSubstStatement)):
+            outputNames = set()
+            if isinstance(statement, ast.MultipleSubstStatement):
+                for replacement in statement.replacement:
+                    outputNames.update(_glyphSet(replacement))
+            else:
+                outputNames.update(_glyphSet(statement.replacement))
+            rules.append(([set(_glyphSet(statement.glyph))], outputNames))
+        elif isinstance(statement, ast.LigatureSubstStatement):
+            inputs = [set(_glyphSet(names)) for names in statement.glyphs]
+            rules.append((inputs, set(_glyphSet(statement.replacement))))
+
+def _glyphSet(obj):
+    if isinstance(obj, str):
+        return (obj,)
+    return obj.glyphSet()
+
+class _FeatureFile:
+
+    # feaLib's parser reads from a file like object
+    # and uses the name to resolve relative includes.
+
+    def __init__(self, text, path):
+        self._text = text
+        self.name = "features.fea"
+        if path is not None:
+            self.name = os.path.join(path, "features.fea")
+
+    def read(self):
+        return self._text
+
+# -----------
+# Proof Fonts
+# -----------
+
+def makeProofFont(font, glyphNames):
+    # Glyphs outside of the proof set are kept so that
+    # the glyph order and the features still compile,
+    # but they are snapshotted without outlines so that
+    # they cost nothing to read, check and compile. The
+    # font itself is never copied.
+    from autoInstall.snapshot import takeSnapshot
+    return takeSnapshot(font, outlineGlyphNames=set(glyphNames))
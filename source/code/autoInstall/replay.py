@@ -0,0 +1,274 @@
+import json
+import time
+import collections
+from autoInstall.scheduler import (
+    InstallQueue,
+    InstallDebouncer,
+    currentFontPriority,
+    fontWindowPriority
+)
+
+# --------------
+# Session Replay
+# --------------
+
+# The subscriber can record the events it receives to a
+# file with one JSON object per line. A recording can be
+# replayed without RoboFont against the same debouncer
+# and install queue, with stub installers that take a
+# fixed amount of time, to see how a change to the
+# timing rules would have behaved in a real session.
+
+class SessionRecorder:
+
+    def __init__(self, path):
+        self.path = path
+        self._start = time.monotonic()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def record(self, event, font=None, **data):
+        data["time"] = round(time.monotonic() - self._start, 4)
+        data["event"] = event
+        if font is not None:
+            data["font"] = getRecordedFontName(font)
+        self._file.write(json.dumps(data) + "\n")
+
+    def close(self):
+        self._file.close()
+
+def getRecordedFontName(font):
+    if font.path:
+        return font.path
+    return f"untitled-{id(font.asDefcon())}"
+
+def loadSession(path):
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    # Appended recordings restart their clocks.
+    offset = 0
+    previous = 0
+    for event in events:
+        if event["time"] + offset < previous:
+            offset = previous - event["time"]
+        event["time"] += offset
+        previous = event["time"]
+    return events
+
+# ------------
+# Stub Install
+# ------------
+
+class StubInstaller:
+
+    # Compiling and installing take a fixed time,
+    # optionally per font.
+
+    def __init__(self, compileTime=1.0, installTime=0.05, compileTimes=None):
+        self.compileTime = compileTime
+        self.installTime = installTime
+        self.compileTimes = compileTimes or {}
+
+    def getCompileTime(self, font):
+        return self.compileTimes.get(font, self.compileTime)
+
+    def getInstallTime(self, font):
+        return self.installTime
+
+# --------
+# Replayer
+# --------
+
+class _ReplayFont:
+
+    def __init__(self, name):
+        self.name = name
+        self.version = 0
+        self.editTimes = []
+        # (version, finish time) of the idle build
+        self.precompiled = None
+
+class SessionReplayer:
+
+    def __init__(self, events, debouncer=None, installer=None):
+        if debouncer is None:
+            debouncer = InstallDebouncer()
+        if installer is None:
+            installer = StubInstaller()
+        self.events = sorted(events, key=lambda event: event["time"])
+        self.debouncer = debouncer
+        self.installer = installer
+        self.queue = InstallQueue()
+        self.fonts = {}
+        self.currentFont = None
+        self.now = 0
+        self.busyUntil = 0
+        self.installCount = 0
+        self.compileCount = 0
+        self.precompileCount = 0
+        self.usedPrecompileCount = 0
+        self.wastedCompileCount = 0
+        self.latencies = []
+
+    def getFont(self, name):
+        font = self.fonts.get(name)
+        if font is None:
+            font = self.fonts[name] = _ReplayFont(name)
+        return font
+
+    # Running
+
+    def run(self):
+        # The main thread can't handle events while it
+        # installs, so everything that happens during
+        # an install waits until it is done.
+        events = collections.deque(self.events)
+        while True:
+            candidates = []
+            if events:
+                candidates.append((max(events[0]["time"], self.busyUntil), 0))
+            deadline = self.debouncer.nextDeadline()
+            if deadline is not None:
+                candidates.append((max(deadline, self.busyUntil), 1))
+            if self.queue:
+                candidates.append((max(self.now, self.busyUntil), 2))
+            if not candidates:
+                break
+            self.now, kind = min(candidates)
+            if kind == 0:
+                self.handleEvent(events.popleft())
+            elif kind == 1:
+                for action in self.debouncer.popDue(self.now):
+                    if action == "precompile":
+                        self.precompile()
+                    else:
+                        self.queueFonts()
+            else:
+                self.installNext()
+        for font in self.fonts.values():
+            if font.precompiled is not None:
+                self.wastedCompileCount += 1
+        return self.getReport()
+
+    def handleEvent(self, event):
+        name = event["event"]
+        now = self.now
+        if name == "change":
+            if not event.get("autoInstalled", True):
+                return
+            font = self.getFont(event["font"])
+            font.version += 1
+            font.editTimes.append(event["time"])
+            self.debouncer.change(now)
+        elif name in ("glyphEditorActivity", "metricsMachinePairChange"):
+            self.debouncer.activity(now)
+        elif name == "save":
+            if self.debouncer.save():
+                self.queueFonts()
+        elif name == "resignActive":
+            if self.debouncer.resignActive():
+                self.queueFonts()
+        elif name == "currentFont":
+            self.currentFont = event["font"]
+            self.queue.focus(event["font"], when=now)
+        elif name == "manualInstall":
+            font = self.getFont(event["font"])
+            font.version += 1
+            font.editTimes.append(event["time"])
+            self.debouncer.cancelInstall()
+            self.queueFonts()
+
+    def queueFonts(self):
+        for font in self.fonts.values():
+            if font.editTimes:
+                priority = fontWindowPriority
+                if font.name == self.currentFont:
+                    priority = currentFontPriority
+                self.queue.push(font.name, priority, font.version)
+
+    def precompile(self):
+        retryTime = None
+        for font in self.fonts.values():
+            if not font.editTimes:
+                continue
+            if font.precompiled is not None:
+                version, finishTime = font.precompiled
+                if finishTime > self.now:
+                    # Still running, so try again when it
+                    # is done, and never at the same time
+                    # or the clock wouldn't move.
+                    if retryTime is None or finishTime < retryTime:
+                        retryTime = finishTime
+                    continue
+                if version == font.version:
+                    continue
+                self.wastedCompileCount += 1
+            self.precompileCount += 1
+            self.compileCount += 1
+            font.precompiled = (font.version, self.now + self.installer.getCompileTime(font.name))
+        if retryTime is not None:
+            self.debouncer.schedulePrecompile(
+                self.now,
+                delay=max(retryTime - self.now, self.debouncer.precompileDelay)
+            )
+
+    def installNext(self):
+        name, version = self.queue.pop()
+        font = self.fonts[name]
+        if not font.editTimes:
+            return
+        duration = self.installer.getInstallTime(name)
+        if font.precompiled is not None and font.precompiled[0] == font.version:
+            # A matching idle build is waited for.
+            duration += max(0, font.precompiled[1] - self.now)
+            self.usedPrecompileCount += 1
+        else:
+            if font.precompiled is not None:
+                self.wastedCompileCount += 1
+            duration += self.installer.getCompileTime(name)
+            self.compileCount += 1
+        font.precompiled = None
+        self.busyUntil = self.now + duration
+        self.installCount += 1
+        for editTime in font.editTimes:
+            self.latencies.append(self.busyUntil - editTime)
+        font.editTimes = []
+
+    # Report
+
+    def getReport(self):
+        latencies = sorted(self.latencies)
+        return dict(
+            events=len(self.events),
+            installs=self.installCount,
+            compiles=self.compileCount,
+            precompiles=self.precompileCount,
+            usedPrecompiles=self.usedPrecompileCount,
+            wastedCompiles=self.wastedCompileCount,
+            installedEdits=len(latencies),
+            uninstalledEdits=sum(len(font.editTimes) for font in self.fonts.values()),
+            latencyP50=getPercentile(latencies, 50),
+            latencyP90=getPercentile(latencies, 90),
+            latencyP99=getPercentile(latencies, 99),
+            latencyMax=latencies[-1] if latencies else None
+        )
+
+def getPercentile(values, percentile):
+    # Nearest rank of sorted values.
+    if not values:
+        return None
+    index = max(0, -(-len(values) * percentile // 100) - 1)
+    return values[int(index)]
+
+def formatReport(report):
+    lines = []
+    for key, value in report.items():
+        if isinstance(value, float):
+            value = f"{value:.2f} s"
+        elif value is None:
+            value = "-"
+        lines.append(f"{key + ':':<18}{value}")
+    return "\n".join(lines)
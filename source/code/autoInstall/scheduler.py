@@ -0,0 +1,210 @@
+import heapq
+import itertools
+import time
+
+# ----------
+# Priorities
+# ----------
+
+currentFontPriority = 0
+fontWindowPriority = 1
+hiddenFontPriority = 2
+externalFontPriority = 3
+designspacePriority = 4
+backgroundPriority = 5
+
+# -------------
+# Install Queue
+# -------------
+
+# Items are ordered by priority, then by how recently
+# they were focused, then by the order in which they
+# were added. Priorities can be recalculated between
+# jobs so that a newly focused item can preempt the
+# remaining work.
+
+class InstallQueue:
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._focusTimes = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries.keys())
+
+    def push(self, key, priority, job):
+        self._invalidate(key)
+        entry = [
+            priority,
+            -self._focusTimes.get(key, 0),
+            next(self._counter),
+            key,
+            job,
+            True
+        ]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def pop(self):
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if not entry[-1]:
+                continue
+            key = entry[3]
+            del self._entries[key]
+            return key, entry[4]
+        raise IndexError("pop from an empty install queue")
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[4]
+
+    def peek(self):
+        while self._heap:
+            entry = self._heap[0]
+            if entry[-1]:
+                return entry[3], entry[4]
+            heapq.heappop(self._heap)
+        return None, None
+
+    def remove(self, key):
+        self._invalidate(key)
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._heap = []
+        self._entries = {}
+
+    def _invalidate(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[-1] = False
+
+    # Focus
+
+    def focus(self, key, when=None):
+        if when is None:
+            when = time.monotonic()
+        self._focusTimes[key] = when
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.push(key, entry[0], entry[4])
+
+    def forget(self, key):
+        self.remove(key)
+        self._focusTimes.pop(key, None)
+
+    # Preemption
+
+    def reprioritize(self, priorityFunction):
+        for key, entry in list(self._entries.items()):
+            priority = priorityFunction(key, entry[4])
+            if priority != entry[0]:
+                self.push(key, priority, entry[4])
+
+# ---------
+# Debouncer
+# ---------
+
+# The timing rules for automatic installs and idle
+# precompiles. The subscriber runs its timers from the
+# deadlines kept here and the session replayer runs a
+# simulated clock against the same rules. Times are in
+# seconds on any monotonic clock.
+
+class InstallDebouncer:
+
+    def __init__(self,
+            installDelay=5,
+            precompileDelay=1,
+            installAfterSave=False,
+            installAfterAppExit=True,
+            precompile=False
+        ):
+        self.installDelay = installDelay
+        self.precompileDelay = precompileDelay
+        self.installAfterSave = installAfterSave
+        self.installAfterAppExit = installAfterAppExit
+        self.precompile = precompile
+        self.installDeadline = None
+        self.precompileDeadline = None
+
+    def scheduleInstall(self, now, delay=None):
+        # Returns the deadline or None if installs
+        # only happen when asked for.
+        if delay is None:
+            delay = self.installDelay
+        if not delay:
+            return None
+        self.installDeadline = now + delay
+        return self.installDeadline
+
+    def schedulePrecompile(self, now, delay=None):
+        if not self.precompile:
+            return None
+        if delay is None:
+            delay = self.precompileDelay
+        self.precompileDeadline = now + delay
+        return self.precompileDeadline
+
+    def change(self, now):
+        self.scheduleInstall(now)
+        self.schedulePrecompile(now)
+
+    def activity(self, now):
+        # Editing activity pushes back pending work.
+        if self.installDeadline is not None:
+            self.scheduleInstall(now)
+        if self.precompileDeadline is not None:
+            self.schedulePrecompile(now)
+
+    def cancelInstall(self):
+        self.installDeadline = None
+
+    def cancelPrecompile(self):
+        self.precompileDeadline = None
+
+    def save(self):
+        # Returns True if the save should install now.
+        if not self.installAfterSave:
+            return False
+        self.cancelInstall()
+        return True
+
+    def resignActive(self):
+        # Returns True if leaving the app should install now.
+        if not self.installAfterAppExit:
+            return False
+        self.cancelInstall()
+        return True
+
+    def nextDeadline(self):
+        deadlines = [
+            deadline for deadline in (self.precompileDeadline, self.installDeadline)
+            if deadline is not None
+        ]
+        if not deadlines:
+            return None
+        return min(deadlines)
+
+    def popDue(self, now):
+        # Returns "precompile" and/or "install", in
+        # the order they should run.
+        due = []
+        if self.precompileDeadline is not None and self.precompileDeadline <= now:
+            self.precompileDeadline = None
+            due.append("precompile")
+        if self.installDeadline is not None and self.installDeadline <= now:
+            self.installDeadline = None
+            due.append("install")
+        return due
@@ -0,0 +1,305 @@
+import copy
+import hashlib
+import weakref
+from array import array
+
+# --------------
+# Glyph Snapshot
+# --------------
+
+segmentTypeCodes = {
+    None: 0,
+    "move": 1,
+    "line": 2,
+    "curve": 3,
+    "qcurve": 4
+}
+segmentTypeNames = {code: name for name, code in segmentTypeCodes.items()}
+
+compileGlyphLibKeys = (
+    "public.postscriptName",
+    "public.openTypeCategory",
+    "public.verticalOrigin",
+    "public.truetype.overlap",
+    "public.truetype.roundOffsetToGrid",
+    "public.truetype.useMyMetrics",
+    "com.github.googlei18n.ufo2ft.explicitClosingLine"
+)
+
+class GlyphSnapshot:
+
+    # Outlines are stored as flat arrays: x and y values
+    # interleaved in coordinates, one byte per point for
+    # the segment type and the smooth flag and the index
+    # after the last point of each contour.
+
+    __slots__ = (
+        "name",
+        "width",
+        "height",
+        "unicodes",
+        "coordinates",
+        "segmentTypes",
+        "smoothFlags",
+        "contourEnds",
+        "components",
+        "anchors",
+        "lib",
+        "_digest"
+    )
+
+    def __init__(self, glyph, outlines=True):
+        # Without outlines the glyph is stored
+        # with no contours or components.
+        self.name = glyph.name
+        self.width = glyph.width
+        self.height = glyph.height
+        self.unicodes = tuple(glyph.unicodes)
+        coordinates = array("d")
+        segmentTypes = bytearray()
+        smoothFlags = bytearray()
+        contourEnds = array("I")
+        for contour in (glyph if outlines else ()):
+            for point in contour:
+                coordinates.append(point.x)
+                coordinates.append(point.y)
+                segmentTypes.append(segmentTypeCodes[point.segmentType])
+                smoothFlags.append(point.smooth)
+            contourEnds.append(len(segmentTypes))
+        self.coordinates = coordinates
+        self.segmentTypes = bytes(segmentTypes)
+        self.smoothFlags = bytes(smoothFlags)
+        self.contourEnds = contourEnds
+        self.components = tuple(
+            (component.baseGlyph, tuple(component.transformation))
+            for component in (glyph.components if outlines else ())
+        )
+        self.anchors = tuple(
+            (anchor.name, anchor.x, anchor.y)
+            for anchor in glyph.anchors
+        )
+        self.lib = tuple(
+            (key, glyph.lib[key])
+            for key in compileGlyphLibKeys
+            if key in glyph.lib
+        )
+        self._digest = None
+
+    def __eq__(self, other):
+        if not isinstance(other, GlyphSnapshot):
+            return NotImplemented
+        return (
+            self.name == other.name
+            and self.width == other.width
+            and self.height == other.height
+            and self.unicodes == other.unicodes
+            and self.segmentTypes == other.segmentTypes
+            and self.coordinates == other.coordinates
+            and self.smoothFlags == other.smoothFlags
+            and self.contourEnds == other.contourEnds
+            and self.components == other.components
+            and self.anchors == other.anchors
+            and self.lib == other.lib
+        )
+
+    __hash__ = object.__hash__
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha1(
+                repr((
+                    self.width,
+                    self.height,
+                    self.unicodes,
+                    self.components,
+                    self.anchors,
+                    self.lib
+                )).encode("utf-8")
+                + self.coordinates.tobytes()
+                + self.segmentTypes
+                + self.smoothFlags
+                + self.contourEnds.tobytes()
+            ).hexdigest()
+        return self._digest
+
+    def outlineDigest(self):
+        # Only the data that affects the drawn outline.
+        return hashlib.sha1(
+            repr(self.components).encode("utf-8")
+            + self.coordinates.tobytes()
+            + self.segmentTypes
+            + self.contourEnds.tobytes()
+        ).hexdigest()
+
+    def drawPoints(self, pointPen):
+        coordinates = self.coordinates
+        segmentTypes = self.segmentTypes
+        smoothFlags = self.smoothFlags
+        start = 0
+        for end in self.contourEnds:
+            pointPen.beginPath()
+            for i in range(start, end):
+                pointPen.addPoint(
+                    (coordinates[i * 2], coordinates[i * 2 + 1]),
+                    segmentType=segmentTypeNames[segmentTypes[i]],
+                    smooth=bool(smoothFlags[i])
+                )
+            pointPen.endPath()
+            start = end
+        for baseGlyph, transformation in self.components:
+            pointPen.addComponent(baseGlyph, transformation)
+
+    def draw(self, pen):
+        from fontTools.pens.pointPen import PointToSegmentPen
+        self.drawPoints(PointToSegmentPen(pen))
+
+# -------------
+# Font Snapshot
+# -------------
+
+compileFontLibKeyPrefixes = (
+    "public.",
+    "com.github.googlei18n.ufo2ft."
+)
+
+class FontSnapshot:
+
+    # Snapshots are immutable. Everything that did not
+    # change since the previous snapshot of the same font
+    # is shared with that snapshot rather than copied.
+
+    def __init__(self, glyphs, glyphOrder, info, kerning, groups, features, lib, path=None):
+        self.glyphs = glyphs
+        self.glyphOrder = glyphOrder
+        self.info = info
+        self.kerning = kerning
+        self.groups = groups
+        self.features = features
+        self.lib = lib
+        self.path = path
+        self._digest = None
+
+    def __contains__(self, glyphName):
+        return glyphName in self.glyphs
+
+    def __getitem__(self, glyphName):
+        return self.glyphs[glyphName]
+
+    def keys(self):
+        return self.glyphs.keys()
+
+    def digest(self):
+        if self._digest is None:
+            h = hashlib.sha1()
+            for glyphName in sorted(self.glyphs):
+                h.update(glyphName.encode("utf-8"))
+                h.update(self.glyphs[glyphName].digest().encode("ascii"))
+            h.update(
+                repr((
+                    self.glyphOrder,
+                    sorted(self.info.items()),
+                    sorted(self.kerning.items()),
+                    sorted(self.groups.items()),
+                    self.features,
+                    sorted(self.lib.items(), key=lambda i: i[0])
+                )).encode("utf-8")
+            )
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def sharedGlyphCount(self, other):
+        return sum(
+            1 for glyphName, glyph in self.glyphs.items()
+            if other.glyphs.get(glyphName) is glyph
+        )
+
+def _share(value, previousValue):
+    if previousValue is not None and value == previousValue:
+        return previousValue
+    return value
+
+def takeSnapshot(font, previous=None, changedGlyphNames=None, outlineGlyphNames=None):
+    # If outlineGlyphNames is given, the other
+    # glyphs are stored without outlines.
+    # ufoLib is slow to import and isn't
+    # needed until the first snapshot.
+    from fontTools.ufoLib import fontInfoAttributesVersion3
+    if hasattr(font, "asDefcon"):
+        font = font.asDefcon()
+    layer = font.layers.defaultLayer
+    previousGlyphs = {}
+    if previous is not None:
+        previousGlyphs = previous.glyphs
+    glyphs = {}
+    for glyphName in layer.keys():
+        previousGlyph = previousGlyphs.get(glyphName)
+        if previousGlyph is not None and changedGlyphNames is not None:
+            if glyphName not in changedGlyphNames:
+                glyphs[glyphName] = previousGlyph
+                continue
+        outlines = outlineGlyphNames is None or glyphName in outlineGlyphNames
+        glyphs[glyphName] = _share(GlyphSnapshot(layer[glyphName], outlines), previousGlyph)
+    info = {}
+    for attr in fontInfoAttributesVersion3:
+        if attr == "guidelines":
+            continue
+        value = getattr(font.info, attr, None)
+        if value is None:
+            continue
+        info[attr] = copy.deepcopy(value)
+    kerning = dict(font.kerning.items())
+    groups = {name: tuple(members) for name, members in font.groups.items()}
+    lib = {
+        key: copy.deepcopy(value)
+        for key, value in font.lib.items()
+        if key.startswith(compileFontLibKeyPrefixes)
+    }
+    if previous is None:
+        previous = FontSnapshot({}, None, None, None, None, None, None)
+    return FontSnapshot(
+        glyphs=glyphs,
+        glyphOrder=_share(tuple(font.glyphOrder), previous.glyphOrder),
+        info=_share(info, previous.info),
+        kerning=_share(kerning, previous.kerning),
+        groups=_share(groups, previous.groups),
+        features=_share(font.features.text or "", previous.features),
+        lib=_share(lib, previous.lib),
+        path=font.path
+    )
+
+# --------------
+# Snapshot Store
+# --------------
+
+class SnapshotStore:
+
+    # Keeps the most recent snapshot of each font so that
+    # the next snapshot can share the unchanged data.
+
+    def __init__(self):
+        self._snapshots = weakref.WeakKeyDictionary()
+
+    def snapshot(self, font, changedGlyphNames=None):
+        if hasattr(font, "asDefcon"):
+            font = font.asDefcon()
+        previous = self._snapshots.get(font)
+        snapshot = takeSnapshot(font, previous=previous, changedGlyphNames=changedGlyphNames)
+        self._snapshots[font] = snapshot
+        return snapshot
+
+    def get(self, font):
+        if hasattr(font, "asDefcon"):
+            font = font.asDefcon()
+        return self._snapshots.get(font)
+
+    def discard(self, font):
+        if hasattr(font, "asDefcon"):
+            font = font.asDefcon()
+        self._snapshots.pop(font, None)
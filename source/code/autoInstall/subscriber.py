@@ -0,0 +1,1262 @@
+import os
+import time
+import weakref
+import AppKit
+from mojo.events import (
+    publishEvent,
+    addObserver
+)
+from mojo.subscriber import (
+    Subscriber,
+    registerRoboFontSubscriber,
+    registerGlyphEditorSubscriber,
+    registerSubscriberEvent
+)
+from mojo.extensions import (
+    registerExtensionDefaults,
+    getExtensionDefault
+)
+from mojo.roboFont import AllFonts, CurrentFont, OpenFont
+from autoInstall.core import (
+    DEBUG,
+    log,
+    extensionIdentifier,
+    defaults,
+    fontIsAutoInstalled,
+    setFontIsAutoInstalled,
+    fontNeedsUpdate,
+    setFontNeedsUpdate,
+    getFontPendingChanges,
+    getFontCompileProfile,
+    setFontCompileProfile
+)
+from autoInstall.scheduler import (
+    InstallQueue,
+    InstallDebouncer,
+    currentFontPriority,
+    fontWindowPriority,
+    hiddenFontPriority,
+    externalFontPriority,
+    designspacePriority,
+    backgroundPriority
+)
+from autoInstall.compilers import setGlyphCacheSize
+from autoInstall.changes import FontChangeMonitor
+from autoInstall.snapshot import SnapshotStore
+from autoInstall.precompile import Precompiler
+from autoInstall.workers import (
+    configureWorkerPool,
+    shutdownWorkerPool
+)
+from autoInstall.failures import (
+    FailureCache,
+    getFileTreeDigest,
+    getDesignspaceInputDigest
+)
+
+registerExtensionDefaults(defaults)
+
+precompileIdleDelay = 1
+
+
+# -------------------
+# RoboFont Subscriber
+# -------------------
+
+class AutoInstallerRoboFontSubscriber(Subscriber):
+
+    debug = DEBUG
+
+    def build(self):
+        self.externalFonts = {}
+        self.designspaces = {}
+        self.pinnedDesignspaces = {}
+        self.designspaceSubsets = {}
+        self.bulkInstalls = {}
+        self.bulkInstall = None
+        self.installQueue = InstallQueue()
+        self.debouncer = InstallDebouncer(precompileDelay=precompileIdleDelay)
+        self.recorder = None
+        self.kerningBuilders = weakref.WeakKeyDictionary()
+        self.changeMonitors = {}
+        self.snapshots = SnapshotStore()
+        self.precompiler = Precompiler()
+        self.failures = FailureCache()
+        self.loadDefaults()
+        addObserver(
+            self,
+            "extensionDefaultsChanged",
+            extensionIdentifier + ".defaultsChanged"
+        )
+        addObserver(self, "registerForWorkspaces", "Workspaces.RegisterWindowOpeners")
+
+    def started(self):
+        log("> subscriber.started")
+        for font in AllFonts():
+            if fontIsAutoInstalled(font):
+                setFontNeedsUpdate(font, True)
+                self._addInternalFont(font)
+        self._installInternalFonts()
+        log("< subscriber.started")
+
+    def destroy(self):
+        log("> subscriber.destroy")
+        from autoInstall.installer import (
+            uninstallFont,
+            uninstallDesignspace,
+            uninstallFontFiles
+        )
+        self.stopInstallTimer()
+        self.stopInstallQueue()
+        self.stopPrecompileTimer()
+        self.stopBulkInstall()
+        self.precompiler.clear()
+        shutdownWorkerPool()
+        for font in AllFonts():
+            if fontIsAutoInstalled(font):
+                uninstallFont(font)
+        for monitor in self.changeMonitors.values():
+            monitor.stop()
+        self.changeMonitors = {}
+        for path, font in self.externalFonts.items():
+            uninstallFont(font)
+            setFontIsAutoInstalled(font, False)
+            font.close()
+        for path, fontPaths in self.designspaces.items():
+            uninstallDesignspace(path, fontPaths)
+        for path, fontPaths in self.pinnedDesignspaces.items():
+            uninstallDesignspace(path, fontPaths)
+        for fontPaths in self.bulkInstalls.values():
+            uninstallFontFiles(fontPaths)
+        self.externalFonts = {}
+        self.designspaces = {}
+        self.pinnedDesignspaces = {}
+        self.bulkInstalls = {}
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        log("< subscriber.destroy")
+
+    # defaults
+
+    def loadDefaults(self):
+        previousCompileSettings = (
+            getattr(self, "compileBackend", None),
+            getattr(self, "compileProfile", None)
+        )
+        self.installAfterChangeDelay = getExtensionDefault(extensionIdentifier + ".installAfterChangeDelay")
+        self.installAfterSave = getExtensionDefault(extensionIdentifier + ".installAfterSave")
+        self.installAfterAppExit = getExtensionDefault(extensionIdentifier + ".installAfterAppExit")
+        self.proofBuild = getExtensionDefault(extensionIdentifier + ".proofBuild")
+        self.proofText = getExtensionDefault(extensionIdentifier + ".proofText")
+        self.proofCharacterSetPath = getExtensionDefault(extensionIdentifier + ".proofCharacterSetPath")
+        self.proofGSUBClosure = getExtensionDefault(extensionIdentifier + ".proofGSUBClosure")
+        self.compileBackend = getExtensionDefault(extensionIdentifier + ".compileBackend")
+        self.compileProfile = getExtensionDefault(extensionIdentifier + ".compileProfile")
+        setGlyphCacheSize(getExtensionDefault(extensionIdentifier + ".glyphCacheSize") * 1024 * 1024)
+        self.precompileWhileIdle = getExtensionDefault(extensionIdentifier + ".precompileWhileIdle")
+        self.designspaceStaticInstances = getExtensionDefault(extensionIdentifier + ".designspaceStaticInstances")
+        self.bulkInstallConcurrency = getExtensionDefault(extensionIdentifier + ".bulkInstallConcurrency")
+        configureWorkerPool(
+            maxBuildsPerWorker=getExtensionDefault(extensionIdentifier + ".workerMaxBuilds"),
+            memoryLimit=getExtensionDefault(extensionIdentifier + ".workerMemoryLimit") * 1024 * 1024,
+            executable=getExtensionDefault(extensionIdentifier + ".workerPythonPath") or None
+        )
+        if self.compileBackend == "build-server":
+            from autoInstall.buildServer import configureBuildServer
+            configureBuildServer(
+                socketPath=getExtensionDefault(extensionIdentifier + ".buildServerSocketPath") or None,
+                executable=getExtensionDefault(extensionIdentifier + ".workerPythonPath") or None
+            )
+        self.debouncer.installDelay = self.installAfterChangeDelay
+        self.debouncer.installAfterSave = self.installAfterSave
+        self.debouncer.installAfterAppExit = self.installAfterAppExit
+        self.debouncer.precompile = self.canPrecompile()
+        self.loadRecorder(getExtensionDefault(extensionIdentifier + ".recordSessionPath"))
+        self.resetInstallTimer()
+        if previousCompileSettings != (None, None):
+            if previousCompileSettings != (self.compileBackend, self.compileProfile):
+                self.compileSettingsChanged(previousCompileSettings[0] != self.compileBackend)
+
+    def compileSettingsChanged(self, backendChanged):
+        # Fonts built with the old backend or the old
+        # default profile are out of date. Fonts with
+        # their own profile only change with the backend.
+        for font in AllFonts():
+            if not fontIsAutoInstalled(font):
+                continue
+            if getFontCompileProfile(font) is not None and not backendChanged:
+                continue
+            self.setFontNeedsUpdate(font)
+
+    def extensionDefaultsChanged(self, event):
+        self.loadDefaults()
+
+    # Session Recording
+
+    def loadRecorder(self, path):
+        if self.recorder is not None:
+            if self.recorder.path == path:
+                return
+            self.recorder.close()
+            self.recorder = None
+        if path:
+            from autoInstall.replay import SessionRecorder
+            self.recorder = SessionRecorder(path)
+
+    def recordEvent(self, event, font=None, **data):
+        if self.recorder is not None:
+            self.recorder.record(event, font, **data)
+
+    # Workspaces
+
+    def registerForWorkspaces(self, info):
+        info["register"]("Auto Install Window", self.workspacesWindowOpener)
+
+    def workspacesWindowOpener(self):
+        self.autoInstallerOpenWindow({})
+        return self.window
+
+    # Install
+
+    def _installInternalFonts(self):
+        log("> subscriber._installInternalFonts")
+        for font in AllFonts():
+            if not fontIsAutoInstalled(font):
+                continue
+            if not fontNeedsUpdate(font):
+                continue
+            kind = "font"
+            if getFontPendingChanges(font) == {"kerning"}:
+                kind = "kerningFont"
+                queued = self.installQueue.get(font.asDefcon())
+                if queued is not None and queued[0] == "fullFont":
+                    # The installed font is a proof subset.
+                    kind = "font"
+            elif font.asDefcon() in self.precompiler:
+                # A complete build may already be waiting.
+                kind = "font"
+            elif self.proofBuild and (self.proofText or self.proofCharacterSetPath):
+                kind = "proofFont"
+            self.queueInstall(font.asDefcon(), kind, font)
+        self.windowClearProgressSpinner()
+        self.runInstallQueue()
+        self.windowUpdateInternalFontsTable()
+        log("< subscriber._installInternalFonts")
+
+    def installInternalFontsNow(self, fonts):
+        self.stopInstallTimer()
+        self.windowClearProgressSpinner()
+        for font in fonts:
+            self.recordEvent("manualInstall", font)
+            self.failures.clear(font.asDefcon())
+            setFontNeedsUpdate(font, True, "manual")
+        self._installInternalFonts()
+
+    # Install Queue
+
+    installQueueTimer = None
+    installQueueProgressBar = None
+
+    def getInstallPriority(self, key, job):
+        kind, obj = job
+        if kind == "fullFont":
+            return backgroundPriority
+        if kind in ("font", "proofFont", "kerningFont"):
+            currentFont = CurrentFont()
+            if currentFont is not None and currentFont.asDefcon() is obj.asDefcon():
+                return currentFontPriority
+            if obj.hasInterface():
+                return fontWindowPriority
+            return hiddenFontPriority
+        if kind == "externalFont":
+            return externalFontPriority
+        return designspacePriority
+
+    def getCompileProfile(self, font):
+        profile = getFontCompileProfile(font)
+        if profile is None:
+            profile = self.compileProfile
+        return profile
+
+    def queueInstall(self, key, kind, obj):
+        job = (kind, obj)
+        self.installQueue.push(key, self.getInstallPriority(key, job), job)
+
+    def runInstallQueue(self):
+        # The first item is installed right away so that
+        # the most important font is ready immediately.
+        # The rest are installed one per run loop pass
+        # so that focus changes and edits can reorder
+        # the remaining items.
+        log("> subscriber.runInstallQueue")
+        from autoInstall.installer import installProgressIncrements
+        if self.installQueueTimer is None and self.installQueue:
+            self.installQueueProgressBar = self.windowStartProgressBar(
+                len(self.installQueue) * (installProgressIncrements + 1)
+            )
+            self._installNextQueuedItem()
+        log("< subscriber.runInstallQueue")
+
+    def stopInstallQueue(self):
+        if self.installQueueTimer is not None:
+            self.installQueueTimer.invalidate()
+        self.installQueueTimer = None
+        self.installQueue.clear()
+
+    def installQueueTimerFire_(self, timer):
+        self.installQueueTimer = None
+        self._installNextQueuedItem()
+
+    def _installNextQueuedItem(self):
+        log("> subscriber._installNextQueuedItem")
+        self.installQueue.reprioritize(self.getInstallPriority)
+        if self.installQueue:
+            key, (kind, obj) = self.installQueue.pop()
+            progressBar = self.installQueueProgressBar
+            if progressBar is not None:
+                progressBar.increment()
+            profiler = self.takeInstallProfiler(key, kind)
+            if profiler is None:
+                self._installQueuedItem(key, kind, obj, progressBar)
+            else:
+                profiler.run(self._installQueuedItem, key, kind, obj, progressBar)
+                self.reportInstallProfile(key, kind, obj, profiler)
+        if self.installQueue:
+            # Full builds that follow proof builds wait
+            # for a pause so they don't get in the way.
+            delay = 0
+            key, (kind, obj) = self.installQueue.peek()
+            if kind == "fullFont":
+                delay = self.installAfterChangeDelay or 1
+            self.installQueueTimer = AppKit.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+                delay,
+                self,
+                "installQueueTimerFire:",
+                None,
+                False
+            )
+        else:
+            self.installQueueProgressBar = None
+            self.windowClearProgressBar()
+            self.windowUpdateInternalFontsTable()
+        log("< subscriber._installNextQueuedItem")
+
+    def _installQueuedItem(self, key, kind, obj, progressBar):
+        from autoInstall.installer import (
+            installFont,
+            installFontKerning,
+            installPrecompiledFont,
+            installDesignspace
+        )
+        if kind in ("font", "fullFont", "kerningFont", "proofFont"):
+            changes = set(getFontPendingChanges(obj))
+            snapshot = self.takeFontBuildSnapshot(key, kind, obj, changes)
+            if self.fontBuildShouldBeSkipped(obj, changes, snapshot):
+                return
+            if snapshot is not None:
+                self.consumeChangedGlyphNames(obj)
+            setFontNeedsUpdate(obj, False)
+        if kind in ("font", "fullFont"):
+            fontPath = self.takePrecompiledFont(obj, snapshot)
+            if fontPath is not None:
+                error = installPrecompiledFont(obj, fontPath, progressBar)
+            else:
+                error = installFont(
+                    obj,
+                    progressBar,
+                    backend=self.compileBackend,
+                    profile=self.getCompileProfile(obj),
+                    snapshot=snapshot
+                )
+            self.recordFontInstallResult(key, obj, error, changes, snapshot)
+            self.windowUpdateInternalFontsTable()
+        elif kind == "kerningFont":
+            from autoInstall.kerning import KerningLookupBuilder
+            builder = self.kerningBuilders.get(key)
+            if builder is None:
+                builder = self.kerningBuilders[key] = KerningLookupBuilder()
+            error = None
+            if not installFontKerning(obj, builder, progressBar):
+                error = installFont(
+                    obj,
+                    progressBar,
+                    backend=self.compileBackend,
+                    profile=self.getCompileProfile(obj),
+                    snapshot=snapshot
+                )
+            self.recordFontInstallResult(key, obj, error, changes, snapshot)
+            self.windowUpdateInternalFontsTable()
+        elif kind == "proofFont":
+            from autoInstall.proofSubset import getProofGlyphNames
+            glyphNames = getProofGlyphNames(
+                obj,
+                text=self.proofText,
+                characterSetPath=self.proofCharacterSetPath,
+                gsubClosure=self.proofGSUBClosure
+            )
+            error = installFont(
+                obj,
+                progressBar,
+                glyphNames=glyphNames,
+                backend=self.compileBackend,
+                profile=self.getCompileProfile(obj)
+            )
+            self.recordFontInstallResult(key, obj, error, changes, snapshot)
+            if error is None:
+                self.queueInstall(key, "fullFont", obj)
+            self.windowUpdateInternalFontsTable()
+        elif kind == "externalFont":
+            font = self.externalFonts.get(obj)
+            if font is not None:
+                error = installFont(
+                    font,
+                    progressBar,
+                    backend=self.compileBackend,
+                    profile=self.getCompileProfile(font)
+                )
+                self.recordFontInstallResult(key, font, error)
+                self.windowUpdateExternalFontsTable()
+        elif kind == "designspace" and obj in self.designspaces:
+            fontPaths, error = installDesignspace(
+                obj,
+                previousFontPaths=self.designspaces.get(obj, []),
+                progressBar=progressBar,
+                useWorkers=self.compileBackend == "ufo2ft-worker",
+                staticInstances=self.designspaceStaticInstances,
+                profile=self.compileProfile,
+                subset=self.designspaceSubsets.get(obj, ("", None))[1]
+            )
+            self.designspaces[obj] = fontPaths
+            if error is None:
+                self.failures.clear(key)
+            else:
+                self.failures.record(key, getDesignspaceInputDigest(obj), error)
+            self.windowUpdateDesignspacesTable()
+
+    # Profiling
+
+    installProfiler = None
+
+    def profileNextInstall(self, keys=None):
+        # The next install of one of the install queue
+        # keys, or of anything if no keys are given,
+        # is run under cProfile.
+        from autoInstall.profiling import InstallProfiler
+        self.installProfiler = InstallProfiler(keys)
+
+    def takeInstallProfiler(self, key, kind):
+        profiler = self.installProfiler
+        if profiler is None or not profiler.matches(key, kind):
+            return None
+        self.installProfiler = None
+        return profiler
+
+    def reportInstallProfile(self, key, kind, obj, profiler):
+        path = key
+        if not isinstance(key, str):
+            path = obj.path or "Untitled"
+        name = f"{os.path.basename(path)}-{kind}"
+        profiler.save(name)
+        report = profiler.getReport()
+        print(f"Profile of {name}")
+        print(report)
+        if self.window is not None:
+            self.window.showInstallProfile(report)
+
+    # Failures
+
+    def takeFontBuildSnapshot(self, key, kind, font, changes):
+        # The snapshot is shared by the failure check,
+        # the precompiled build lookup, the compile and
+        # the failure record. It is only taken when one
+        # of them needs it, since the robofont backend
+        # compiles the font object.
+        needsSnapshot = key in self.failures
+        if kind in ("font", "fullFont"):
+            if key in self.precompiler or self.compileBackend != "robofont":
+                needsSnapshot = True
+        if not needsSnapshot:
+            return None
+        return self.snapshotFont(font, changes)
+
+    def fontBuildShouldBeSkipped(self, font, changes, snapshot):
+        # A font that failed to build is skipped until
+        # its inputs change. If it keeps failing, it is
+        # also skipped until its backoff has passed.
+        key = font.asDefcon()
+        if key not in self.failures:
+            return False
+        if "manual" in changes:
+            return False
+        if not self.failures.shouldSkip(key, self.getBuildToken(font, snapshot)):
+            return False
+        retryDelay = self.failures.getRetryDelay(key)
+        if retryDelay:
+            self.startInstallTimer(retryDelay)
+        log("skipped font that failed to build")
+        return True
+
+    def recordFontInstallResult(self, key, font, error, changes=None, snapshot=None):
+        if error is None:
+            self.failures.clear(key)
+            return
+        if snapshot is None:
+            snapshot = self.snapshotFont(font, changes, consume=True)
+        token = self.getBuildToken(font, snapshot)
+        delay = self.failures.record(key, token, error)
+        log(f"build failed, next attempt in {delay} seconds or after a change")
+
+    # Precompile
+
+    precompileTimer = None
+
+    def canPrecompile(self):
+        # RoboFont's generator has to run on the main thread.
+        return self.precompileWhileIdle and self.compileBackend != "robofont"
+
+    def snapshotFont(self, font, pendingChanges=None, consume=False):
+        # Only the glyphs reported as changed are
+        # snapshotted again, unless the font had a
+        # change that the monitor doesn't track. The
+        # changed glyph names are only consumed when a
+        # build is started from the snapshot, so that
+        # snapshots taken just for comparisons don't
+        # use them up.
+        if pendingChanges is None:
+            pendingChanges = getFontPendingChanges(font)
+        changedGlyphNames = None
+        monitor = self.changeMonitors.get(font.asDefcon())
+        if monitor is not None:
+            if consume:
+                changedGlyphNames = monitor.takeChangedGlyphNames()
+            else:
+                changedGlyphNames = monitor.getChangedGlyphNames()
+            if not pendingChanges <= {"glyphs", "info", "kerning"}:
+                changedGlyphNames = None
+        return self.snapshots.snapshot(font, changedGlyphNames)
+
+    def consumeChangedGlyphNames(self, font):
+        # Call this when a build is started from
+        # the font's most recent snapshot.
+        monitor = self.changeMonitors.get(font.asDefcon())
+        if monitor is not None:
+            monitor.takeChangedGlyphNames()
+
+    def getBuildToken(self, font, snapshot):
+        return (snapshot.digest(), self.compileBackend, self.getCompileProfile(font))
+
+    def takePrecompiledFont(self, font, snapshot):
+        key = font.asDefcon()
+        if key not in self.precompiler:
+            return None
+        fontPath = self.precompiler.take(key, self.getBuildToken(font, snapshot))
+        if fontPath is not None:
+            log("using precompiled font")
+        return fontPath
+
+    def stopPrecompileTimer(self):
+        if self.precompileTimer is not None:
+            self.precompileTimer.invalidate()
+        self.precompileTimer = None
+        self.debouncer.cancelPrecompile()
+
+    def startPrecompileTimer(self):
+        if not self.canPrecompile():
+            return
+        self.stopPrecompileTimer()
+        now = time.monotonic()
+        deadline = self.debouncer.schedulePrecompile(now)
+        if deadline is None:
+            return
+        self.precompileTimer = AppKit.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+            deadline - now,
+            self,
+            "precompileTimerFire:",
+            None,
+            False
+        )
+
+    def precompileTimerFire_(self, timer):
+        log("> subscriber.precompileTimerFire_")
+        from autoInstall.installer import makeFontInstallPath
+        self.precompileTimer = None
+        self.debouncer.cancelPrecompile()
+        if not self.canPrecompile():
+            return
+        tryAgain = False
+        for font in AllFonts():
+            if not fontIsAutoInstalled(font):
+                continue
+            if not fontNeedsUpdate(font):
+                continue
+            key = font.asDefcon()
+            if self.precompiler.isRunning(key):
+                tryAgain = True
+                continue
+            snapshot = self.snapshotFont(font)
+            token = self.getBuildToken(font, snapshot)
+            if self.precompiler.hasBuild(key, token):
+                continue
+            self.consumeChangedGlyphNames(font)
+            self.precompiler.start(
+                key,
+                token,
+                snapshot,
+                makeFontInstallPath(font),
+                backend=self.compileBackend,
+                profile=self.getCompileProfile(font),
+                glyphOrder=list(snapshot.glyphOrder)
+            )
+        if tryAgain:
+            self.startPrecompileTimer()
+        log("< subscriber.precompileTimerFire_")
+
+    # Timer
+
+    installTimer = None
+
+    def resetInstallTimer(self):
+        log("> subscriber.resetInstallTimer")
+        if self.installTimer is not None:
+            self.startInstallTimer()
+        if self.precompileTimer is not None:
+            self.startPrecompileTimer()
+        log("< subscriber.resetInstallTimer")
+
+    def stopInstallTimer(self):
+        log("> subscriber.stopInstallTimer")
+        if self.installTimer is not None:
+            self.installTimer.invalidate()
+        self.installTimer = None
+        self.debouncer.cancelInstall()
+        log("< subscriber.stopInstallTimer")
+
+    def startInstallTimer(self, delay=None):
+        if delay is None and not self.installAfterChangeDelay:
+            return
+        log("> subscriber.startInstallTimer")
+        self.stopInstallTimer()
+        now = time.monotonic()
+        deadline = self.debouncer.scheduleInstall(now, delay)
+        if deadline is None:
+            return
+        self.installTimer = AppKit.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+            deadline - now,
+            self,
+            "installTimerFire:",
+            None,
+            False
+        )
+        self.windowStartProgressSpinner()
+        log("< subscriber.startInstallTimer")
+
+    def installTimerFire_(self, timer):
+        log("> subscriber.installTimerFire_")
+        self.installTimer = None
+        self.debouncer.cancelInstall()
+        self._installInternalFonts()
+        log("< subscriber.installTimerFire_")
+
+    # Document Monitoring
+
+    def fontDocumentDidOpen(self, info):
+        log("> subscriber.fontDocumentDidOpen")
+        from autoInstall.installer import uninstallFont
+        font = info["font"]
+        if font.path in self.externalFonts:
+            oldFont = self.externalFonts[font.path]
+            uninstallFont(oldFont)
+            del self.externalFonts[font.path]
+            setFontIsAutoInstalled(font, True)
+            setFontNeedsUpdate(font, True)
+        self._installInternalFonts()
+        self.windowUpdateInternalFontsTable()
+        self.windowUpdateExternalFontsTable()
+        log("< subscriber.fontDocumentDidOpen")
+
+    def fontDocumentWillClose(self, info):
+        log("> subscriber.fontDocumentWillClose")
+        # XXX
+        # fontDocumentDidClose is not getting the font
+        # in the info dict, so store the font here
+        # so that reinstall can happen if needed.
+        font = info["font"]
+        self._fontThatIsClosing = font
+        self.installQueue.forget(font.asDefcon())
+        log("< subscriber.fontDocumentWillClose")
+
+    def fontDocumentDidClose(self, info):
+        log("> subscriber.fontDocumentDidClose")
+        from autoInstall.installer import uninstallFont
+        if hasattr(self, "_fontThatIsClosing"):
+            font = self._fontThatIsClosing
+            del self._fontThatIsClosing
+            if fontIsAutoInstalled(font):
+                self._removeInternalFont(font)
+                uninstallFont(font)
+                self.addExternalFontPaths([font.path])
+        self.windowUpdateInternalFontsTable()
+        log("< subscriber.fontDocumentDidClose")
+
+    def fontDocumentDidBecomeCurrent(self, info):
+        log("> subscriber.fontDocumentDidBecomeCurrent")
+        font = info["font"]
+        if font is not None:
+            self.recordEvent("currentFont", font)
+            self.installQueue.focus(font.asDefcon())
+        log("< subscriber.fontDocumentDidBecomeCurrent")
+
+    def fontDocumentDidSave(self, info):
+        self.recordEvent("save", info["font"])
+        if not self.debouncer.save():
+            return
+        log("> subscriber.fontDocumentDidSave")
+        self._installInternalFonts()
+        log("< subscriber.fontDocumentDidSave")
+
+    # Font Monitoring
+
+    def fontChangeIsRelevant(self, font, kind):
+        monitor = self.changeMonitors.get(font.asDefcon())
+        if monitor is None:
+            return True
+        relevant = monitor.consume(kind)
+        if not relevant:
+            log(f"ignored irrelevant {kind} change")
+        return relevant
+
+    def setFontNeedsUpdate(self, font, change="other"):
+        if font is None:
+            return
+        log("> subscriber.setFontNeedsUpdate")
+        self.recordEvent("change", font, change=change, autoInstalled=fontIsAutoInstalled(font))
+        if fontIsAutoInstalled(font):
+            setFontNeedsUpdate(font, True, change)
+        self.startInstallTimer()
+        self.startPrecompileTimer()
+        self.windowUpdateInternalFontsTable()
+        log("< subscriber.setFontNeedsUpdate")
+
+    def adjunctFontDidChangeGlyphOrder(self, info):
+        log("> subscriber.adjunctFontDidChangeGlyphOrder")
+        font = info["font"]
+        self.setFontNeedsUpdate(font)
+        log("< subscriber.adjunctFontDidChangeGlyphOrder")
+
+    def adjunctFontInfoDidChange(self, info):
+        log("> subscriber.adjunctFontInfoDidChange")
+        font = info["font"]
+        if self.fontChangeIsRelevant(font, "info"):
+            self.setFontNeedsUpdate(font, "info")
+        log("< subscriber.adjunctFontInfoDidChange")
+
+    def adjunctFontKerningDidChange(self, info):
+        log("> subscriber.adjunctFontKerningDidChange")
+        font = info["font"]
+        self.setFontNeedsUpdate(font, "kerning")
+        log("< subscriber.adjunctFontKerningDidChange")
+
+    def adjunctFontGroupsDidChange(self, info):
+        log("> subscriber.adjunctFontGroupsDidChange")
+        font = info["font"]
+        self.setFontNeedsUpdate(font)
+        log("< subscriber.adjunctFontGroupsDidChange")
+
+    def adjunctFontFeaturesDidChange(self, info):
+        log("> subscriber.adjunctFontFeaturesDidChange")
+        font = info["font"]
+        self.setFontNeedsUpdate(font)
+        log("< subscriber.adjunctFontFeaturesDidChange")
+
+    def adjunctFontLayersDidChangeLayer(self, info):
+        log("> subscriber.adjunctFontLayersDidChangeLayer")
+        font = info["font"]
+        if self.fontChangeIsRelevant(font, "glyphs"):
+            self.setFontNeedsUpdate(font, "glyphs")
+        log("< subscriber.adjunctFontLayersDidChangeLayer")
+
+    def adjunctFontLayersDidSetDefaultLayer(self, info):
+        log("> subscriber.adjunctFontLayersDidSetDefaultLayer")
+        font = info["font"]
+        self.setFontNeedsUpdate(font)
+        log("< subscriber.adjunctFontLayersDidSetDefaultLayer")
+
+    # App Monitoring
+
+    def roboFontWillResignActive(self, info):
+        self.recordEvent("resignActive")
+        if not self.debouncer.resignActive():
+            return
+        log("> subscriber.roboFontWillResignActive")
+        self.stopInstallTimer()
+        self.installTimerFire_(None)
+        log("< subscriber.roboFontWillResignActive")
+
+    # Glyph Editor Activity
+
+    def autoInstallerGlyphEditorActivity(self, info):
+        log("> subscriber.autoInstallerGlyphEditorActivity")
+        self.recordEvent("glyphEditorActivity")
+        self.resetInstallTimer()
+        log("< subscriber.autoInstallerGlyphEditorActivity")
+
+    # MetricsMachine Activity
+
+    def autoInstallMetricsMachineCurrentPairDidChange(self, info):
+        log("> subscriber.autoInstallMetricsMachineCurrentPairDidChange")
+        self.recordEvent("metricsMachinePairChange")
+        self.resetInstallTimer()
+        log("< subscriber.autoInstallMetricsMachineCurrentPairDidChange")
+
+    # Menu Support
+
+    def autoInstallerOpenWindow(self, info):
+        if self.window is not None:
+            return
+        from autoInstall.windows import AutoInstallerWindowController
+        self.window = AutoInstallerWindowController(self)
+        self.windowUpdateInternalFontsTable()
+        self.windowUpdateExternalFontsTable()
+        self.windowUpdateDesignspacesTable()
+
+    def autoInstallerAddCurrentFont(self, info):
+        self.setInternalFontsAutoInstallStates([(CurrentFont(), True)])
+
+    def autoInstallerAddOpenFonts(self, info):
+        fonts = [(font, True) for font in AllFonts()]
+        self.setInternalFontsAutoInstallStates(fonts)
+
+    def autoInstallerAddExternalFonts(self, info):
+        import vanilla
+        paths = vanilla.dialogs.getFile(
+            allowsMultipleSelection=True,
+            fileTypes=["ufo", "ufoz"]
+        )
+        if paths:
+            self.addExternalFontPaths(paths)
+
+    def autoInstallerAddFontFolder(self, info):
+        import vanilla
+        paths = vanilla.dialogs.getFolder()
+        if paths:
+            self.installFontFolder(paths[0])
+
+    def autoInstallerAddCurrentFont(self, info):
+        designspace = CurrentDesignspace()
+        if designspace is None:
+            return
+        path = designspace.path
+        if not path:
+            return
+        self.addDesignspacePaths([path])
+
+    def autoInstallerAddDesignspaces(self, info):
+        import vanilla
+        paths = vanilla.dialogs.getFile(
+            allowsMultipleSelection=True,
+            fileTypes=["designspace"]
+        )
+        if paths:
+            self.addDesignspacePaths(paths)
+
+    def autoInstallerOpenDefaultsWindow(self, info):
+        if self.defaultsWindow is not None:
+            return
+        from autoInstall.windows import AutoInstallerDefaultsWindowController
+        self.defaultsWindow = AutoInstallerDefaultsWindowController(self)
+
+    # Window Support
+
+    window = None
+    defaultsWindow = None
+
+    def windowUpdateInternalFontsTable(self):
+        if self.window is None:
+            return
+        self.window.updateInternalFontsTable()
+
+    def windowUpdateExternalFontsTable(self):
+        if self.window is None:
+            return
+        self.window.updateExternalFontsTable()
+
+    def windowUpdateDesignspacesTable(self):
+        if self.window is None:
+            return
+        self.window.updateDesignspacesTable()
+
+    def addExternalFontPaths(self, paths):
+        self.installExternalFontsNow(paths)
+        self.windowUpdateExternalFontsTable()
+
+    def getExternalFontPaths(self):
+        return list(self.externalFonts.keys())
+
+    def removeExternalFontPaths(self, paths):
+        from autoInstall.installer import uninstallFont
+        for path in paths:
+            self.installQueue.forget(path)
+            font = self.externalFonts.pop(path)
+            uninstallFont(font)
+            font.close()
+        self.windowUpdateExternalFontsTable()
+
+    def addDesignspacePaths(self, paths):
+        self.installDesignspacesNow(paths)
+        self.windowUpdateDesignspacesTable()
+
+    def getDesignspacePaths(self):
+        return list(self.designspaces.keys())
+
+    def removeDesignspacePaths(self, paths):
+        from autoInstall.installer import uninstallDesignspace
+        from autoInstall.designspaceCache import designspaceCache
+        for path in paths:
+            self.installQueue.forget(path)
+            fontPaths = self.designspaces.pop(path)
+            uninstallDesignspace(path, fontPaths)
+            fontPaths = self.pinnedDesignspaces.pop(path, [])
+            if fontPaths:
+                uninstallDesignspace(path, fontPaths)
+            self.designspaceSubsets.pop(path, None)
+            designspaceCache.discard(path)
+        self.windowUpdateDesignspacesTable()
+
+    def setInternalFontsAutoInstallStates(self, fonts):
+        from autoInstall.installer import uninstallFont
+        for font, autoInstall in fonts:
+            if not autoInstall:
+                if fontIsAutoInstalled(font):
+                    self._removeInternalFont(font)
+                    uninstallFont(font)
+                setFontIsAutoInstalled(font, False)
+                setFontNeedsUpdate(font, False)
+            else:
+                if not fontIsAutoInstalled(font):
+                    setFontIsAutoInstalled(font, True)
+                    setFontNeedsUpdate(font, True)
+                    self._addInternalFont(font)
+        self._installInternalFonts()
+
+    def setFontsCompileProfiles(self, fonts):
+        externalFontPaths = []
+        for font, profile in fonts:
+            if profile == getFontCompileProfile(font):
+                continue
+            setFontCompileProfile(font, profile)
+            if self.externalFonts.get(font.path) is font:
+                # External fonts aren't observed, so
+                # they are reinstalled right away.
+                externalFontPaths.append(font.path)
+            else:
+                self.setFontNeedsUpdate(font)
+        if externalFontPaths:
+            self.installExternalFontsNow(externalFontPaths)
+
+    def _addInternalFont(self, font):
+        if font.asDefcon() not in self.changeMonitors:
+            self.changeMonitors[font.asDefcon()] = FontChangeMonitor(font.asDefcon())
+        self.addAdjunctObjectToObserve(font)
+        self.addAdjunctObjectToObserve(font.info)
+        self.addAdjunctObjectToObserve(font.features)
+        self.addAdjunctObjectToObserve(font.kerning)
+        self.addAdjunctObjectToObserve(font.groups)
+        self.addAdjunctObjectToObserve(font.asDefcon().layers)
+
+    def _removeInternalFont(self, font):
+        monitor = self.changeMonitors.pop(font.asDefcon(), None)
+        if monitor is not None:
+            monitor.stop()
+        self.snapshots.discard(font)
+        self.precompiler.discard(font.asDefcon())
+        self.failures.clear(font.asDefcon())
+        self.removeObservedAdjunctObject(font)
+        self.removeObservedAdjunctObject(font.info)
+        self.removeObservedAdjunctObject(font.features)
+        self.removeObservedAdjunctObject(font.kerning)
+        self.removeObservedAdjunctObject(font.groups)
+        self.removeObservedAdjunctObject(font.asDefcon().layers)
+
+    def windowClearProgressSpinner(self):
+        if self.window is None:
+            return
+        self.window.clearProgressSpinner()
+
+    def windowStartProgressSpinner(self):
+        if self.window is None:
+            return
+        delay = self.installAfterChangeDelay
+        if not delay:
+            return
+        self.window.startProgressSpinner(count=delay)
+
+    def windowClearProgressBar(self):
+        if self.window is None:
+            return
+        self.window.clearProgressBar()
+
+    def windowStartProgressBar(self, count):
+        if self.window is None:
+            return
+        return self.window.startProgressBar(count=count)
+
+    # External Fonts
+
+    def installExternalFontsNow(self, paths):
+        for path in paths:
+            if path not in self.externalFonts:
+                self.externalFonts[path] = OpenFont(path, showInterface=False)
+            self.failures.clear(path)
+            self.queueInstall(path, "externalFont", path)
+        self.runInstallQueue()
+
+    # Bulk Install
+
+    bulkInstallTimer = None
+    bulkInstallProgressBar = None
+    bulkInstallBatchSize = 10
+
+    def installFontFolder(self, pattern):
+        # Installs a folder or glob pattern of UFOs
+        # without opening them. Fonts from an earlier
+        # install of the same folder are replaced.
+        from autoInstall.installer import uninstallFontFiles
+        from autoInstall.bulkInstall import BulkInstall
+        self.stopBulkInstall()
+        previousFontPaths = self.bulkInstalls.pop(pattern, [])
+        if previousFontPaths:
+            uninstallFontFiles(previousFontPaths)
+        bulkInstall = BulkInstall(
+            pattern,
+            backend=self.compileBackend,
+            profile=self.compileProfile,
+            concurrency=self.bulkInstallConcurrency
+        )
+        count = bulkInstall.start()
+        if not count:
+            print(f"No fonts found in {pattern}.")
+            return
+        print(f"Installing {count} fonts from {pattern}.")
+        self.bulkInstall = bulkInstall
+        self.bulkInstalls[pattern] = []
+        self.bulkInstallProgressBar = self.windowStartProgressBar(count)
+        self.bulkInstallTimer = AppKit.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+            0.25,
+            self,
+            "bulkInstallTimerFire:",
+            None,
+            True
+        )
+
+    def stopBulkInstall(self):
+        if self.bulkInstallTimer is not None:
+            self.bulkInstallTimer.invalidate()
+        self.bulkInstallTimer = None
+        if self.bulkInstall is not None:
+            self.bulkInstall.cancel()
+            # Fonts that finished are kept for next time.
+            self.bulkInstall.takeResults()
+        self.bulkInstall = None
+        self.bulkInstallProgressBar = None
+
+    def bulkInstallTimerFire_(self, timer):
+        # Finished fonts are activated a batch at a time
+        # so that the app stays responsive.
+        from autoInstall.installer import installFontFiles
+        bulkInstall = self.bulkInstall
+        results = bulkInstall.takeResults(self.bulkInstallBatchSize)
+        if results:
+            for result in results:
+                if result.error is None:
+                    self.failures.clear(result.sourcePath)
+                else:
+                    self.failures.record(result.sourcePath, result.digest, result.error)
+                    print(f"Error generating {result.sourcePath}.")
+                    print(result.error)
+            fontPaths, errors = installFontFiles([
+                result.fontPath
+                for result in results
+                if result.error is None
+            ])
+            self.bulkInstalls[bulkInstall.pattern].extend(fontPaths)
+            for error in errors:
+                print(error)
+            if self.bulkInstallProgressBar is not None:
+                self.bulkInstallProgressBar.increment(len(results))
+        if bulkInstall.isDone:
+            print(
+                f"Installed {len(self.bulkInstalls[bulkInstall.pattern])} of {len(bulkInstall)} fonts "
+                f"from {bulkInstall.pattern} ({bulkInstall.resumedCount} already built, {bulkInstall.failedCount} failed)."
+            )
+            self.bulkInstall = None
+            self.stopBulkInstall()
+            self.windowClearProgressBar()
+            self.windowUpdateExternalFontsTable()
+
+    def uninstallFontFolder(self, pattern):
+        from autoInstall.installer import uninstallFontFiles
+        if self.bulkInstall is not None and self.bulkInstall.pattern == pattern:
+            self.stopBulkInstall()
+        uninstallFontFiles(self.bulkInstalls.pop(pattern, []))
+
+    # Designspaces
+
+    def installDesignspacesNow(self, paths):
+        for path in paths:
+            self.designspaces.setdefault(path, [])
+            self.failures.clear(path)
+            self.queueInstall(path, "designspace", path)
+        self.runInstallQueue()
+
+    def getDesignspaceSubsetText(self, path):
+        return self.designspaceSubsets.get(path, ("", None))[0]
+
+    def setDesignspaceSubsets(self, subsets):
+        # Takes (path, text) pairs. Designspaces whose
+        # subset changed are built again.
+        from autoInstall.designspaceSubset import parseDesignspaceSubset
+        changed = []
+        for path, text in subsets:
+            text = text.strip()
+            if text != self.getDesignspaceSubsetText(path):
+                changed.append((path, text, parseDesignspaceSubset(text)))
+        for path, text, subset in changed:
+            if text:
+                self.designspaceSubsets[path] = (text, subset)
+            else:
+                self.designspaceSubsets.pop(path, None)
+        changed = [path for path, text, subset in changed]
+        if changed:
+            self.installDesignspacesNow(changed)
+
+    def pinDesignspaceLocation(self, paths, location):
+        # Pins the already built variable fonts at the
+        # location. This doesn't touch the sources, so
+        # it doesn't need to wait for the install queue.
+        from autoInstall.installer import installDesignspaceLocation
+        for path in paths:
+            variableFontPaths = self.designspaces.get(path, [])
+            key = path + " (pinned)"
+            fontPaths, error = installDesignspaceLocation(
+                path,
+                variableFontPaths,
+                location,
+                previousFontPaths=self.pinnedDesignspaces.get(path, [])
+            )
+            self.pinnedDesignspaces[path] = fontPaths
+            if error is None:
+                self.failures.clear(key)
+            else:
+                self.failures.record(key, getFileTreeDigest(variableFontPaths), error)
+        self.windowUpdateDesignspacesTable()
+
+# -----------------------
+# Glyph Editor Subscriber
+# -----------------------
+
+class AutoInstallerGlyphEditorSubscriber(Subscriber):
+
+    debug = DEBUG
+
+    def genericActivity(self, info):
+        publishEvent(
+            "AutoInstaller.GlyphEditorActivity"
+        )
+
+    glyphEditorDidKeyDown = genericActivity
+    glyphEditorDidKeyUp = genericActivity
+    glyphEditorDidChangeModifiers = genericActivity
+    glyphEditorDidMouseDown = genericActivity
+    glyphEditorDidMouseUp = genericActivity
+    glyphEditorDidMouseDrag = genericActivity
+    glyphEditorDidRightMouseDown = genericActivity
+    glyphEditorDidRightMouseUp = genericActivity
+    glyphEditorDidRightMouseDrag = genericActivity
+    glyphEditorDidScale = genericActivity
+    glyphEditorWillScale = genericActivity
+    glyphEditorDidCopy = genericActivity
+    glyphEditorDidCopyAsComponent = genericActivity
+    glyphEditorDidCut = genericActivity
+    glyphEditorDidPaste = genericActivity
+    glyphEditorDidPasteSpecial = genericActivity
+    glyphEditorDidDelete = genericActivity
+    glyphEditorDidSelectAll = genericActivity
+    glyphEditorDidSelectAllAlternate = genericActivity
+    glyphEditorDidSelectAllControl = genericActivity
+    glyphEditorDidDeselectAll = genericActivity
+    glyphEditorDidUndo = genericActivity
+    glyphEditorGlyphDidChangeSelection = genericActivity
+
+# -------------
+# Custom Events
+# -------------
+
+def genericEventRegisterDict(**kwargs):
+    default = dict(
+        subscriberEventName=None,
+        methodName=None,
+        lowLevelEventNames=[],
+        dispatcher="roboFont",
+        eventInfoExtractionFunction=None,
+        delay=0
+    )
+    default.update(kwargs)
+    if not default["lowLevelEventNames"]:
+        default["lowLevelEventNames"] = [default["subscriberEventName"]]
+    if not default["methodName"]:
+        name = default["subscriberEventName"].replace(".", "")
+        default["methodName"] = name[0].lower() + name[1:]
+    return default
+
+customEventsToRegister = [
+    # MetricsMachine
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstall.MetricsMachine.currentPairChanged",
+        methodName="autoInstallMetricsMachineCurrentPairDidChange",
+        lowLevelEventNames=["MetricsMachine.currentPairChanged"]
+    ),
+    # Internal
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.OpenWindow"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.AddCurrentFont"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.AddOpenFonts"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.AddExternalFonts"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.AddFontFolder"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.AddCurrentDesignspace"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.AddDesignspaces"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.GlyphEditorActivity"
+    ),
+    genericEventRegisterDict(
+        subscriberEventName="AutoInstaller.OpenDefaultsWindow"
+    ),
+]
+
+for event in customEventsToRegister:
+    try:
+        registerSubscriberEvent(**event)
+    except AssertionError:
+        log(f"Already registered: {event['methodName']}")
+
+registerRoboFontSubscriber(AutoInstallerRoboFontSubscriber)
+registerGlyphEditorSubscriber(AutoInstallerGlyphEditorSubscriber)
+
+
+if __name__ == "__main__":
+    publishEvent(
+        "AutoInstaller.OpenWindow"
+    )
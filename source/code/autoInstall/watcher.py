@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import importlib
+import traceback
+from autoInstall.scheduler import (
+    InstallQueue,
+    externalFontPriority,
+    designspacePriority
+)
+from autoInstall.compilers import getCompileBackend
+from autoInstall.installSlots import InstallSlot, makeSourceSlotName
+from autoInstall.failures import (
+    FailureCache,
+    getFileTreeDigest,
+    getDesignspaceInputDigest
+)
+
+# -------
+# Watcher
+# -------
+
+# Watches UFOs and designspaces on disk and rebuilds
+# them when they change. This runs outside of RoboFont
+# with the same compile backends, caches, install queue
+# and failure handling as the extension. Binaries are
+# written to an output directory and then passed to an
+# installer. The default installer only reports them.
+
+class Watcher:
+
+    def __init__(self,
+            paths,
+            outputDirectory,
+            backend="ufo2ft",
+            profile=None,
+            installer=None,
+            delay=1.0,
+            interval=0.5,
+            staticInstances=False,
+            log=None
+        ):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.outputDirectory = os.path.abspath(outputDirectory)
+        self.backend = backend
+        self.profile = profile
+        if installer is None:
+            installer = ReportingInstaller(log)
+        self.installer = installer
+        self.delay = delay
+        self.interval = interval
+        self.staticInstances = staticInstances
+        self.log = log or (lambda message: None)
+        self.queue = InstallQueue()
+        self.failures = FailureCache()
+        self.slots = {}
+        self.digests = {}
+        self.changeTimes = {}
+        self.buildCount = 0
+        self.failureCount = 0
+
+    # Changes
+
+    def getDigest(self, path):
+        if path.endswith(".designspace"):
+            return getDesignspaceInputDigest(path)
+        return getFileTreeDigest([path])
+
+    def scan(self, now=None):
+        # Paths that changed are queued once they
+        # haven't changed for the delay.
+        if now is None:
+            now = time.time()
+        for path in self.paths:
+            digest = self.getDigest(path)
+            if digest != self.digests.get(path):
+                self.digests[path] = digest
+                self.changeTimes[path] = now
+                self.queue.focus(path, when=now)
+            changeTime = self.changeTimes.get(path)
+            if changeTime is None or now - changeTime < self.delay:
+                continue
+            if self.failures.isKnownFailure(path, digest):
+                del self.changeTimes[path]
+                continue
+            if self.failures.getRetryDelay(path, now):
+                continue
+            del self.changeTimes[path]
+            self.queue.push(path, self.getPriority(path), digest)
+
+    def getPriority(self, path):
+        if path.endswith(".designspace"):
+            return designspacePriority
+        return externalFontPriority
+
+    # Building
+
+    def buildNext(self):
+        if not self.queue:
+            return None
+        path, digest = self.queue.pop()
+        start = time.time()
+        try:
+            if path.endswith(".designspace"):
+                fontPaths = self.buildDesignspace(path)
+            else:
+                fontPaths = [self.buildFont(path)]
+        except Exception as e:
+            error = traceback.format_exception_only(type(e), e)[-1].strip()
+            delay = self.failures.record(path, digest, error)
+            self.failureCount += 1
+            self.log(f"failed {os.path.basename(path)}: {error} (retry in {delay} s or after a change)")
+            return False
+        self.failures.clear(path)
+        self.buildCount += 1
+        self.log(f"built {os.path.basename(path)} in {time.time() - start:.2f} s")
+        self.installer.install(path, fontPaths)
+        return True
+
+    def getSlot(self, path):
+        slot = self.slots.get(path)
+        if slot is None:
+            slot = self.slots[path] = InstallSlot(self.outputDirectory, makeSourceSlotName(path), keepRetired=0)
+        return slot
+
+    def buildFont(self, path):
+        slot = self.getSlot(path)
+        generationPath = slot.newGenerationPath()
+        try:
+            getCompileBackend(self.backend).compile(
+                path,
+                generationPath,
+                profile=self.profile
+            )
+        except Exception:
+            slot.discard(generationPath)
+            raise
+        return slot.swap(generationPath)
+
+    def buildDesignspace(self, path):
+        # Variable fonts are built with ufo2ft, in a
+        # worker if the worker backend is selected.
+        # Static instances are always built in workers.
+        from autoInstall.workers import (
+            getWorkerPool,
+            workerJobs
+        )
+        fontPaths = []
+        with tempfile.TemporaryDirectory(dir=self.outputDirectory) as tempDirectory:
+            if self.staticInstances:
+                from autoInstall.instances import compileInstances
+                tempPaths = compileInstances(path, tempDirectory, profile=self.profile)
+            elif self.backend == "ufo2ft-worker":
+                tempPaths = getWorkerPool().run("compileDesignspace", path, tempDirectory)
+            else:
+                tempPaths = workerJobs["compileDesignspace"](path, tempDirectory)
+            for tempPath in tempPaths:
+                fontPath = os.path.join(self.outputDirectory, os.path.basename(tempPath))
+                os.replace(tempPath, fontPath)
+                fontPaths.append(fontPath)
+        return fontPaths
+
+    # Running
+
+    def run(self, once=False):
+        os.makedirs(self.outputDirectory, exist_ok=True)
+        if once:
+            for path in self.paths:
+                self.queue.push(path, self.getPriority(path), self.getDigest(path))
+            while self.queue:
+                self.buildNext()
+            return
+        while True:
+            self.scan()
+            # One build per pass so that a change to
+            # another path can take its place.
+            if self.buildNext() is None:
+                time.sleep(self.interval)
+
+# ----------
+# Installers
+# ----------
+
+# An installer is any object with an install method that
+# takes the source path and the paths of the binaries.
+
+class ReportingInstaller:
+
+    def __init__(self, log=None):
+        self.log = log or (lambda message: None)
+
+    def install(self, sourcePath, fontPaths):
+        for fontPath in fontPaths:
+            self.log(f"wrote {fontPath}")
+
+class CopyingInstaller:
+
+    # Copies the binaries to a font directory,
+    # such as ~/Library/Fonts or ~/.fonts.
+
+    def __init__(self, directory, log=None):
+        self.directory = os.path.expanduser(directory)
+        self.log = log or (lambda message: None)
+
+    def install(self, sourcePath, fontPaths):
+        os.makedirs(self.directory, exist_ok=True)
+        for fontPath in fontPaths:
+            destination = os.path.join(self.directory, os.path.basename(fontPath))
+            temp = destination + ".tmp"
+            shutil.copyfile(fontPath, temp)
+            os.replace(temp, destination)
+            self.log(f"installed {destination}")
+
+def loadInstaller(specification, log=None):
+    # "module:name" names a class or function that
+    # is called with the log function and returns an
+    # installer. Anything else is a font directory.
+    if ":" in specification and not os.path.isdir(specification):
+        moduleName, name = specification.split(":", 1)
+        sys.path.insert(0, os.getcwd())
+        factory = getattr(importlib.import_module(moduleName), name)
+        return factory(log)
+    return CopyingInstaller(specification, log)
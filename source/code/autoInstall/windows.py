@@ -0,0 +1,803 @@
+import os
+import weakref
+import AppKit
+import ezui
+from mojo.events import postEvent
+from mojo.extensions import (
+    getExtensionDefault,
+    setExtensionDefault
+)
+from mojo.roboFont import AllFonts, OpenFont
+from autoInstall.core import (
+    extensionIdentifier,
+    defaults,
+    fontIsAutoInstalled,
+    fontNeedsUpdate,
+    getFontCompileProfile
+)
+from autoInstall.compilers import (
+    getCompileBackendNames,
+    getCompileProfileNames
+)
+
+# ------
+# Window
+# ------
+
+class AutoInstallerWindowController(ezui.WindowController):
+
+    _subscriber = None
+
+    def _get_subscriber(self):
+        if self._subscriber is not None:
+            return self._subscriber()
+
+    subscriber = property(_get_subscriber)
+
+    def build(self, subscriber):
+        if subscriber is not None:
+            self._subscriber = weakref.ref(subscriber)
+
+        windowContent = """
+        = Tabs
+
+        * Tab: Open                   @openFontsTab
+
+        > |----------------------|    @internalFontsTable
+        > | [ ] O Name.ufo       |
+        > | [X] O Name.ufo       |
+        > |                      |
+        > |----------------------|
+        >> (Update)                   @internalFontsTableReinstallButton
+
+        * Tab: External               @externalFontsTab
+
+        > |----------------------|    @externalFontsTable
+        > | Name.ufo             |
+        > | Name.ufo             |
+        > |                      |
+        > |----------------------|
+        >> (+-)                       @externalFontsTableAddRemoveButton
+        >> (Update)                   @externalFontsTableReinstallButton
+
+        * Tab: Designspaces           @designspacesTab
+
+        > |----------------------|    @designspacesTable
+        > | Name.designspace     |
+        > | Name.designspace     |
+        > |                      |
+        > |----------------------|
+        >> (+-)                       @designspacesTableAddRemoveButton
+        >> (Update)                   @designspacesTableReinstallButton
+        >> [_ _]                      @designspacesPinLocationField
+        >> (Pin)                      @designspacesPinButton
+
+        * Tab: Profile                @profileTab
+
+        [[_ _]]                       @profileTextEditor
+
+        ==========================
+
+        (Profile Next Install)      @profileNextInstallButton
+
+        Error                       @installErrorText
+        %                           @timerProgressSpinner
+        %%---------                 @installerProgressBar
+        """
+
+        iconColumnWidth = 16
+        tableHeight = 250
+        self.compileProfileItems = compileProfileItems = ["Default"] + getCompileProfileNames()
+        descriptionData = dict(
+
+            # Internal Fonts
+
+            internalFontsTable=dict(
+                height=tableHeight,
+                showColumnTitles=False,
+                columnDescriptions=[
+                    dict(
+                        identifier="autoInstall",
+                        width=iconColumnWidth,
+                        cellDescription=dict(
+                            cellType="Checkbox"
+                        ),
+                        editable=True
+                    ),
+                    dict(
+                        identifier="installStatus",
+                        width=iconColumnWidth,
+                        cellDescription=dict(
+                            cellType="Image"
+                        ),
+                        editable=False
+                    ),
+                    dict(
+                        identifier="fileName",
+                        editable=False
+                    ),
+                    dict(
+                        identifier="compileProfile",
+                        width=100,
+                        cellDescription=dict(
+                            cellType="PopUpButton",
+                            cellClassArguments=dict(
+                                items=compileProfileItems
+                            )
+                        ),
+                        editable=True
+                    )
+                ],
+            ),
+
+            # External Fonts
+
+            externalFontsTable = dict(
+                height=tableHeight,
+                showColumnTitles=False,
+                columnDescriptions=[
+                    dict(
+                        identifier="fileName",
+                        editable=False
+                    ),
+                    dict(
+                        identifier="compileProfile",
+                        width=100,
+                        cellDescription=dict(
+                            cellType="PopUpButton",
+                            cellClassArguments=dict(
+                                items=compileProfileItems
+                            )
+                        ),
+                        editable=True
+                    )
+                ],
+                dropSettings=dict(
+                    pasteboardTypes=["fileURL"],
+                    dropCandidateCallback=self.externalFontsTableDropCandidateCallback,
+                    performDropCallback=self.externalFontsTablePerformDropCallback
+                )
+            ),
+
+            # Designspaces
+
+            designspacesTable = dict(
+                height=tableHeight,
+                showColumnTitles=False,
+                columnDescriptions=[
+                    dict(
+                        identifier="fileName",
+                        editable=False
+                    ),
+                    dict(
+                        identifier="subset",
+                        width=120,
+                        editable=True
+                    )
+                ],
+                dropSettings=dict(
+                    pasteboardTypes=["fileURL"],
+                    dropCandidateCallback=self.designspacesTableDropCandidateCallback,
+                    performDropCallback=self.designspacesTablePerformDropCallback
+                )
+            ),
+            designspacesPinLocationField=dict(
+                width=185,
+                placeholder="wght=400 wdth=100"
+            ),
+
+            # Profile
+
+            profileTextEditor=dict(
+                height=tableHeight
+            )
+
+        )
+
+        self.w = ezui.EZWindow(
+            autosaveName=extensionIdentifier + ".MainWindow",
+            title="Auto Install",
+            size=(320, "auto"),
+            content=windowContent,
+            descriptionData=descriptionData,
+            controller=self
+        )
+        self.w.workspaceWindowIdentifier = "Auto Install Window"
+
+    def started(self):
+        self.updateInternalFontsTable()
+        self.installerProgressBar = self.w.getItem("installerProgressBar")
+        self.timerProgressSpinner = self.w.getItem("timerProgressSpinner")
+        # self.installerProgressBar.show(False)
+        # self.timerProgressSpinner.show(False)
+        self.w.open()
+
+    def destroy(self):
+        self._subscriber = None
+
+    def windowWillClose(self, sender):
+        self.subscriber.window = None
+
+    # Internal Fonts
+
+    def updateInternalFontsTable(self):
+        items = []
+        for font in AllFonts():
+            if font.path is None:
+                continue
+            status = AppKit.NSImageNameStatusNone
+            if fontIsAutoInstalled(font):
+                status = AppKit.NSImageNameStatusAvailable
+                if font.asDefcon() in self.subscriber.failures:
+                    status = AppKit.NSImageNameStatusUnavailable
+                elif fontNeedsUpdate(font):
+                    status = AppKit.NSImageNameStatusPartiallyAvailable
+            item = dict(
+                font=font,
+                fileName=os.path.basename(font.path),
+                compileProfile=self.compileProfileItems.index(getFontCompileProfile(font) or "Default"),
+                autoInstall=fontIsAutoInstalled(font),
+                installStatus=ezui.makeImage(
+                    imageName=status
+                )
+            )
+            items.append(item)
+        table = self.w.getItem("internalFontsTable")
+        table.set(items)
+        self.updateErrorText()
+
+    def internalFontsTableEditCallback(self, sender):
+        table = self.w.getItem("internalFontsTable")
+        fonts = []
+        profiles = []
+        for item in table.get():
+            font = item["font"]
+            autoInstall = bool(item["autoInstall"])
+            fonts.append((font, autoInstall))
+            profile = None
+            if item["compileProfile"]:
+                profile = self.compileProfileItems[item["compileProfile"]]
+            profiles.append((font, profile))
+        self.subscriber.setFontsCompileProfiles(profiles)
+        self.subscriber.setInternalFontsAutoInstallStates(fonts)
+
+    def internalFontsTableReinstallButtonCallback(self, sender):
+        table = self.w.getItem("internalFontsTable")
+        items = table.getSelectedItems()
+        if not items:
+            items = table.get()
+        fonts = [item["font"] for item in items]
+        if fonts:
+            self.subscriber.installInternalFontsNow(fonts)
+
+    # Errors
+
+    def updateErrorText(self):
+        text = ""
+        latest = self.subscriber.failures.getLatestError()
+        if latest is not None:
+            key, error = latest
+            path = key
+            if not isinstance(key, str):
+                path = key.path or ""
+            text = f"{os.path.basename(path)}: {error}"
+        self.w.getItem("installErrorText").set(text)
+
+    spinnerTimer = None
+
+    def clearProgressSpinner(self):
+        if self.spinnerTimer is not None:
+            self.spinnerTimer.invalidate()
+        # self.timerProgressSpinner.show(False)
+        self.timerProgressSpinner.set(0)
+        self.spinnerTimer = None
+
+    def startProgressSpinner(self, count=None):
+        self.timerProgressSpinner.set(0)
+        if count is None:
+            return
+        if self.spinnerTimer is not None:
+            self.spinnerTimer.invalidate()
+        self.spinnerTimer = AppKit.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+            1,
+            self,
+            "spinnerTimerFire:",
+            dict(value=0, count=count),
+            True
+        )
+        self.timerProgressSpinner.getNSProgressIndicator().setMaxValue_(count)
+        self.timerProgressSpinner.set(0)
+        # self.timerProgressSpinner.show(True)
+
+    def spinnerTimerFire_(self, timer):
+        info = timer.userInfo()
+        value = info["value"]
+        value += 1
+        count = info["count"]
+        self.timerProgressSpinner.set(value)
+        if value == count:
+            timer.invalidate()
+            value = 0
+        info["value"] = value
+
+    def clearProgressBar(self):
+        self.installerProgressBar.set(0)
+        # self.installerProgressBar.show(False)
+
+    def startProgressBar(self, count=None):
+        self.installerProgressBar.set(0)
+        if count is None:
+            return
+        self.installerProgressBar.getNSProgressIndicator().setMaxValue_(count)
+        self.installerProgressBar.set(0)
+        # self.installerProgressBar.show(True)
+        return self.installerProgressBar
+
+    # External Fonts
+
+    def updateExternalFontsTable(self):
+        items = []
+        for path in self.subscriber.getExternalFontPaths():
+            font = self.subscriber.externalFonts[path]
+            item = dict(
+                path=path,
+                fileName=os.path.basename(path),
+                compileProfile=self.compileProfileItems.index(getFontCompileProfile(font) or "Default")
+            )
+            items.append(item)
+        table = self.w.getItem("externalFontsTable")
+        table.set(items)
+        self.updateErrorText()
+
+    def externalFontsTableEditCallback(self, sender):
+        table = self.w.getItem("externalFontsTable")
+        profiles = []
+        for item in table.get():
+            font = self.subscriber.externalFonts[item["path"]]
+            profile = None
+            if item["compileProfile"]:
+                profile = self.compileProfileItems[item["compileProfile"]]
+            profiles.append((font, profile))
+        self.subscriber.setFontsCompileProfiles(profiles)
+
+    def externalFontsTableDoubleClickCallback(self, sender):
+        items = sender.getSelectedItems()
+        for item in items:
+            OpenFont(item["path"])
+
+    def externalFontsTableDropCandidateCallback(self, info):
+        paths = self._normalizeDroppedItems(info)
+        if not paths:
+            return "none"
+        return "link"
+
+    def externalFontsTablePerformDropCallback(self, info):
+        paths = self._normalizeDroppedItems(info)
+        self.subscriber.addExternalFontPaths(paths)
+        return True
+
+    def _normalizeDroppedItems(self, info):
+        sender = info["sender"]
+        items = info["items"]
+        items = sender.getDropItemValues(items)
+        paths = [
+            item.path() for item in items
+        ]
+        return self._normalizeSelectedPaths(paths)
+
+    def _normalizeSelectedPaths(self, paths):
+        openFonts = [
+            font.path for font in AllFonts()
+        ]
+        externalFonts = [
+            item["path"] for item in self.w.getItem("externalFontsTable").get()
+        ]
+        paths = [
+            path for path in paths
+            if os.path.splitext(path)[-1].lower() in (".ufo", ".ufoz")
+        ]
+        paths = [
+            path for path in paths
+            if path not in openFonts
+            and path not in externalFonts
+        ]
+        return paths
+
+    def externalFontsTableAddRemoveButtonAddCallback(self, sender):
+        self.showGetFile(
+            ["ufo", "ufoz"],
+            self._externalFontsTableGetFileCallback,
+            allowsMultipleSelection=True
+        )
+
+    def _externalFontsTableGetFileCallback(self, paths):
+        paths = self._normalizeSelectedPaths(paths)
+        self.subscriber.addExternalFontPaths(paths)
+
+    def externalFontsTableAddRemoveButtonRemoveCallback(self, sender):
+        table = self.w.getItem("externalFontsTable")
+        selection = table.getSelectedIndexes()
+        items = table.get()
+        paths = [
+            items[i]["path"]
+            for i in selection
+        ]
+        self.subscriber.removeExternalFontPaths(paths)
+
+    def externalFontsTableReinstallButtonCallback(self, sender):
+        table = self.w.getItem("externalFontsTable")
+        items = table.getSelectedItems()
+        if not items:
+            items = table.get()
+        paths = [item["path"] for item in items]
+        if paths:
+            self.subscriber.installExternalFontsNow(paths)
+
+    # Designspaces
+
+    def updateDesignspacesTable(self):
+        items = []
+        for path in self.subscriber.getDesignspacePaths():
+            item = dict(
+                path=path,
+                fileName=os.path.basename(path),
+                subset=self.subscriber.getDesignspaceSubsetText(path)
+            )
+            items.append(item)
+        table = self.w.getItem("designspacesTable")
+        table.set(items)
+        self.updateErrorText()
+
+    def designspacesTableEditCallback(self, sender):
+        subsets = [
+            (item["path"], item["subset"] or "")
+            for item in sender.get()
+        ]
+        try:
+            self.subscriber.setDesignspaceSubsets(subsets)
+        except ValueError as e:
+            self.w.getItem("installErrorText").set(str(e))
+
+    def designspacesTableDoubleClickCallback(self, sender):
+        items = sender.getSelectedItems()
+        for item in items:
+            OpenDesignspace(item["path"])
+
+    def designspacesTableDropCandidateCallback(self, info):
+        paths = self._normalizeDroppedDesignspaceItems(info)
+        if not paths:
+            return "none"
+        return "link"
+
+    def designspacesTablePerformDropCallback(self, info):
+        paths = self._normalizeDroppedDesignspaceItems(info)
+        self.subscriber.addDesignspacePaths(paths)
+        return True
+
+    def _normalizeDroppedDesignspaceItems(self, info):
+        sender = info["sender"]
+        items = info["items"]
+        items = sender.getDropItemValues(items)
+        paths = [
+            item.path() for item in items
+        ]
+        return self._normalizeSelectedDesignspacePaths(paths)
+
+    def _normalizeSelectedDesignspacePaths(self, paths):
+        table = self.w.getItem("designspacesTable")
+        existing = [item["path"] for item in table.get()]
+        paths = [
+            path for path in paths
+            if os.path.splitext(path)[-1].lower() in (".designspace")
+        ]
+        paths = [
+            path for path in paths
+            if path not in existing
+        ]
+        return paths
+
+    def designspacesTableAddRemoveButtonAddCallback(self, sender):
+        self.showGetFile(
+            ["designspace"],
+            self._designspacesTableGetFileCallback,
+            allowsMultipleSelection=True
+        )
+
+    def _designspacesTableGetFileCallback(self, paths):
+        paths = self._normalizeSelectedDesignspacePaths(paths)
+        self.subscriber.addDesignspacePaths(paths)
+
+    def designspacesTableAddRemoveButtonRemoveCallback(self, sender):
+        table = self.w.getItem("designspacesTable")
+        selection = table.getSelectedIndexes()
+        items = table.get()
+        paths = [
+            items[i]["path"]
+            for i in selection
+        ]
+        self.subscriber.removeDesignspacePaths(paths)
+
+    def designspacesTableReinstallButtonCallback(self, sender):
+        table = self.w.getItem("designspacesTable")
+        items = table.getSelectedItems()
+        if not items:
+            items = table.get()
+        paths = [item["path"] for item in items]
+        if paths:
+            self.subscriber.installDesignspacesNow(paths)
+
+    def designspacesPinButtonCallback(self, sender):
+        from autoInstall.instances import parseLocation
+        table = self.w.getItem("designspacesTable")
+        items = table.getSelectedItems()
+        if not items:
+            items = table.get()
+        paths = [item["path"] for item in items]
+        try:
+            location = parseLocation(self.w.getItem("designspacesPinLocationField").get())
+        except ValueError as e:
+            self.w.getItem("installErrorText").set(str(e))
+            return
+        if paths:
+            self.subscriber.pinDesignspaceLocation(paths, location)
+
+    # Profile
+
+    def profileNextInstallButtonCallback(self, sender):
+        # The selected fonts and designspaces are
+        # profiled. With no selection, the next install
+        # of anything is.
+        keys = []
+        for item in self.w.getItem("internalFontsTable").getSelectedItems():
+            keys.append(item["font"].asDefcon())
+        for item in self.w.getItem("externalFontsTable").getSelectedItems():
+            keys.append(item["path"])
+        for item in self.w.getItem("designspacesTable").getSelectedItems():
+            keys.append(item["path"])
+        self.subscriber.profileNextInstall(keys or None)
+        self.w.getItem("profileTextEditor").set("Waiting for the next install...")
+
+    def showInstallProfile(self, report):
+        self.w.getItem("profileTextEditor").set(report)
+
+# ------------
+# Prefs Window
+# ------------
+
+class AutoInstallerDefaultsWindowController(ezui.WindowController):
+
+    def _get_subscriber(self):
+        if self._subscriber is not None:
+            return self._subscriber()
+
+    subscriber = property(_get_subscriber)
+
+    def build(self, subscriber):
+        if subscriber is not None:
+            self._subscriber = weakref.ref(subscriber)
+
+        extensionIdentifierLength = len(extensionIdentifier) + 1
+        settings = {
+            key[extensionIdentifierLength:] : getExtensionDefault(key)
+            for key in defaults.keys()
+        }
+        self.compileBackendNames = compileBackendNames = getCompileBackendNames()
+        if settings["compileBackend"] not in compileBackendNames:
+            settings["compileBackend"] = compileBackendNames[0]
+        self.compileProfileNames = compileProfileNames = getCompileProfileNames()
+        if settings["compileProfile"] not in compileProfileNames:
+            settings["compileProfile"] = compileProfileNames[0]
+
+        content = """
+        !§ Update Install
+        [___] seconds after a change    @installAfterChangeDelay
+        [ ] after saving the font       @installAfterSave
+        [ ] after exiting RoboFont      @installAfterAppExit
+
+        !§ Proof Build
+        [ ] install a subset first      @proofBuild
+        [ ] include substitutions       @proofGSUBClosure
+        [_ _]                           @proofText
+        [_ _]                           @proofCharacterSetPath
+
+        !§ Compile
+        (Backend ...)                   @compileBackend
+        (Profile ...)                   @compileProfile
+        [___] MB glyph cache            @glyphCacheSize
+        [ ] compile while idle          @precompileWhileIdle
+        Note                            @precompileWhileIdleNote
+        [ ] designspace instances       @designspaceStaticInstances
+        [___] folder builds at once     @bulkInstallConcurrency
+
+        !§ Workers
+        [___] builds per worker         @workerMaxBuilds
+        [___] MB memory limit           @workerMemoryLimit
+        [_ _]                           @workerPythonPath
+        [_ _]                           @buildServerSocketPath
+
+        !§ Session Recording
+        [_ _]                           @recordSessionPath
+        """
+
+        descriptionData = dict(
+            installAfterChangeDelay=dict(
+                width=185,
+                value=settings["installAfterChangeDelay"],
+                valueType="integer"
+            ),
+            installAfterSave=dict(
+                value=settings["installAfterSave"]
+            ),
+            installAfterAppExit=dict(
+                value=settings["installAfterAppExit"]
+            ),
+            proofBuild=dict(
+                value=settings["proofBuild"]
+            ),
+            proofGSUBClosure=dict(
+                value=settings["proofGSUBClosure"]
+            ),
+            proofText=dict(
+                width=185,
+                placeholder="Proof text",
+                value=settings["proofText"]
+            ),
+            proofCharacterSetPath=dict(
+                width=185,
+                placeholder="Character set file path",
+                value=settings["proofCharacterSetPath"]
+            ),
+            compileBackend=dict(
+                width=185,
+                items=compileBackendNames,
+                value=compileBackendNames.index(settings["compileBackend"])
+            ),
+            compileProfile=dict(
+                width=185,
+                items=compileProfileNames,
+                value=compileProfileNames.index(settings["compileProfile"])
+            ),
+            glyphCacheSize=dict(
+                width=185,
+                value=settings["glyphCacheSize"],
+                valueType="integer"
+            ),
+            precompileWhileIdle=dict(
+                value=settings["precompileWhileIdle"]
+            ),
+            designspaceStaticInstances=dict(
+                value=settings["designspaceStaticInstances"]
+            ),
+            bulkInstallConcurrency=dict(
+                width=185,
+                value=settings["bulkInstallConcurrency"],
+                valueType="integer"
+            ),
+            workerMaxBuilds=dict(
+                width=185,
+                value=settings["workerMaxBuilds"],
+                valueType="integer"
+            ),
+            workerMemoryLimit=dict(
+                width=185,
+                value=settings["workerMemoryLimit"],
+                valueType="integer"
+            ),
+            workerPythonPath=dict(
+                width=185,
+                placeholder="Worker Python path",
+                value=settings["workerPythonPath"]
+            ),
+            buildServerSocketPath=dict(
+                width=185,
+                placeholder="Build server socket path",
+                value=settings["buildServerSocketPath"]
+            ),
+            recordSessionPath=dict(
+                width=185,
+                placeholder="Recording file path",
+                value=settings["recordSessionPath"]
+            )
+        )
+        self.w = ezui.EZWindow(
+            autosaveName=extensionIdentifier + ".DefaultsWindow",
+            size="auto",
+            content=content,
+            descriptionData=descriptionData,
+            controller=self
+        )
+        self.updatePrecompileWhileIdle()
+
+    def started(self):
+        self.w.open()
+
+    def destroy(self):
+        self._subscriber = None
+
+    def updatePrecompileWhileIdle(self):
+        # RoboFont's generator has to run on the main
+        # thread, so it can't compile while idle.
+        backend = self.compileBackendNames[self.w.getItem("compileBackend").get()]
+        canPrecompile = backend != "robofont"
+        self.w.getItem("precompileWhileIdle").enable(canPrecompile)
+        note = ""
+        if not canPrecompile:
+            note = "Not available with the robofont backend."
+        self.w.getItem("precompileWhileIdleNote").set(note)
+
+    def windowWillClose(self, sender):
+        self.subscriber.defaultsWindow = None
+
+    def storeSettings(self):
+        settings = self.w.getItemValues()
+        if settings["installAfterChangeDelay"] is None:
+            return
+        if settings["glyphCacheSize"] is None:
+            return
+        if not settings["workerMaxBuilds"] or not settings["workerMemoryLimit"]:
+            return
+        if not settings["bulkInstallConcurrency"]:
+            return
+        settings["compileBackend"] = self.compileBackendNames[settings["compileBackend"]]
+        settings["compileProfile"] = self.compileProfileNames[settings["compileProfile"]]
+        for key, value in settings.items():
+            key = extensionIdentifier + "." + key
+            setExtensionDefault(key, value)
+        postEvent(
+            extensionIdentifier + ".defaultsChanged"
+        )
+
+    def installAfterChangeDelayCallback(self, sender):
+        self.storeSettings()
+
+    def installAfterSaveCallback(self, sender):
+        self.storeSettings()
+
+    def installAfterAppExitCallback(self, sender):
+        self.storeSettings()
+
+    def proofBuildCallback(self, sender):
+        self.storeSettings()
+
+    def proofGSUBClosureCallback(self, sender):
+        self.storeSettings()
+
+    def proofTextCallback(self, sender):
+        self.storeSettings()
+
+    def proofCharacterSetPathCallback(self, sender):
+        self.storeSettings()
+
+    def compileBackendCallback(self, sender):
+        self.updatePrecompileWhileIdle()
+        self.storeSettings()
+
+    def compileProfileCallback(self, sender):
+        self.storeSettings()
+
+    def glyphCacheSizeCallback(self, sender):
+        self.storeSettings()
+
+    def precompileWhileIdleCallback(self, sender):
+        self.storeSettings()
+
+    def designspaceStaticInstancesCallback(self, sender):
+        self.storeSettings()
+
+    def bulkInstallConcurrencyCallback(self, sender):
+        self.storeSettings()
+
+    def workerMaxBuildsCallback(self, sender):
+        self.storeSettings()
+
+    def workerMemoryLimitCallback(self, sender):
+        self.storeSettings()
+
+    def workerPythonPathCallback(self, sender):
+        self.storeSettings()
+
+    def buildServerSocketPathCallback(self, sender):
+        self.storeSettings()
+
+    def recordSessionPathCallback(self, sender):
+        self.storeSettings()
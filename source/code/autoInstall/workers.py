@@ -0,0 +1,287 @@
+import os
+import sys
+import time
+import pickle
+import threading
+import traceback
+import subprocess
+
+# -------
+# Workers
+# -------
+
+# Builds run in separate worker processes so that the
+# memory they use is given back to the system when a
+# worker is recycled. A worker is replaced after it has
+# done a number of builds and it is killed if its peak
+# memory use goes over the limit. Jobs and results are
+# pickled over the worker's standard input and output.
+
+workerMemoryLimitExitCode = 3
+
+class WorkerError(Exception): pass
+
+class WorkerPool:
+
+    def __init__(self, size=2, maxBuildsPerWorker=25, memoryLimit=None, executable=None):
+        self.size = size
+        self.maxBuildsPerWorker = maxBuildsPerWorker
+        self.memoryLimit = memoryLimit
+        self.executable = executable
+        self.startedCount = 0
+        self.recycledCount = 0
+        self.killedCount = 0
+        self._idle = []
+        self._workerCount = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def run(self, kind, *args):
+        worker = self._acquire()
+        try:
+            status, result, peakMemory = worker.send(kind, args)
+        except WorkerError:
+            self.killedCount += 1
+            self._release(worker, recycle=True)
+            raise
+        recycle = worker.buildCount >= self.maxBuildsPerWorker
+        if self.memoryLimit and peakMemory > self.memoryLimit:
+            recycle = True
+        self._release(worker, recycle=recycle)
+        if status == "error":
+            raise WorkerError(result)
+        return result
+
+    def shutdown(self):
+        with self._condition:
+            self._closed = True
+            for worker in self._idle:
+                worker.stop()
+                self._workerCount -= 1
+            self._idle = []
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._workerCount < self.size:
+                    self._workerCount += 1
+                    break
+                self._condition.wait()
+        try:
+            worker = _Worker(self.executable, self.memoryLimit)
+        except Exception:
+            with self._condition:
+                self._workerCount -= 1
+                self._condition.notify()
+            raise
+        self.startedCount += 1
+        return worker
+
+    def _release(self, worker, recycle=False):
+        # Workers of a pool that was shut down
+        # while they were busy are stopped too.
+        if self._closed:
+            recycle = True
+        if recycle:
+            worker.stop()
+            self.recycledCount += 1
+        with self._condition:
+            if recycle:
+                self._workerCount -= 1
+            else:
+                self._idle.append(worker)
+            self._condition.notify()
+
+# ------
+# Python
+# ------
+
+# Workers and the build server are started with the
+# Python that is set in the settings. Without one they
+# use this process's Python, except that inside RoboFont
+# sys.executable is the application itself, which can't
+# run a script. The application bundle contains the
+# interpreter it embeds next to it, and that is used
+# instead, with this process's import paths so that it
+# finds the same fontTools, defcon and ufo2ft.
+
+def getPythonCommand(executable=None):
+    # Returns (executable, environment). The
+    # environment is None if it isn't changed.
+    if executable:
+        return executable, None
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable, None
+    version = f"python{sys.version_info.major}.{sys.version_info.minor}"
+    candidates = [
+        os.path.join(os.path.dirname(sys.executable), "python"),
+        getattr(sys, "_base_executable", None),
+        os.path.join(sys.exec_prefix, "bin", version),
+        os.path.join(sys.exec_prefix, "bin", "python3")
+    ]
+    for candidate in candidates:
+        if not candidate or os.path.realpath(candidate) == os.path.realpath(sys.executable):
+            continue
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            environment = dict(os.environ)
+            paths = [path for path in sys.path if path and os.path.exists(path)]
+            if environment.get("PYTHONPATH"):
+                paths.append(environment["PYTHONPATH"])
+            environment["PYTHONPATH"] = os.pathsep.join(paths)
+            return candidate, environment
+    raise WorkerError("No Python was found to run the build workers. Set one in the settings.")
+
+# The worker imports the compile modules from this
+# package without running the package's RoboFont setup.
+
+workerBootstrap = """
+import sys
+import types
+package = types.ModuleType("autoInstall")
+package.__path__ = [sys.argv[1]]
+sys.modules["autoInstall"] = package
+from autoInstall.workers import workerMain
+workerMain(int(sys.argv[2]))
+"""
+
+class _Worker:
+
+    def __init__(self, executable, memoryLimit):
+        executable, environment = getPythonCommand(executable)
+        self.buildCount = 0
+        self.process = subprocess.Popen(
+            [
+                executable,
+                "-c",
+                workerBootstrap,
+                os.path.dirname(__file__),
+                str(memoryLimit or 0)
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=environment
+        )
+
+    def send(self, kind, args):
+        self.buildCount += 1
+        try:
+            pickle.dump((kind, args), self.process.stdin)
+            self.process.stdin.flush()
+            return pickle.load(self.process.stdout)
+        except (EOFError, OSError, pickle.UnpicklingError):
+            returnCode = self.process.wait()
+            if returnCode == workerMemoryLimitExitCode:
+                raise WorkerError("The build worker went over the memory limit.")
+            raise WorkerError(f"The build worker stopped unexpectedly ({returnCode}).")
+
+    def stop(self):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+# -----------
+# Worker Side
+# -----------
+
+def getPeakMemory():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    if sys.platform != "darwin":
+        peak *= 1024
+    return peak
+
+def _watchMemory(memoryLimit):
+    while True:
+        time.sleep(0.25)
+        if getPeakMemory() > memoryLimit:
+            sys.stderr.write("Build worker went over the memory limit.\n")
+            sys.stderr.flush()
+            os._exit(workerMemoryLimitExitCode)
+
+def workerMain(memoryLimit=0):
+    # Anything printed by the build goes to standard
+    # error so that it can't corrupt the results.
+    stdin = sys.stdin.buffer
+    stdout = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    if memoryLimit:
+        threading.Thread(target=_watchMemory, args=(memoryLimit,), daemon=True).start()
+    while True:
+        try:
+            kind, args = pickle.load(stdin)
+        except EOFError:
+            break
+        try:
+            result = ("ok", workerJobs[kind](*args))
+        except Exception as e:
+            result = ("error", traceback.format_exception_only(type(e), e)[-1].strip())
+        pickle.dump(result + (getPeakMemory(),), stdout)
+        stdout.flush()
+
+def _compileFont(source, outputPath, glyphOrder, profile):
+    from autoInstall.compilers import getCompileBackend
+    getCompileBackend("ufo2ft").compile(
+        source,
+        outputPath,
+        glyphOrder=glyphOrder,
+        profile=profile
+    )
+    return outputPath
+
+def _compileDesignspace(designspacePath, outputDirectory):
+    import defcon
+    import ufo2ft
+    from fontTools.designspaceLib import DesignSpaceDocument
+    document = DesignSpaceDocument.fromfile(designspacePath)
+    document.loadSourceFonts(defcon.Font)
+    fileName = os.path.splitext(os.path.basename(designspacePath))[0]
+    paths = []
+    for name, ttFont in ufo2ft.compileVariableTTFs(document).items():
+        path = os.path.join(outputDirectory, f"{fileName}-{name}.ttf")
+        ttFont.save(path)
+        paths.append(path)
+    return paths
+
+workerJobs = dict(
+    compileFont=_compileFont,
+    compileDesignspace=_compileDesignspace
+)
+
+# -----------
+# Shared Pool
+# -----------
+
+workerPool = None
+workerPoolSettings = dict(
+    maxBuildsPerWorker=25,
+    memoryLimit=2048 * 1024 * 1024,
+    executable=None
+)
+
+def configureWorkerPool(**settings):
+    # Running workers finish their current build
+    # and are replaced by workers using the new
+    # settings.
+    if settings == workerPoolSettings:
+        return
+    workerPoolSettings.update(settings)
+    shutdownWorkerPool()
+
+def getWorkerPool():
+    global workerPool
+    if workerPool is None:
+        workerPool = WorkerPool(**workerPoolSettings)
+    return workerPool
+
+def shutdownWorkerPool():
+    global workerPool
+    if workerPool is not None:
+        workerPool.shutdown()
+    workerPool = None
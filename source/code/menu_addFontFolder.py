@@ -0,0 +1,6 @@
+from mojo.events import publishEvent
+
+if __name__ == "__main__":
+    publishEvent(
+        "AutoInstaller.AddFontFolder"
+    )
@@ -0,0 +1,128 @@
+import os
+import sys
+import pytest
+
+codeDirectory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "source", "code")
+if codeDirectory not in sys.path:
+    sys.path.insert(0, codeDirectory)
+
+# -----
+# Fonts
+# -----
+
+# A small font with a base glyph, a combining mark
+# with anchors, a composite, group kerning and glyph
+# kerning. The weight moves one point so that fonts
+# made with different weights are compatible masters.
+
+def makeTestFont(path, weight=400, anchors=True, kerning=True, features=""):
+    import defcon
+    font = defcon.Font()
+    font.info.familyName = "Test"
+    font.info.styleName = f"W{weight}"
+    font.info.unitsPerEm = 1000
+    font.info.ascender = 750
+    font.info.descender = -250
+    font.info.xHeight = 500
+    font.info.capHeight = 700
+    for glyphName, value in (("A", 0x41), ("V", 0x56), ("O", 0x4F), ("acutecomb", 0x301), ("space", 0x20)):
+        glyph = font.newGlyph(glyphName)
+        glyph.unicodes = [value]
+        glyph.width = 600
+        if glyphName == "space":
+            continue
+        pen = glyph.getPen()
+        pen.moveTo((0, 0))
+        pen.lineTo((100 + weight / 10, 700))
+        pen.lineTo((500, 0))
+        pen.closePath()
+    glyph = font.newGlyph("Aacute")
+    glyph.unicodes = [0xC1]
+    glyph.width = 600
+    pen = glyph.getPen()
+    pen.addComponent("A", (1, 0, 0, 1, 0, 0))
+    pen.addComponent("acutecomb", (1, 0, 0, 1, 300, 0))
+    if anchors:
+        font["A"].appendAnchor(dict(name="top", x=300, y=700))
+        font["acutecomb"].appendAnchor(dict(name="_top", x=0, y=700))
+        font["acutecomb"].width = 0
+    if kerning:
+        font.groups["public.kern1.A"] = ["A", "Aacute"]
+        font.groups["public.kern2.V"] = ["V"]
+        font.kerning[("public.kern1.A", "public.kern2.V")] = -80
+        font.kerning[("O", "V")] = -20
+    font.features.text = features
+    font.save(path)
+    return font
+
+def makeTestDesignspace(directory):
+    from fontTools.designspaceLib import DesignSpaceDocument
+    makeTestFont(os.path.join(directory, "Light.ufo"), weight=300)
+    makeTestFont(os.path.join(directory, "Bold.ufo"), weight=700)
+    document = DesignSpaceDocument()
+    document.addAxisDescriptor(name="weight", tag="wght", minimum=300, default=300, maximum=700)
+    document.addSourceDescriptor(filename="Light.ufo", location=dict(weight=300), familyName="Test", styleName="Light")
+    document.addSourceDescriptor(filename="Bold.ufo", location=dict(weight=700), familyName="Test", styleName="Bold")
+    document.addInstanceDescriptor(filename="Test-Regular.ufo", location=dict(weight=400), familyName="Test", styleName="Regular")
+    path = os.path.join(directory, "Test.designspace")
+    document.write(path)
+    return path
+
+@pytest.fixture
+def fontPath(tmp_path):
+    path = str(tmp_path / "Test.ufo")
+    makeTestFont(path)
+    return path
+
+@pytest.fixture
+def designspacePath(tmp_path):
+    return makeTestDesignspace(str(tmp_path))
+
+@pytest.fixture(autouse=True)
+def emptyCaches():
+    # Each test starts without cached glyphs
+    # or layout tables.
+    from autoInstall.glyphCache import glyphCache
+    from autoInstall.featureCache import featureTableCache
+    glyphCache.clear()
+    featureTableCache.clear()
+    yield
+    glyphCache.clear()
+    featureTableCache.clear()
+
+# -----------
+# Comparisons
+# -----------
+
+def compileWithUFO2FT(font, **options):
+    # Plain ufo2ft with the settings of the
+    # "proof" profile.
+    import ufo2ft
+    return ufo2ft.compileOTF(
+        font,
+        removeOverlaps=True,
+        optimizeCFF=1,
+        useProductionNames=False,
+        **options
+    )
+
+def dumpTables(ttFont, tags=("GlyphOrder", "cmap", "hmtx", "CFF ", "OS/2", "name", "GDEF", "GSUB", "GPOS")):
+    import io
+    from fontTools.ttLib import TTFont
+    if isinstance(ttFont, str):
+        ttFont = TTFont(ttFont)
+    else:
+        # Compiled tables are compared as they would be read back.
+        stream = io.BytesIO()
+        ttFont.save(stream)
+        stream.seek(0)
+        ttFont = TTFont(stream)
+    dumps = {}
+    for tag in tags:
+        if tag != "GlyphOrder" and tag not in ttFont:
+            continue
+        stream = io.StringIO()
+        ttFont.saveXML(stream, tables=[tag], newlinestr="\n")
+        # The first line has the fontTools version.
+        dumps[tag] = stream.getvalue().split("\n", 2)[2]
+    return dumps
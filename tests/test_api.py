@@ -0,0 +1,49 @@
+import os
+import asyncio
+from fontTools.ttLib import TTFont
+from autoInstall.api import install, installMany
+from conftest import makeTestFont
+
+# ---
+# API
+# ---
+
+class RecordingInstaller:
+
+    def __init__(self):
+        self.installed = []
+
+    def install(self, sourcePath, fontPaths):
+        self.installed.append((sourcePath, list(fontPaths)))
+
+def testInstall(tmp_path, fontPath):
+    installer = RecordingInstaller()
+    outputDirectory = str(tmp_path / "output")
+    first = asyncio.run(install(fontPath, installer=installer, outputDirectory=outputDirectory))
+    assert first.error is None
+    assert os.path.exists(first.fontPath)
+    assert installer.installed == [(fontPath, [first.fontPath])]
+
+def testInstallManySameNames(tmp_path):
+    # Sources with the same name in different folders
+    # get their own binaries, and a cache hit returns
+    # the binary of the right source.
+    paths = []
+    for folder, weight in (("Roman", 300), ("Italic", 700)):
+        os.makedirs(tmp_path / folder)
+        paths.append(str(tmp_path / folder / "Regular.ufo"))
+        makeTestFont(paths[-1], weight=weight)
+    outputDirectory = str(tmp_path / "output")
+
+    async def run():
+        results = await installMany(paths, installer=RecordingInstaller(), outputDirectory=outputDirectory)
+        again = await install(paths[0], installer=RecordingInstaller(), outputDirectory=outputDirectory)
+        return results, again
+
+    results, again = asyncio.run(run())
+    assert [result.error for result in results] == [None, None]
+    assert results[0].fontPath != results[1].fontPath
+    assert again.cacheHit
+    assert again.fontPath == results[0].fontPath
+    fullNames = [TTFont(result.fontPath)["name"].getDebugName(4) for result in results]
+    assert fullNames == ["Test W300", "Test W700"]
@@ -0,0 +1,100 @@
+import defcon
+from ufo2ft.constants import EXPLICIT_CLOSING_LINE_KEY
+from autoInstall.compilers import getCompileBackend
+from autoInstall.glyphCache import glyphCache
+from autoInstall.featureCache import featureTableCache
+from conftest import makeTestFont, compileWithUFO2FT, dumpTables
+
+# -----------
+# Glyph Cache
+# -----------
+
+def testGlyphCacheReusesCharStrings(tmp_path, fontPath):
+    backend = getCompileBackend("ufo2ft")
+    firstPath = str(tmp_path / "first.otf")
+    secondPath = str(tmp_path / "second.otf")
+    backend.compile(fontPath, firstPath)
+    misses = glyphCache.misses
+    backend.compile(fontPath, secondPath)
+    assert glyphCache.misses == misses
+    assert dumpTables(secondPath) == dumpTables(firstPath)
+
+def testGlyphCacheExplicitClosingLine(tmp_path, fontPath):
+    # A cached charstring isn't reused when the
+    # closing line setting of the glyph changes.
+    backend = getCompileBackend("ufo2ft")
+    backend.compile(fontPath, str(tmp_path / "first.otf"))
+    font = defcon.Font(fontPath)
+    font["V"].lib[EXPLICIT_CLOSING_LINE_KEY] = True
+    font.save()
+    outputPath = str(tmp_path / "second.otf")
+    backend.compile(fontPath, outputPath)
+    expected = dumpTables(compileWithUFO2FT(defcon.Font(fontPath)))
+    assert expected["CFF "] != dumpTables(str(tmp_path / "first.otf"))["CFF "]
+    assert dumpTables(outputPath) == expected
+
+def testGlyphCacheSharedBetweenFonts(tmp_path, fontPath):
+    # Identical glyphs in other fonts are not built again.
+    backend = getCompileBackend("ufo2ft")
+    backend.compile(fontPath, str(tmp_path / "first.otf"))
+    otherPath = str(tmp_path / "Other.ufo")
+    makeTestFont(otherPath, weight=700)
+    hits = glyphCache.hits
+    backend.compile(otherPath, str(tmp_path / "other.otf"))
+    assert glyphCache.hits > hits
+
+# -------------
+# Feature Cache
+# -------------
+
+def testFeatureCacheHitMatchesUFO2FT(tmp_path):
+    # Two masters with the same features share the
+    # cached tables, and the cache hit gives the
+    # same tables as ufo2ft.
+    features = "languagesystem DFLT dflt;\nlanguagesystem latn TRK;\nfeature ss01 { sub A by Aacute; } ss01;\n"
+    backend = getCompileBackend("ufo2ft")
+    firstPath = str(tmp_path / "First.ufo")
+    secondPath = str(tmp_path / "Second.ufo")
+    makeTestFont(firstPath, weight=300, features=features)
+    makeTestFont(secondPath, weight=700, features=features)
+    backend.compile(firstPath, str(tmp_path / "first.otf"))
+    hits = featureTableCache.hits
+    backend.compile(secondPath, str(tmp_path / "second.otf"))
+    assert featureTableCache.hits == hits + 1
+    assert dumpTables(str(tmp_path / "second.otf")) == dumpTables(compileWithUFO2FT(defcon.Font(secondPath)))
+
+def testFeatureCacheKerningChange(tmp_path, fontPath):
+    backend = getCompileBackend("ufo2ft")
+    backend.compile(fontPath, str(tmp_path / "first.otf"))
+    font = defcon.Font(fontPath)
+    font.kerning[("O", "V")] = -50
+    font.save()
+    outputPath = str(tmp_path / "second.otf")
+    backend.compile(fontPath, outputPath)
+    assert dumpTables(outputPath) == dumpTables(compileWithUFO2FT(defcon.Font(fontPath)))
+
+def testFeatureCacheSkipsTableBlocks(tmp_path):
+    # Features that write to other tables are
+    # compiled on every build.
+    features = "table OS/2 { TypoLineGap 123; } OS/2;\nfeature ss01 { featureNames { name \"Alternate\"; }; sub A by Aacute; } ss01;\n"
+    path = str(tmp_path / "Test.ufo")
+    makeTestFont(path, features=features)
+    backend = getCompileBackend("ufo2ft")
+    backend.compile(path, str(tmp_path / "first.otf"))
+    backend.compile(path, str(tmp_path / "second.otf"))
+    assert len(featureTableCache) == 0
+    assert dumpTables(str(tmp_path / "second.otf")) == dumpTables(compileWithUFO2FT(defcon.Font(path)))
+
+def testFeatureCacheKerningOnly(tmp_path):
+    # Without anchors or features there is no cached
+    # GPOS table and the kerning makes a new one.
+    path = str(tmp_path / "Test.ufo")
+    makeTestFont(path, anchors=False)
+    backend = getCompileBackend("ufo2ft")
+    expected = dumpTables(compileWithUFO2FT(defcon.Font(path)))
+    hits = featureTableCache.hits
+    for name in ("first.otf", "second.otf"):
+        outputPath = str(tmp_path / name)
+        backend.compile(path, outputPath)
+        assert dumpTables(outputPath) == expected
+    assert featureTableCache.hits == hits + 1
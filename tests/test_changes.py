@@ -0,0 +1,50 @@
+import defcon
+from ufo2ft.constants import EXPLICIT_CLOSING_LINE_KEY
+from autoInstall.changes import FontChangeMonitor
+
+# -------
+# Changes
+# -------
+
+def testGlyphLibCompileKeyIsRelevant(fontPath):
+    font = defcon.Font(fontPath)
+    monitor = FontChangeMonitor(font)
+    try:
+        font["V"].lib[EXPLICIT_CLOSING_LINE_KEY] = True
+        assert monitor.consume("glyphs")
+        assert monitor.takeChangedGlyphNames() == {"V"}
+    finally:
+        monitor.stop()
+
+def testGlyphLibOtherKeyIsIgnored(fontPath):
+    font = defcon.Font(fontPath)
+    monitor = FontChangeMonitor(font)
+    try:
+        font["V"].lib["com.example.note"] = "ignored"
+        assert not monitor.consume("glyphs")
+        assert monitor.takeChangedGlyphNames() == set()
+    finally:
+        monitor.stop()
+
+def testMarkColorIsIgnored(fontPath):
+    font = defcon.Font(fontPath)
+    monitor = FontChangeMonitor(font)
+    try:
+        font["A"].markColor = (1, 0, 0, 1)
+        assert not monitor.consume("glyphs")
+        font["A"].width = 650
+        assert monitor.consume("glyphs")
+    finally:
+        monitor.stop()
+
+def testChangedGlyphNamesAreKeptUntilTaken(fontPath):
+    font = defcon.Font(fontPath)
+    monitor = FontChangeMonitor(font)
+    try:
+        font["V"].width = 650
+        assert monitor.getChangedGlyphNames() == {"V"}
+        assert monitor.getChangedGlyphNames() == {"V"}
+        assert monitor.takeChangedGlyphNames() == {"V"}
+        assert monitor.getChangedGlyphNames() == set()
+    finally:
+        monitor.stop()
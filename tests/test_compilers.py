@@ -0,0 +1,85 @@
+import pytest
+import defcon
+from fontTools.ttLib import TTFont
+from autoInstall.compilers import getCompileBackend
+from autoInstall.snapshot import takeSnapshot
+from autoInstall.workers import WorkerPool, WorkerError
+from conftest import compileWithUFO2FT, dumpTables
+
+# ------
+# ufo2ft
+# ------
+
+def testUFO2FTBackendMatchesUFO2FT(tmp_path, fontPath):
+    outputPath = str(tmp_path / "Test.otf")
+    getCompileBackend("ufo2ft").compile(fontPath, outputPath, profile="proof")
+    assert dumpTables(outputPath) == dumpTables(compileWithUFO2FT(defcon.Font(fontPath)))
+
+def testUFO2FTBackendSnapshot(tmp_path, fontPath):
+    font = defcon.Font(fontPath)
+    pathOutputPath = str(tmp_path / "path.otf")
+    snapshotOutputPath = str(tmp_path / "snapshot.otf")
+    getCompileBackend("ufo2ft").compile(fontPath, pathOutputPath)
+    getCompileBackend("ufo2ft").compile(takeSnapshot(font), snapshotOutputPath)
+    assert dumpTables(snapshotOutputPath) == dumpTables(pathOutputPath)
+
+def testUFO2FTBackendGlyphOrder(tmp_path, fontPath):
+    outputPath = str(tmp_path / "Test.otf")
+    glyphOrder = ["space", "V", "A", "O", "acutecomb", "Aacute"]
+    getCompileBackend("ufo2ft").compile(fontPath, outputPath, glyphOrder=glyphOrder)
+    assert TTFont(outputPath).getGlyphOrder() == [".notdef"] + glyphOrder
+
+def testInstantProfileSkipsFeatures(tmp_path, fontPath):
+    outputPath = str(tmp_path / "Test.otf")
+    getCompileBackend("ufo2ft").compile(fontPath, outputPath, profile="instant")
+    ttFont = TTFont(outputPath)
+    assert "GPOS" not in ttFont
+    assert "GSUB" not in ttFont
+
+# -------
+# Workers
+# -------
+
+def testWorkerBuild(tmp_path, fontPath):
+    workerOutputPath = str(tmp_path / "worker.otf")
+    localOutputPath = str(tmp_path / "local.otf")
+    pool = WorkerPool(size=1)
+    try:
+        pool.run("compileFont", takeSnapshot(defcon.Font(fontPath)), workerOutputPath, None, "proof")
+    finally:
+        pool.shutdown()
+    getCompileBackend("ufo2ft").compile(fontPath, localOutputPath, profile="proof")
+    assert dumpTables(workerOutputPath) == dumpTables(localOutputPath)
+
+def testWorkerBuildError(tmp_path, fontPath):
+    font = defcon.Font(fontPath)
+    font.features.text = "feature liga { sub A by missing; } liga;"
+    pool = WorkerPool(size=1)
+    try:
+        with pytest.raises(WorkerError, match="missing"):
+            pool.run("compileFont", takeSnapshot(font), str(tmp_path / "Test.otf"), None, "proof")
+        # The worker is still usable after a failed build.
+        assert pool.startedCount == 1
+        pool.run("compileFont", fontPath, str(tmp_path / "Test.otf"), None, "proof")
+        assert pool.startedCount == 1
+    finally:
+        pool.shutdown()
+
+def testUFO2FTBackendLeavesFontUnchanged(tmp_path, fontPath):
+    # Open fonts are compiled from a copy.
+    font = defcon.Font(fontPath)
+    font["O"].clearContours()
+    pen = font["O"].getPen()
+    for offset in (0, 200):
+        pen.moveTo((offset, 0))
+        pen.lineTo((offset + 300, 0))
+        pen.lineTo((offset + 300, 300))
+        pen.lineTo((offset, 300))
+        pen.closePath()
+    font.dirty = False
+    glyphOrder = list(reversed(font.glyphOrder))
+    getCompileBackend("ufo2ft").compile(font, str(tmp_path / "Test.otf"), glyphOrder=glyphOrder)
+    assert len(font["O"]) == 2
+    assert list(font.glyphOrder) != glyphOrder
+    assert not font.dirty
+    assert TTFont(str(tmp_path / "Test.otf")).getGlyphOrder() == [".notdef"] + glyphOrder
@@ -0,0 +1,35 @@
+import os
+import shutil
+from autoInstall.designspaceCache import DesignspaceCache
+
+# -----------------
+# Designspace Cache
+# -----------------
+
+def testSourceIndex(designspacePath):
+    cache = DesignspaceCache()
+    sourcePath = os.path.join(os.path.dirname(designspacePath), "Light.ufo")
+    assert cache.getDesignspacesForSource(sourcePath) == []
+    assert cache.getDesignspacesForSource(sourcePath, [designspacePath]) == [designspacePath]
+    cache.discard(designspacePath)
+    assert cache.getDesignspacesForSource(sourcePath) == []
+
+def testEvictedDesignspacesAreUnindexed(tmp_path, designspacePath):
+    # Designspaces that fall out of the cache are
+    # no longer returned for their sources.
+    otherPath = str(tmp_path / "Other.designspace")
+    shutil.copy(designspacePath, otherPath)
+    cache = DesignspaceCache(maxCount=1)
+    sourcePath = str(tmp_path / "Light.ufo")
+    cache.getSourcePaths(designspacePath)
+    assert cache.getDesignspacesForSource(sourcePath) == [designspacePath]
+    cache.getSourcePaths(otherPath)
+    assert cache.getDesignspacesForSource(sourcePath) == [otherPath]
+
+def testChangedDesignspaceIsReloaded(designspacePath):
+    cache = DesignspaceCache()
+    document = cache.getDocument(designspacePath)
+    assert cache.getDocument(designspacePath) is document
+    with open(designspacePath, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert cache.getDocument(designspacePath) is not document
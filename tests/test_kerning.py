@@ -0,0 +1,170 @@
+import ufo2ft
+import defcon
+from fontTools.ttLib import TTFont
+from autoInstall.kerning import KerningLookupBuilder, rebuildKerning, featuresDefineKerning
+from conftest import makeTestFont, compileWithUFO2FT
+
+# -------
+# Helpers
+# -------
+
+def getKerningPairs(ttFont):
+    # {(glyph1, glyph2): x advance} of the kern and
+    # dist features, as a shaper would see them.
+    table = ttFont["GPOS"].table
+    glyphOrder = ttFont.getGlyphOrder()
+    pairs = {}
+    for featureRecord in table.FeatureList.FeatureRecord:
+        if featureRecord.FeatureTag not in ("kern", "dist"):
+            continue
+        for lookupIndex in featureRecord.Feature.LookupListIndex:
+            for subtable in table.LookupList.Lookup[lookupIndex].SubTable:
+                if subtable.LookupType == 9:
+                    subtable = subtable.ExtSubTable
+                if subtable.Format == 1:
+                    for glyph1, pairSet in zip(subtable.Coverage.glyphs, subtable.PairSet):
+                        for record in pairSet.PairValueRecord:
+                            pairs.setdefault((glyph1, record.SecondGlyph), record.Value1.XAdvance)
+                    continue
+                classes1 = subtable.ClassDef1.classDefs
+                classes2 = subtable.ClassDef2.classDefs
+                for glyph1 in subtable.Coverage.glyphs:
+                    class1Record = subtable.Class1Record[classes1.get(glyph1, 0)]
+                    for glyph2 in glyphOrder:
+                        value = class1Record.Class2Record[classes2.get(glyph2, 0)].Value1
+                        if getattr(value, "XAdvance", 0):
+                            pairs.setdefault((glyph1, glyph2), value.XAdvance)
+    return pairs
+
+def getLookupFeatureTags(ttFont):
+    # The feature tags of each lookup, in lookup order.
+    table = ttFont["GPOS"].table
+    tags = [set() for lookup in table.LookupList.Lookup]
+    for featureRecord in table.FeatureList.FeatureRecord:
+        for lookupIndex in featureRecord.Feature.LookupListIndex:
+            tags[lookupIndex].add(featureRecord.FeatureTag)
+    return [sorted(lookupTags) for lookupTags in tags]
+
+def getFeatureScripts(ttFont):
+    table = ttFont["GPOS"].table
+    return {
+        (scriptRecord.ScriptTag, table.FeatureList.FeatureRecord[index].FeatureTag)
+        for scriptRecord in table.ScriptList.ScriptRecord
+        for index in scriptRecord.Script.DefaultLangSys.FeatureIndex
+    }
+
+def addDevanagari(font):
+    for glyphName, value in (("ka-deva", 0x0915), ("kha-deva", 0x0916)):
+        glyph = font.newGlyph(glyphName)
+        glyph.unicodes = [value]
+        glyph.width = 500
+        pen = glyph.getPen()
+        pen.moveTo((0, 0))
+        pen.lineTo((100, 500))
+        pen.lineTo((400, 0))
+        pen.closePath()
+    font.kerning[("ka-deva", "kha-deva")] = -30
+
+def rebuild(font, inputPath, outputPath):
+    return rebuildKerning(
+        inputPath,
+        outputPath,
+        dict(font.kerning.items()),
+        dict(font.groups.items()),
+        KerningLookupBuilder(),
+        glyphNames=list(font.keys())
+    )
+
+def editKerning(font):
+    font.kerning[("public.kern1.A", "public.kern2.V")] = -120
+    font.kerning[("V", "O")] = -15
+    if ("ka-deva", "kha-deva") in font.kerning:
+        font.kerning[("ka-deva", "kha-deva")] = -45
+
+# -------
+# Rebuild
+# -------
+
+def testRebuildKerningMatchesUFO2FT(tmp_path, fontPath):
+    font = defcon.Font(fontPath)
+    inputPath = str(tmp_path / "old.otf")
+    outputPath = str(tmp_path / "new.otf")
+    compileWithUFO2FT(font).save(inputPath)
+    editKerning(font)
+    assert rebuild(font, inputPath, outputPath)
+    expected = compileWithUFO2FT(font)
+    ttFont = TTFont(outputPath)
+    assert getKerningPairs(ttFont) == getKerningPairs(expected)
+    assert getFeatureScripts(ttFont) == getFeatureScripts(expected)
+
+def testRebuildKerningDist(tmp_path, fontPath):
+    # ufo2ft kerns Devanagari with dist. The old dist
+    # lookups are replaced, not left behind.
+    font = defcon.Font(fontPath)
+    addDevanagari(font)
+    inputPath = str(tmp_path / "old.otf")
+    outputPath = str(tmp_path / "new.otf")
+    compileWithUFO2FT(font).save(inputPath)
+    editKerning(font)
+    assert rebuild(font, inputPath, outputPath)
+    expected = compileWithUFO2FT(font)
+    ttFont = TTFont(outputPath)
+    assert ("deva", "dist") in getFeatureScripts(expected)
+    assert getFeatureScripts(ttFont) == getFeatureScripts(expected)
+    assert getKerningPairs(ttFont) == getKerningPairs(expected)
+    assert getKerningPairs(ttFont)[("ka-deva", "kha-deva")] == -45
+
+def testRebuildKerningWithoutGPOS(tmp_path):
+    path = str(tmp_path / "Test.ufo")
+    font = makeTestFont(path, anchors=False, kerning=False)
+    inputPath = str(tmp_path / "old.otf")
+    outputPath = str(tmp_path / "new.otf")
+    compileWithUFO2FT(font).save(inputPath)
+    assert "GPOS" not in TTFont(inputPath)
+    font.kerning[("A", "V")] = -50
+    assert rebuild(font, inputPath, outputPath)
+    ttFont = TTFont(outputPath)
+    assert [featureRecord.FeatureTag for featureRecord in ttFont["GPOS"].table.FeatureList.FeatureRecord] == ["kern"]
+    assert getKerningPairs(ttFont) == getKerningPairs(compileWithUFO2FT(font))
+
+def testRebuildKerningProductionNames(tmp_path):
+    # The kerning can't be matched to renamed
+    # glyphs, so a full build is needed.
+    path = str(tmp_path / "Test.ufo")
+    font = makeTestFont(path)
+    addDevanagari(font)
+    inputPath = str(tmp_path / "old.otf")
+    ufo2ft.compileOTF(font, useProductionNames=True).save(inputPath)
+    assert not rebuild(font, inputPath, str(tmp_path / "new.otf"))
+
+def testRebuildKerningLookupOrder(tmp_path, fontPath):
+    # The kerning stays before the mark lookups,
+    # as ufo2ft writes it, and no old lookups are
+    # left behind.
+    font = defcon.Font(fontPath)
+    inputPath = str(tmp_path / "old.otf")
+    outputPath = str(tmp_path / "new.otf")
+    compileWithUFO2FT(font).save(inputPath)
+    editKerning(font)
+    assert rebuild(font, inputPath, outputPath)
+    lookupFeatureTags = getLookupFeatureTags(TTFont(outputPath))
+    assert lookupFeatureTags == [["kern"], ["mark"]]
+    assert lookupFeatureTags == getLookupFeatureTags(compileWithUFO2FT(font))
+
+def testRebuildKerningLookupOrderDist(tmp_path, fontPath):
+    font = defcon.Font(fontPath)
+    addDevanagari(font)
+    inputPath = str(tmp_path / "old.otf")
+    outputPath = str(tmp_path / "new.otf")
+    compileWithUFO2FT(font).save(inputPath)
+    editKerning(font)
+    assert rebuild(font, inputPath, outputPath)
+    assert getLookupFeatureTags(TTFont(outputPath)) == [["dist", "kern"], ["mark"]]
+
+def testFeaturesDefineKerning():
+    # A full build is needed when the features
+    # have their own kerning.
+    assert featuresDefineKerning(["feature kern { pos A V -300; } kern;"])
+    assert featuresDefineKerning(["", "feature dist {\n  pos A V -300;\n} dist;"])
+    assert not featuresDefineKerning(["# feature kern { pos A V -300; } kern;"])
+    assert not featuresDefineKerning(["feature liga { sub A V by Aacute; } liga;"])
@@ -0,0 +1,38 @@
+import json
+from autoInstall.replay import SessionReplayer, StubInstaller, loadSession
+from autoInstall.scheduler import InstallDebouncer
+from test_watcher import runPackage
+
+# ------
+# Replay
+# ------
+
+def writeSession(path, events):
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    return path
+
+changeEvents = [
+    dict(time=0, event="change", font="Test.ufo"),
+    dict(time=0.5, event="change", font="Test.ufo")
+]
+
+def testReplay(tmp_path):
+    events = loadSession(writeSession(str(tmp_path / "session.jsonl"), changeEvents))
+    debouncer = InstallDebouncer(installDelay=5, precompileDelay=1, precompile=True)
+    report = SessionReplayer(events, debouncer=debouncer, installer=StubInstaller(compileTime=1)).run()
+    assert report["installs"] == 1
+    assert report["installedEdits"] == 2
+    assert report["usedPrecompiles"] == 1
+
+def testReplayWithoutPrecompileDelay(tmp_path):
+    # A precompile that finds the previous one still
+    # running waits for it instead of retrying at the
+    # same time forever. This runs in a process so a
+    # hang ends with the timeout.
+    path = writeSession(str(tmp_path / "session.jsonl"), changeEvents)
+    process = runPackage("replay", path, "--precompile-delay", "0", "--compile-time", "1", timeout=60)
+    assert process.returncode == 0, process.stdout + process.stderr
+    assert "installs:         1" in process.stdout
+    assert "usedPrecompiles:  1" in process.stdout
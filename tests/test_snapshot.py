@@ -0,0 +1,28 @@
+import defcon
+from ufo2ft.constants import EXPLICIT_CLOSING_LINE_KEY
+from autoInstall.compilers import getCompileBackend, snapshotToDefcon
+from autoInstall.snapshot import takeSnapshot
+from conftest import compileWithUFO2FT, dumpTables
+
+# --------
+# Snapshot
+# --------
+
+def testSnapshotRoundTrip(fontPath):
+    font = defcon.Font(fontPath)
+    copy = snapshotToDefcon(takeSnapshot(font))
+    assert list(copy.glyphOrder) == list(font.glyphOrder)
+    assert dict(copy.kerning.items()) == dict(font.kerning.items())
+    for glyphName in font.keys():
+        assert takeSnapshot(copy)[glyphName] == takeSnapshot(font)[glyphName]
+
+def testSnapshotExplicitClosingLine(tmp_path, fontPath):
+    # Builds from snapshots keep the glyph lib keys
+    # that change the compiled outlines.
+    font = defcon.Font(fontPath)
+    font["V"].lib[EXPLICIT_CLOSING_LINE_KEY] = True
+    snapshot = takeSnapshot(font)
+    assert snapshotToDefcon(snapshot)["V"].lib[EXPLICIT_CLOSING_LINE_KEY]
+    outputPath = str(tmp_path / "Test.otf")
+    getCompileBackend("ufo2ft").compile(snapshot, outputPath)
+    assert dumpTables(outputPath) == dumpTables(compileWithUFO2FT(font))
@@ -0,0 +1,60 @@
+import os
+import sys
+import subprocess
+from conftest import codeDirectory, makeTestFont
+
+# -----
+# Watch
+# -----
+
+def runPackage(*arguments, timeout=300):
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [codeDirectory] + [path for path in (environment.get("PYTHONPATH"),) if path]
+    )
+    return subprocess.run(
+        [sys.executable, "-m", "autoInstall"] + list(arguments),
+        env=environment,
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+
+def runWatcher(*arguments):
+    return runPackage("watch", "--once", *arguments)
+
+def testWatchOnce(tmp_path, fontPath, designspacePath):
+    outputDirectory = str(tmp_path / "output")
+    process = runWatcher("-o", outputDirectory, fontPath, designspacePath)
+    assert process.returncode == 0, process.stdout + process.stderr
+    assert "2 built, 0 failed" in process.stdout
+    fileNames = sorted(os.listdir(outputDirectory))
+    assert len(fileNames) == 2
+    assert fileNames[0] == "Test-Test-VF.ttf"
+    assert fileNames[1].startswith("Test_") and fileNames[1].endswith(".otf")
+
+def testWatchOnceSameNames(tmp_path):
+    # UFOs with the same name in different
+    # folders don't overwrite each other.
+    paths = []
+    for folder in ("Roman", "Italic"):
+        os.makedirs(tmp_path / folder)
+        paths.append(str(tmp_path / folder / "Regular.ufo"))
+        makeTestFont(paths[-1])
+    outputDirectory = str(tmp_path / "output")
+    process = runWatcher("-o", outputDirectory, *paths)
+    assert process.returncode == 0, process.stdout + process.stderr
+    assert len(os.listdir(outputDirectory)) == 2
+
+def testWatchOnceInstances(tmp_path, designspacePath):
+    outputDirectory = str(tmp_path / "output")
+    process = runWatcher("-o", outputDirectory, "--instances", "--backend", "ufo2ft-worker", designspacePath)
+    assert process.returncode == 0, process.stdout + process.stderr
+    assert os.listdir(outputDirectory) == ["Test-Test-Regular.otf"]
+
+def testWatchOnceFailure(tmp_path, fontPath):
+    with open(os.path.join(fontPath, "features.fea"), "w") as f:
+        f.write("feature liga { sub A by missing; } liga;")
+    process = runWatcher("-o", str(tmp_path / "output"), fontPath)
+    assert process.returncode != 0
+    assert "0 built, 1 failed" in process.stdout